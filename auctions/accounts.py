@@ -0,0 +1,75 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import check_password, make_password
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from rest_framework.authtoken.models import Token
+
+from auctions.models import User, Listing
+
+
+def verify_password(password, encoded):
+    """
+    Return whether `password` matches the hash `encoded`, and its new hash
+    if `encoded` was made with an outdated hasher or work factor, else
+    None. The database is not touched, so it can run in any thread.
+    """
+    rehashed = []
+    valid = check_password(password, encoded, setter=lambda raw_password: rehashed.append(make_password(raw_password)))
+    return valid, rehashed[0] if rehashed else None
+
+
+def with_listing_count(queryset):
+    """
+    Annotate the users of `queryset` with the number of their listings as
+    `listing_count`, counted on the owner index for the fetched users only.
+    """
+    listings = Listing.objects.filter(owner=OuterRef("pk")).order_by().values("owner").annotate(count=Count("*")).values("count")
+    return queryset.annotate(listing_count=Coalesce(Subquery(listings), 0))
+
+
+def login_queryset(username):
+    # The user, its listing count and its token in a single query.
+    return with_listing_count(User.objects.select_related("auth_token")).filter(username=username)
+
+
+def token_key(user):
+    try:
+        return user.auth_token.key
+    except Token.DoesNotExist:
+        return Token.objects.get_or_create(user=user)[0].key
+
+
+def login(username, password):
+    """
+    Return the user with `username` and the key of its API token if
+    `password` is theirs, else None.
+    """
+    user = login_queryset(username).first()
+    if user is None:
+        # Hash anyway, so that the time taken does not reveal the users.
+        make_password(password)
+        return None
+    valid, rehashed = verify_password(password, user.password)
+    if not valid:
+        return None
+    if rehashed:
+        User.objects.filter(pk=user.pk).update(password=rehashed)
+    return user, token_key(user)
+
+
+async def alogin(username, password):
+    """
+    Async `login()`. The password is hashed in a thread of the default
+    executor, so neither the event loop nor the thread running the sync
+    code is blocked meanwhile.
+    """
+    user = await login_queryset(username).afirst()
+    if user is None:
+        await sync_to_async(make_password, thread_sensitive=False)(password)
+        return None
+    valid, rehashed = await sync_to_async(verify_password, thread_sensitive=False)(password, user.password)
+    if not valid:
+        return None
+    if rehashed:
+        await User.objects.filter(pk=user.pk).aupdate(password=rehashed)
+    return user, await sync_to_async(token_key)(user)
@@ -0,0 +1,151 @@
+import threading
+import weakref
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from auctions.models import Listing, ListingBidBucket, Bid, Comment
+
+# The activity fields of `Listing`, with the column each is stored in.
+ACTIVITY_FIELDS = {
+    "bid_count": "bid_count",
+    "comment_count": "comment_count",
+    "last_bid_at": "last_bid_at",
+    "top_bidder": "top_bidder_id",
+}
+
+
+def bid_activity(bidder, bid_date, count=1):
+    """
+    Updates of a listing on which `count` bids were placed, the last and
+    highest of them by `bidder` at `bid_date`.
+    """
+    return {"bid_count": F("bid_count") + count, "last_bid_at": bid_date, "top_bidder": bidder}
+
+
+def bid_bucket(at):
+    """
+    Return the number of the feed bucket holding the time `at`.
+    """
+    return int(at.timestamp()) // settings.AUCTIONS_FEED_BUCKET_SECONDS
+
+
+def record_bids(listing_id, bid_date, count=1):
+    """
+    Add `count` bids placed at `bid_date` to the feed bucket of listing
+    `listing_id`. Called after the listing row was updated in the same
+    transaction, which serializes the bids on a listing, so the bucket
+    cannot be inserted twice.
+    """
+    bucket = bid_bucket(bid_date)
+    buckets = ListingBidBucket.objects.filter(listing_id=listing_id, bucket=bucket)
+    if not buckets.update(bid_count=F("bid_count") + count):
+        ListingBidBucket.objects.create(listing_id=listing_id, bucket=bucket, bid_count=count)
+
+
+def comment_activity(count=1):
+    """
+    Updates of a listing on which `count` comments were posted.
+    """
+    return {"comment_count": F("comment_count") + count}
+
+
+def computed_activity(fields=ACTIVITY_FIELDS):
+    """
+    Expressions computing the activity `fields` of a listing from its bids
+    and comments, for updating or annotating listings.
+    """
+    bids = Bid.objects.filter(listing=OuterRef("pk")).order_by()
+    comments = Comment.objects.filter(listing=OuterRef("pk")).order_by()
+    expressions = {
+        "bid_count": Coalesce(Subquery(bids.values("listing").annotate(count=Count("*")).values("count")), Value(0)),
+        "comment_count": Coalesce(Subquery(comments.values("listing").annotate(count=Count("*")).values("count")), Value(0)),
+        "last_bid_at": Subquery(bids.order_by("-bid_date", "-id").values("bid_date")[:1]),
+        # The bidder of the highest bid, the earliest on a tie, as for the
+        # winning bid.
+        "top_bidder": Subquery(bids.order_by("-bid_amount", "id").values("bidder")[:1]),
+    }
+    return {name: expressions[name] for name in fields}
+
+
+def recompute_activity(listing_ids, fields=ACTIVITY_FIELDS):
+    """
+    Recompute the activity `fields` of the listings `listing_ids` with a
+    single UPDATE, and return the number of listings updated.
+    """
+    return Listing.objects.filter(pk__in=listing_ids).bump_version(**computed_activity(fields))
+
+
+_pending = threading.local()
+
+
+class PendingRecompute:
+    """
+    The activity fields to recompute per listing once the current
+    transaction is committed, see `recompute_activity_on_commit()`.
+    """
+    batch_size = 500
+
+    def __init__(self):
+        self.fields = defaultdict(set)
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        by_fields = defaultdict(list)
+        for listing_id, fields in self.fields.items():
+            by_fields[frozenset(fields)].append(listing_id)
+        for fields, listing_ids in by_fields.items():
+            for start in range(0, len(listing_ids), self.batch_size):
+                recompute_activity(listing_ids[start:start + self.batch_size], sorted(fields))
+
+
+def recompute_activity_on_commit(listing_ids, fields=ACTIVITY_FIELDS):
+    """
+    Recompute the activity `fields` of the listings `listing_ids` once the
+    current transaction is committed, along with the listings of the other
+    calls made in the transaction: deleting many bids or comments then
+    recomputes each of their listings once.
+    """
+    pending = getattr(_pending, "recompute", lambda: None)()
+    registered = pending is not None and not pending.done
+    if not registered:
+        pending = PendingRecompute()
+    for listing_id in listing_ids:
+        pending.fields[listing_id].update(fields)
+    if not registered:
+        # Only the callback holds it, so it goes away with the callback if
+        # the transaction is rolled back.
+        _pending.recompute = weakref.ref(pending)
+        transaction.on_commit(pending)
+
+
+def check_activity(batch_size=1000, fix=False):
+    """
+    Compare the stored activity of every listing with the one computed
+    from its bids and comments, `batch_size` listings at a time, and
+    recompute the listings that drifted if `fix` is set.
+
+    Return the number of listings checked and the ids of those that
+    drifted.
+    """
+    computed = {f"computed_{name}": expression for name, expression in computed_activity().items()}
+    columns = list(ACTIVITY_FIELDS.values())
+    checked, drifted = 0, []
+    after = 0
+    while True:
+        rows = list(
+            Listing.objects.filter(id__gt=after).order_by("id").annotate(**computed)
+            .values_list("id", *columns, *computed)[:batch_size]
+        )
+        batch = [row[0] for row in rows if row[1:len(columns) + 1] != row[len(columns) + 1:]]
+        if fix and batch:
+            recompute_activity(batch)
+        checked += len(rows)
+        drifted += batch
+        if len(rows) < batch_size:
+            return checked, drifted
+        after = rows[-1][0]
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AuctionsConfig(AppConfig):
     default_auto_field = 'django.db.models.AutoField'
     name = 'auctions'
+
+    def ready(self):
+        from auctions import signals  # noqa: F401
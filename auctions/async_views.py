@@ -0,0 +1,380 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import FieldError, ObjectDoesNotExist, PermissionDenied
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.cache import parse_etags
+from django.views import View
+from rest_framework import exceptions, serializers, status
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from auctions import views
+from auctions.accounts import alogin
+from auctions.cache import listing_cache, token_cache
+from auctions.conditional import version_etag
+from auctions.events import bid_channel, bid_event, event_id
+from auctions.filters import ListingFilter
+from auctions.instrumentation import timed
+from auctions.models import Listing, Bid, Comment, CollectionVersion
+from auctions.pagination import ListingPagination, BidPagination, CommentPagination
+from auctions.pubsub import get_hub
+from auctions.renderers import FastJSONRenderer, MessagePackRenderer
+from auctions.rows import RowSerializer
+from auctions.serializers import UserSerializer, ListingSerializer, ListingSummarySerializer, BidSerializer, CommentSerializer
+
+
+async def aauthenticate(request):
+    """
+    Return the user a request is authenticated as, trying the session then
+    the token like `SessionAuthentication` and `TokenAuthentication`.
+
+    The token's user is read from `token_cache`, or fetched with the async
+    ORM and cached, like `CachedTokenAuthentication`. Django has no
+    async session API yet, so the session is loaded in a worker thread,
+    and only when the request carries a session cookie.
+    """
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        user = await sync_to_async(get_user)(request)
+        if user.is_authenticated:
+            return user
+
+    auth = request.headers.get("Authorization", "").split()
+    if not auth or auth[0].lower() != "token":
+        return AnonymousUser()
+    if len(auth) != 2:
+        raise exceptions.AuthenticationFailed("Invalid token header. No credentials provided.")
+    user = token_cache.get(auth[1])
+    if user is not None:
+        return user
+    try:
+        token = await Token.objects.select_related("user").aget(key=auth[1])
+    except Token.DoesNotExist:
+        raise exceptions.AuthenticationFailed("Invalid token.")
+    if not token.user.is_active:
+        raise exceptions.AuthenticationFailed("User inactive or deleted.")
+    token_cache.set(token.key, token.user)
+    return token.user
+
+
+class AsyncReadView(View):
+    """
+    Serve GET and HEAD on the event loop with the async ORM, and hand every
+    other method to `sync_view`, the DRF view of the same route, so that a
+    route can be switched between the two (see `AUCTIONS_ASYNC_VIEWS`).
+
+    Reads are answered as JSON with the same body, ETag and permissions as
+    `sync_view`. A format suffix other than `.json`, or asking for
+    MessagePack, goes to `sync_view`.
+    Views without a `sync_view` only allow GET and HEAD.
+
+    Unless they override `get()`, views define the coroutines
+    `aget_version()`, returning the current version of the resource or
+    None if it cannot be tagged (see `ConditionalGetMixin.get_version()`),
+    and `aget_data()`, returning the body. This is checked when the view
+    class is defined.
+    """
+    sync_view = None
+    sync_handler = None
+    permission_classes = None
+    serializer_class = None
+    pagination_class = None
+    filter_backends = []
+    renderer_class = FastJSONRenderer
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.get is AsyncReadView.get:
+            missing = [name for name in ("aget_version", "aget_data") if not hasattr(cls, name)]
+            if missing:
+                raise TypeError(f"{cls.__name__} must define {' and '.join(missing)}().")
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        if cls.sync_view is not None:
+            initkwargs.setdefault("sync_handler", sync_to_async(cls.sync_view.as_view()))
+        view = super().as_view(**initkwargs)
+        # CSRF is enforced by SessionAuthentication, as in APIView.
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        other_format = kwargs.get("format", "json") != "json" or MessagePackRenderer.media_type in request.headers.get("Accept", "")
+        if request.method not in ("GET", "HEAD") or other_format:
+            if self.sync_handler is None:
+                return await self.http_method_not_allowed(request, *args, **kwargs)
+            return await self.sync_handler(request, *args, **kwargs)
+
+        self.request = request = Request(request)
+        request.accepted_renderer = self.renderer_class()
+        request.accepted_media_type = request.accepted_renderer.media_type
+        try:
+            request.user = await aauthenticate(request._request)
+            self.check_permissions(request)
+            return await self.get(request, *args, **kwargs)
+        except Exception as exc:
+            return self.handle_exception(exc)
+
+    def get_permissions(self):
+        permission_classes = self.permission_classes
+        if permission_classes is None:
+            permission_classes = self.sync_view.permission_classes
+        return [permission_class() for permission_class in permission_classes]
+
+    def check_permissions(self, request):
+        for permission in self.get_permissions():
+            if not permission.has_permission(request, self):
+                if not request.user.is_authenticated:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(getattr(permission, "message", None))
+
+    def handle_exception(self, exc):
+        if isinstance(exc, (Http404, ObjectDoesNotExist)):
+            exc = exceptions.NotFound()
+        elif isinstance(exc, PermissionDenied):
+            exc = exceptions.PermissionDenied()
+        if not isinstance(exc, exceptions.APIException):
+            raise exc
+        # Without a WWW-Authenticate challenge, as for SessionAuthentication.
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            exc.status_code = status.HTTP_403_FORBIDDEN
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+        return self.render(data, status=exc.status_code)
+
+    def render(self, data, status=status.HTTP_200_OK):
+        renderer = self.request.accepted_renderer
+        return HttpResponse(renderer.render(data), status=status, content_type=renderer.media_type)
+
+    def get_serializer_class(self):
+        return self.serializer_class
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault("context", {"request": self.request, "format": None, "view": self})
+        return self.get_serializer_class()(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        for backend in self.filter_backends:
+            queryset = backend().filter_queryset(self.request, queryset, self)
+        return queryset
+
+    def get_nested_querysets(self):
+        return {}
+
+    async def alist(self, queryset):
+        """
+        Return the page of `queryset` asked for, read as `.values()` rows
+        like `views.RowListMixin` when possible.
+        """
+        paginator = self.pagination_class()
+        row_serializer = None
+        if settings.AUCTIONS_ROW_SERIALIZATION:
+            row_serializer = RowSerializer.for_serializer(self.get_serializer())
+        if row_serializer is not None:
+            ordering = [name.lstrip("-") for name in paginator.get_ordering(self.request, queryset, self)]
+            try:
+                rows = row_serializer.values(queryset, *ordering)
+            except FieldError:
+                row_serializer = None
+        if row_serializer is None:
+            page = await paginator.apaginate_queryset(queryset, self.request, self)
+            return paginator.get_paginated_response(self.get_serializer(page, many=True).data).data
+        page = await paginator.apaginate_queryset(rows, self.request, self)
+        nested = {}
+        for name, nested_rows in row_serializer.nested_values(page, self.get_nested_querysets()).items():
+            nested[name] = [row async for row in nested_rows]
+        with timed("serialize"):
+            data = row_serializer.to_representation(page, nested)
+        return paginator.get_paginated_response(data).data
+
+    async def get(self, request, *args, **kwargs):
+        self.version = version = await self.aget_version()
+        if version is None:
+            return self.render(await self.aget_data())
+
+        etag = version_etag(request, version)
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            return HttpResponseNotModified(headers={"ETag": etag})
+        response = self.render(await self.aget_data())
+        response["ETag"] = etag
+        return response
+
+
+class ListingVersionMixin:
+    async def aget_version(self):
+        return await Listing.objects.filter(pk=self.kwargs['pk']).values_list("version", flat=True).afirst()
+
+
+class ListingList(views.ListingFieldsMixin, AsyncReadView):
+    sync_view = views.ListingList
+    serializer_class = ListingSummarySerializer
+    pagination_class = ListingPagination
+    filter_backends = [ListingFilter]
+
+    async def aget_version(self):
+        return await CollectionVersion.acurrent(Listing.COLLECTION)
+
+    async def aget_data(self):
+        return await self.alist(self.filter_queryset(self.get_queryset()))
+
+
+class ListingDetail(ListingVersionMixin, views.ListingFieldsMixin, AsyncReadView):
+    sync_view = views.ListingDetail
+    serializer_class = ListingSerializer
+
+    async def aget_data(self):
+        pk = self.kwargs['pk']
+        # Same caching rule as the sync view, see ListingDetail.retrieve().
+        cacheable = not self.request.query_params and self.version is not None
+        if cacheable:
+            data = listing_cache.get(pk, self.version)
+            if data is not None:
+                return data
+        listing = await self.get_queryset().aget(pk=pk)
+        for permission in self.get_permissions():
+            if not permission.has_object_permission(self.request, self, listing):
+                raise exceptions.PermissionDenied()
+        data = self.get_serializer(listing).data
+        if cacheable:
+            listing_cache.set(pk, self.version, data)
+        return data
+
+
+class BidList(ListingVersionMixin, AsyncReadView):
+    sync_view = views.BidList
+    serializer_class = BidSerializer
+    pagination_class = BidPagination
+
+    async def aget_data(self):
+        return await self.alist(Bid.objects.select_related("bidder", "listing").filter(listing_id=self.kwargs['pk']))
+
+
+class CommentList(ListingVersionMixin, AsyncReadView):
+    sync_view = views.CommentList
+    serializer_class = CommentSerializer
+    pagination_class = CommentPagination
+
+    async def aget_data(self):
+        return await self.alist(Comment.objects.select_related("commentor", "listing").filter(listing_id=self.kwargs['pk']))
+
+
+class BidStream(AsyncReadView):
+    """
+    Push the bids placed on a listing as server-sent events, with the bid
+    id as event id. Without `Last-Event-ID` (or `?last_event_id=`) only the
+    bids placed from now on are sent, with it the bids placed since that
+    one are sent first, so a client that reconnects misses none.
+
+    Under commerce/asgi.py it is served by `auctions.routing.StreamRouter`.
+    Under WSGI, which cannot keep the response open, the stream ends after
+    the first bids or AUCTIONS_BID_STREAM_KEEPALIVE seconds without any,
+    and the client reconnects (long polling).
+    """
+    permission_classes = views.BidList.permission_classes
+    backlog_chunk_size = 500
+    # Events queued per subscriber before it catches up from the database.
+    max_queued = 1000
+    # Milliseconds an EventSource waits before reconnecting.
+    retry = 1000
+
+    async def get(self, request, pk, format=None):
+        last_event_id = request.headers.get("Last-Event-ID", request.query_params.get("last_event_id"))
+        if last_event_id is not None:
+            try:
+                last_event_id = int(last_event_id)
+            except ValueError:
+                raise serializers.ValidationError({"last_event_id": ["Must be the id of the last bid received."]})
+        if not await Listing.objects.filter(pk=pk).aexists():
+            raise exceptions.NotFound()
+
+        if isinstance(request._request, ASGIRequest):
+            response = StreamingHttpResponse(self.events(pk, last_event_id), content_type="text/event-stream")
+        else:
+            events = [event async for event in self.events(pk, last_event_id, long_poll=True)]
+            response = HttpResponse("".join(events), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def events(self, pk, last_id, long_poll=False):
+        # Subscribe before reading the bids already placed, so that a bid
+        # placed in between is received.
+        subscription = get_hub().subscribe(bid_channel(pk), self.max_queued)
+        try:
+            # Whether the database may hold bids that were not sent yet.
+            catch_up = last_id is not None
+            if last_id is None:
+                last_id = await Bid.objects.filter(listing_id=pk).order_by("-id").values_list("id", flat=True).afirst() or 0
+            yield f"retry: {self.retry}\n\n"
+            sent = False
+            while True:
+                if catch_up:
+                    subscription.overflowed = False
+                    async for event in self.backlog(pk, last_id):
+                        yield event
+                        last_id, sent = event_id(event), True
+                if sent and long_poll:
+                    return
+                try:
+                    event = await asyncio.wait_for(subscription.get(), settings.AUCTIONS_BID_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    if long_poll:
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                # Events already sent from the database are skipped.
+                if event_id(event) > last_id:
+                    yield event
+                    last_id, sent = event_id(event), True
+                # Bids were dropped while the queue was full.
+                catch_up = subscription.overflowed
+        finally:
+            subscription.close()
+
+    async def backlog(self, pk, after):
+        """
+        Yield the events of the bids placed on listing `pk` after bid
+        `after`, in chunks.
+        """
+        bids = Bid.objects.select_related("bidder", "listing").filter(listing_id=pk).order_by("id")
+        while True:
+            chunk = [bid async for bid in bids.filter(id__gt=after)[:self.backlog_chunk_size]]
+            for bid in chunk:
+                yield bid_event(bid)
+            if len(chunk) < self.backlog_chunk_size:
+                return
+            after = chunk[-1].id
+
+
+class Login(View):
+    """
+    Async `views.login_view`: the user and its token are fetched with the
+    async ORM and the password is checked off the event loop, see
+    `auctions.accounts.alogin()`. Answers in JSON only.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Logging in needs no session, as with the sync view.
+        view.csrf_exempt = True
+        return view
+
+    async def post(self, request):
+        request = Request(request, parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES])
+        renderer = FastJSONRenderer()
+        try:
+            data = request.data
+        except exceptions.ParseError as exc:
+            return HttpResponse(renderer.render({"detail": exc.detail}), status=exc.status_code, content_type=renderer.media_type)
+        credentials = await alogin(data.get("username"), data.get("password", ""))
+        if credentials is None:
+            return HttpResponse(renderer.render({"message": "bad request"}), status=status.HTTP_400_BAD_REQUEST, content_type=renderer.media_type)
+        user, token = credentials
+        # No query: the listing count was fetched with the user.
+        user_data = UserSerializer(user, context={"request": request}).data
+        return HttpResponse(renderer.render({"token": token, "user": user_data}), content_type=renderer.media_type)
@@ -0,0 +1,39 @@
+from rest_framework import authentication
+from rest_framework.authtoken.models import Token
+
+from auctions.cache import token_cache
+from auctions.instrumentation import timed
+
+
+class TimedAuthenticationMixin:
+    """
+    Count the time spent authenticating as the `auth` timing of the
+    request, see `auctions.instrumentation`.
+    """
+
+    def authenticate(self, request):
+        with timed("auth"):
+            return super().authenticate(request)
+
+
+class SessionAuthentication(TimedAuthenticationMixin, authentication.SessionAuthentication):
+    pass
+
+
+class CachedTokenAuthentication(TimedAuthenticationMixin, authentication.TokenAuthentication):
+    """
+    `TokenAuthentication` answering from `token_cache` instead of querying
+    the token and its user on every request.
+
+    Only the users of valid tokens are cached, so an invalid token is
+    looked up every time and the user of a cached token is active.
+    `request.auth` is an unsaved `Token` with the key and user.
+    """
+
+    def authenticate_credentials(self, key):
+        user = token_cache.get(key)
+        if user is not None:
+            return user, Token(key=key, user=user)
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, user)
+        return user, token
@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from auctions.activity import bid_activity, record_bids
+from auctions.models import Listing, Bid
+
+
+class BidConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Another bid was placed first, the bid amount is no longer greater than the current bid."
+    default_code = "bid_conflict"
+
+
+class AuctionClosed(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The auction has ended, bids are no longer accepted."
+    default_code = "auction_closed"
+
+
+class BidTimeout(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "The bid could not be processed in time, please check the listing before bidding again."
+    default_code = "bid_timeout"
+
+
+def place_bid(listing, bidder, bid_amount):
+    """
+    Place a bid of `bid_amount` (a Decimal) on `listing` and return it.
+
+    The current bid is raised with a single conditional UPDATE, so the
+    database decides which of two concurrent bids wins instead of a
+    read-modify-write in Python. Raises `BidConflict` if the current bid
+    is already greater than or equal to `bid_amount` by the time the
+    UPDATE runs, or `AuctionClosed` if the auction has ended.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        listings = Listing.objects.filter(pk=listing.pk).accepting_bids(now)
+        updated = listings.filter(current_bid__lt=bid_amount).bump_version(
+            current_bid=bid_amount, **bid_activity(bidder, now),
+        )
+        if not updated:
+            raise BidConflict() if listings.exists() else AuctionClosed()
+        bid = Bid(listing=listing, bidder=bidder, bid_amount=bid_amount, bid_date=now)
+        bid.bumps_listing = False
+        bid.save()
+        record_bids(listing.pk, now)
+    listing.current_bid = bid_amount
+    return bid
+
+
+class PendingBid:
+    """
+    A bid waiting in a `BidBatcher` queue.
+    """
+    def __init__(self, listing, bidder, bid_amount):
+        self.listing = listing
+        self.bidder = bidder
+        self.bid_amount = bid_amount
+        self.bid = None
+        self.error = None
+        self.done = threading.Event()
+
+    def resolve(self, bid=None, error=None):
+        self.bid = bid
+        self.error = error
+        self.done.set()
+
+    def result(self, timeout=None):
+        """
+        Wait for the batch holding this bid to be written and return the
+        `Bid`, or raise the reason it was rejected.
+        """
+        if not self.done.wait(timeout):
+            raise BidTimeout()
+        if self.error is not None:
+            raise self.error
+        return self.bid
+
+
+class BidBatcher:
+    """
+    Queue bids per listing and write them in batches from a single thread.
+
+    Every `window` seconds the writer thread takes the bids queued for each
+    listing, accepts them in arrival order as long as each one beats the
+    one before, inserts the accepted bids with one `bulk_create` and raises
+    the current bid once. This replaces one transaction per bid on the hot
+    listing row with one transaction per listing per window.
+    """
+    def __init__(self, window=0.005):
+        self.window = window
+        self._queues = defaultdict(list)
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def submit(self, listing, bidder, bid_amount):
+        pending = PendingBid(listing, bidder, bid_amount)
+        with self._condition:
+            self._queues[listing.pk].append(pending)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="bid-batcher", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return pending
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queues:
+                    self._condition.wait()
+            # Let the window fill up before taking the queued bids
+            time.sleep(self.window)
+            with self._condition:
+                queues, self._queues = self._queues, defaultdict(list)
+            for pending_bids in queues.values():
+                try:
+                    self.flush(pending_bids)
+                except Exception as error:
+                    for pending in pending_bids:
+                        if not pending.done.is_set():
+                            pending.resolve(error=error)
+
+    def flush(self, pending_bids):
+        """
+        Write a batch of bids on the same listing, resolving each of them.
+        """
+        listing = pending_bids[0].listing
+        while True:
+            now = timezone.now()
+            with transaction.atomic():
+                listings = Listing.objects.filter(pk=listing.pk).accepting_bids(now)
+                current_bid = listings.values_list("current_bid", flat=True).first()
+                if current_bid is None:
+                    for pending in pending_bids:
+                        pending.resolve(error=AuctionClosed())
+                    return
+                accepted = []
+                highest = current_bid
+                for pending in pending_bids:
+                    if pending.bid_amount > highest:
+                        accepted.append(pending)
+                        highest = pending.bid_amount
+                if not accepted:
+                    bids = []
+                    break
+                # Only applies if no bid was placed outside of the batch
+                # since the current bid was read, otherwise resolve again.
+                updates = bid_activity(accepted[-1].bidder, now, len(accepted))
+                if listings.filter(current_bid=current_bid).bump_version(current_bid=highest, **updates):
+                    bids = Bid.objects.bulk_create([
+                        Bid(listing=pending.listing, bidder=pending.bidder, bid_amount=pending.bid_amount, bid_date=now)
+                        for pending in accepted
+                    ])
+                    record_bids(listing.pk, now, len(bids))
+                    break
+
+        for pending, bid in zip(accepted, bids):
+            pending.resolve(bid=bid)
+        for pending in pending_bids:
+            if not pending.done.is_set():
+                pending.resolve(error=BidConflict())
+
+
+_bid_batcher = None
+_bid_batcher_lock = threading.Lock()
+
+
+def get_bid_batcher():
+    """
+    Return the process-wide `BidBatcher`, creating it on first use.
+    """
+    global _bid_batcher
+    with _bid_batcher_lock:
+        if _bid_batcher is None:
+            _bid_batcher = BidBatcher(window=settings.AUCTIONS_BID_BATCH_WINDOW)
+        return _bid_batcher
+
+
+def submit_bid(listing, bidder, bid_amount):
+    """
+    Place a bid through the batching queue and wait for its outcome.
+    """
+    pending = get_bid_batcher().submit(listing, bidder, bid_amount)
+    return pending.result(timeout=settings.AUCTIONS_BID_BATCH_TIMEOUT)
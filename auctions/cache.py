@@ -0,0 +1,129 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+
+# Evictions of each named LRU cache, shared like the cached data itself.
+_evictions = {}
+
+
+class LRUCache(LocMemCache):
+    """
+    Thread-safe in-memory cache that holds at most MAX_ENTRIES entries and
+    evicts the least recently used one to make room for a new one, instead
+    of culling a fraction of the cache. Evictions are counted.
+    """
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self._evictions = _evictions.setdefault(name, [0])
+
+    @property
+    def evictions(self):
+        return self._evictions[0]
+
+    def _set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        if key not in self._cache and len(self._cache) >= self._max_entries:
+            self._cull()
+        self._cache[key] = value
+        self._cache.move_to_end(key, last=False)
+        self._expire_info[key] = self.get_backend_timeout(timeout)
+
+    def _cull(self):
+        # Entries are kept from the most to the least recently used.
+        key, _ = self._cache.popitem()
+        del self._expire_info[key]
+        self._evictions[0] += 1
+
+
+class CountedCache:
+    """
+    Access to the cache `alias` counting the hits and misses of the
+    lookups.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "evictions": getattr(self.cache, "evictions", None),
+        }
+
+
+class ListingCache(CountedCache):
+    """
+    Cache of the serialized representation of listings.
+
+    Entries are stored with the version of the listing they were built
+    from and only returned while the listing is still at that version, so
+    a write that bumps the version can never be hidden by the cache. The
+    entries are also deleted by signals when a listing, bid or comment is
+    saved or deleted, to free the space early.
+    """
+
+    def key(self, listing_id):
+        return f"listing:{listing_id}"
+
+    def get(self, listing_id, version):
+        entry = self.cache.get(self.key(listing_id))
+        hit = entry is not None and entry[0] == version
+        self.count(hit)
+        return entry[1] if hit else None
+
+    def set(self, listing_id, version, data):
+        self.cache.set(self.key(listing_id), (version, dict(data)), timeout=None)
+
+    def invalidate(self, listing_id):
+        self.cache.delete(self.key(listing_id))
+
+
+class TokenCache(CountedCache):
+    """
+    Cache of the active user each API token authenticates, see
+    `auctions.authentication.CachedTokenAuthentication`.
+
+    Entries are deleted by signals when the token is deleted or its user
+    is saved or deleted. Entries expire after AUCTIONS_TOKEN_CACHE_TIMEOUT
+    seconds, which bounds how long a change that sends no signal (a
+    queryset update, or a signal handled by another process when the
+    cache is not shared) goes unnoticed.
+    """
+
+    def key(self, token_key):
+        return f"token:{token_key}"
+
+    def get(self, token_key):
+        user = self.cache.get(self.key(token_key))
+        self.count(user is not None)
+        return user
+
+    def set(self, token_key, user):
+        self.cache.set(self.key(token_key), user, timeout=settings.AUCTIONS_TOKEN_CACHE_TIMEOUT)
+
+    def invalidate(self, *token_keys):
+        self.cache.delete_many([self.key(token_key) for token_key in token_keys])
+
+
+listing_cache = ListingCache(settings.AUCTIONS_LISTING_CACHE)
+token_cache = TokenCache(settings.AUCTIONS_TOKEN_CACHE)
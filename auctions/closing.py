@@ -0,0 +1,100 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from auctions.models import Listing, Bid
+
+logger = logging.getLogger(__name__)
+
+
+def close_expired_auctions(now=None, batch_size=None):
+    """
+    Close one batch of at most `batch_size` auctions that ended by `now`,
+    record their winning bid (the highest one, the earliest on a tie) and
+    return the number closed.
+
+    The batch is picked from the `listing_open_ends_idx` partial index by
+    a subquery of the UPDATE closing it, so the write lock bidders wait for
+    is held for one statement per batch, and no read lock is held before
+    it (a read lock upgraded to a write lock can deadlock on SQLite). Bids
+    placed before the UPDATE are taken into account, the later ones are
+    rejected by `place_bid`.
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or settings.AUCTIONS_CLOSE_BATCH_SIZE
+    batch = Listing.objects.expired(now).values("id")[:batch_size]
+    winning_bid = Bid.objects.filter(listing=OuterRef("pk")).order_by("-bid_amount", "id").values("id")[:1]
+    with transaction.atomic():
+        return Listing.objects.filter(pk__in=batch).bump_version(active=False, winning_bid=Subquery(winning_bid))
+
+
+def close_all_expired_auctions(now=None, batch_size=None, pause=None):
+    """
+    Close the auctions that ended by `now` batch by batch, and return the
+    number closed. Sleeps `pause` seconds between two batches, for the
+    writers waiting on the database lock to get it.
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or settings.AUCTIONS_CLOSE_BATCH_SIZE
+    pause = settings.AUCTIONS_CLOSE_PAUSE if pause is None else pause
+    total = 0
+    while True:
+        closed = close_expired_auctions(now, batch_size)
+        total += closed
+        if closed < batch_size:
+            return total
+        time.sleep(pause)
+
+
+class AuctionCloser:
+    """
+    Close expired auctions from a daemon thread, sweeping every `interval`
+    seconds, and right away again while full batches keep coming.
+    """
+    def __init__(self, interval, batch_size=None):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="auction-closer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def run(self):
+        try:
+            while not self._stopped.is_set():
+                try:
+                    close_all_expired_auctions(batch_size=self.batch_size)
+                except Exception:
+                    logger.exception("Closing expired auctions failed")
+                self._stopped.wait(self.interval)
+        finally:
+            connection.close()
+
+
+_auction_closer = None
+_auction_closer_lock = threading.Lock()
+
+
+def start_auction_closer():
+    """
+    Start the process-wide `AuctionCloser` if AUCTIONS_CLOSE_IN_PROCESS is
+    set, once.
+    """
+    global _auction_closer
+    with _auction_closer_lock:
+        if _auction_closer is None and settings.AUCTIONS_CLOSE_IN_PROCESS:
+            _auction_closer = AuctionCloser(interval=settings.AUCTIONS_CLOSE_INTERVAL)
+            _auction_closer.start()
+        return _auction_closer
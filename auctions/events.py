@@ -0,0 +1,31 @@
+from django.db import transaction
+
+from auctions.pubsub import get_hub
+from auctions.renderers import FastJSONRenderer
+from auctions.serializers import BidSerializer
+
+
+def bid_channel(listing_id):
+    return f"listing:{listing_id}:bids"
+
+
+def bid_event(bid):
+    """
+    Return the server-sent event of a new bid, with the bid id as event id.
+    The data is the bid as serialized by the bid list.
+    """
+    data = FastJSONRenderer().render(BidSerializer(bid).data).decode()
+    return f"id: {bid.id}\nevent: bid\ndata: {data}\n\n"
+
+
+def event_id(event):
+    return int(event[len("id: "):event.index("\n")])
+
+
+def publish_bid(bid):
+    """
+    Publish a new bid to the stream of its listing once the current
+    transaction is committed, so subscribers never see a rolled back bid.
+    """
+    event = bid_event(bid)
+    transaction.on_commit(lambda: get_hub().publish(bid_channel(bid.listing_id), event))
@@ -0,0 +1,95 @@
+import csv
+import datetime
+import json
+from decimal import Decimal
+
+from auctions.models import Listing, Bid, Comment
+
+# Rows of each export: the queryset and its (column name, lookup) pairs.
+EXPORTS = {
+    "listings": (Listing.objects.all(), [
+        ("id", "id"), ("owner", "owner__username"), ("name", "name"), ("description", "description"),
+        ("starting_bid", "starting_bid"), ("current_bid", "current_bid"), ("created_at", "created_at"),
+        ("image_url", "image_url"), ("active", "active"), ("category", "category"),
+    ]),
+    "bids": (Bid.objects.all(), [
+        ("id", "id"), ("listing_id", "listing_id"), ("bidder", "bidder__username"),
+        ("bid_amount", "bid_amount"), ("bid_date", "bid_date"),
+    ]),
+    "comments": (Comment.objects.all(), [
+        ("id", "id"), ("listing_id", "listing_id"), ("commentor", "commentor__username"),
+        ("text", "text"), ("comment_at", "comment_at"),
+    ]),
+}
+
+CHUNK_SIZE = 2000
+
+# Rows joined into each chunk of the response, writing a chunk per row
+# costs more than encoding it.
+ROWS_PER_WRITE = 500
+
+
+def export_rows(name, since=None, chunk_size=CHUNK_SIZE):
+    """
+    Return the column names of the `name` export and an iterator over its
+    rows, as tuples, in id order and after the id `since` if given.
+
+    The rows are streamed from the database `chunk_size` at a time without
+    building model instances, so memory does not grow with the table.
+    """
+    queryset, columns = EXPORTS[name]
+    queryset = queryset.order_by("id")
+    if since is not None:
+        queryset = queryset.filter(id__gt=since)
+    names = [column for column, _ in columns]
+    rows = queryset.values_list(*[lookup for _, lookup in columns]).iterator(chunk_size=chunk_size)
+    return names, rows
+
+
+def _value(value):
+    # Same representation as the API: decimals as strings, UTC as "Z".
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        value = value.isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+    return value
+
+
+def ndjson_lines(names, rows):
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    for row in rows:
+        yield encoder.encode(dict(zip(names, map(_value, row)))) + "\n"
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def csv_lines(names, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(names)
+    for row in rows:
+        yield writer.writerow([_value(value) for value in row])
+
+
+FORMATS = {
+    "ndjson": ndjson_lines,
+    "csv": csv_lines,
+}
+
+
+def stream_export(name, format="ndjson", since=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield the `name` export encoded as `format`, ROWS_PER_WRITE rows at a time.
+    """
+    names, rows = export_rows(name, since=since, chunk_size=chunk_size)
+    batch = []
+    for line in FORMATS[format](names, rows):
+        batch.append(line)
+        if len(batch) == ROWS_PER_WRITE:
+            yield "".join(batch)
+            batch = []
+    if batch:
+        yield "".join(batch)
@@ -0,0 +1,85 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from auctions.activity import bid_bucket
+from auctions.models import Listing, ListingBidBucket
+
+
+def recent_bids(listings, window, now, weighted=False):
+    """
+    Annotate `listings` with the `score` of the bids placed on them in the
+    last `window` seconds, counted from the feed buckets, and order them by
+    it. With `weighted`, a bid counts for the number of buckets between
+    the oldest bucket of the window and its own, so recent bids weigh more.
+    """
+    first = bid_bucket(now - timedelta(seconds=window)) + 1
+    count = F("bid_buckets__bid_count")
+    if weighted:
+        count = count * (F("bid_buckets__bucket") - first + 1)
+    return (
+        listings.accepting_bids(now).filter(bid_buckets__bucket__gte=first)
+        .annotate(score=Sum(count)).order_by("-score", "-id")
+    )
+
+
+def trending(listings, limit, now=None):
+    now = now or timezone.now()
+    return list(recent_bids(listings, settings.AUCTIONS_FEED_TRENDING_WINDOW, now, weighted=True)[:limit])
+
+
+def most_bid(listings, limit, now=None):
+    now = now or timezone.now()
+    return list(recent_bids(listings, settings.AUCTIONS_FEED_MOST_BID_WINDOW, now)[:limit])
+
+
+def ending_soon(listings, limit, now=None):
+    # Read from the listing_open_ends_idx partial index.
+    return list(listings.filter(active=True, ends_at__gt=now or timezone.now()).order_by("ends_at", "id")[:limit])
+
+
+def newest_per_category(listings, limit, now=None):
+    """
+    Return the `limit` newest active listings of each category, by
+    category, with one query: each category is an indexed subquery of the
+    same WHERE clause.
+    """
+    newest = Q()
+    for category, _ in Listing.CATEGORY_CHOICES:
+        # `active__in` rather than `active=True`, which compiles to a bare
+        # "active" that SQLite cannot match against the index column.
+        ids = Listing.objects.filter(category=category, active__in=[True]).order_by("-created_at", "-id").values("id")[:limit]
+        newest |= Q(pk__in=ids)
+    by_category = {category: [] for category, _ in Listing.CATEGORY_CHOICES}
+    # Annotated, the category is loaded whichever fields are asked for.
+    for listing in listings.filter(newest).annotate(feed_category=F("category")).order_by("-created_at", "-id"):
+        by_category[listing.feed_category].append(listing)
+    return by_category
+
+
+def compact_bid_buckets(now=None, batch_size=10000):
+    """
+    Delete the feed buckets older than AUCTIONS_FEED_RETENTION, one
+    indexed batch of at most `batch_size` per statement, and return the
+    number deleted.
+    """
+    cutoff = bid_bucket((now or timezone.now()) - timedelta(seconds=settings.AUCTIONS_FEED_RETENTION))
+    old = ListingBidBucket.objects.filter(bucket__lt=cutoff).order_by("bucket").values("id")
+    total = 0
+    while True:
+        deleted, _ = ListingBidBucket.objects.filter(pk__in=old[:batch_size]).delete()
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+# The feeds by name: functions returning the listings of a feed, or the
+# listings by category.
+FEEDS = {
+    "trending": trending,
+    "most-bid": most_bid,
+    "ending-soon": ending_soon,
+    "newest": newest_per_category,
+}
@@ -0,0 +1,73 @@
+from decimal import Decimal, InvalidOperation
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+from auctions.models import Listing
+
+
+class ListingFilter(BaseFilterBackend):
+    """
+    Filter listings on `?active=`, `?category=` (repeated or comma
+    separated), `?min_price=`/`?max_price=` (on the current bid) and
+    `?created_since=`, and order them with `?ordering=`.
+
+    Every combination can be answered from one of the indexes declared on
+    `Listing`, see `ListingFilterTestCase` for the query plans.
+    """
+    orderings = {
+        "-created_at": ("-created_at", "-id"),
+        "created_at": ("created_at", "id"),
+        "-current_bid": ("-current_bid", "-id"),
+        "current_bid": ("current_bid", "id"),
+    }
+    default_ordering = "-created_at"
+    categories = {value for value, _ in Listing.CATEGORY_CHOICES}
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        filters = {}
+
+        active = params.get("active")
+        if active is not None:
+            if active.lower() not in ("true", "false", "1", "0"):
+                raise serializers.ValidationError({"active": ["Must be true or false."]})
+            filters["active"] = active.lower() in ("true", "1")
+
+        categories = [category for value in params.getlist("category") for category in value.split(",") if category]
+        if categories:
+            unknown = set(categories) - self.categories
+            if unknown:
+                raise serializers.ValidationError({"category": [f"Unknown category: {', '.join(sorted(unknown))}."]})
+            filters["category__in"] = categories
+
+        for param, lookup in (("min_price", "current_bid__gte"), ("max_price", "current_bid__lte")):
+            if param in params:
+                try:
+                    price = Decimal(params[param])
+                except InvalidOperation:
+                    price = None
+                if price is None or not price.is_finite():
+                    raise serializers.ValidationError({param: ["A valid number is required."]})
+                filters[lookup] = price
+
+        if "created_since" in params:
+            try:
+                created_since = parse_datetime(params["created_since"])
+            except ValueError:
+                created_since = None
+            if created_since is None:
+                raise serializers.ValidationError({"created_since": ["A valid ISO 8601 datetime is required."]})
+            if timezone.is_naive(created_since):
+                created_since = timezone.make_aware(created_since)
+            filters["created_at__gte"] = created_since
+
+        return queryset.filter(**filters).order_by(*self.get_ordering(request, queryset, view))
+
+    def get_ordering(self, request, queryset, view):
+        ordering = request.query_params.get("ordering", self.default_ordering)
+        if ordering not in self.orderings:
+            raise serializers.ValidationError({"ordering": [f"Must be one of {', '.join(self.orderings)}."]})
+        return self.orderings[ordering]
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    Django's PBKDF2 hasher with the AUCTIONS_PASSWORD_ITERATIONS work
+    factor. The algorithm name is unchanged, so existing hashes are still
+    checked, and rehashed at the next login when the work factor changed.
+    """
+
+    @property
+    def iterations(self):
+        return settings.AUCTIONS_PASSWORD_ITERATIONS
@@ -0,0 +1,239 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets, in milliseconds for the timings.
+TIME_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+_timings = ContextVar("timings", default=None)
+
+
+class RequestTimings:
+    """
+    What the current request spent, in milliseconds, by part: `db` for
+    the queries, `auth`, `view`, `serialize` and `render`.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.durations = {}
+
+    def add(self, name, duration):
+        self.durations[name] = self.durations.get(name, 0) + duration
+
+    def server_timing(self, total):
+        entries = [f'db;dur={self.durations.get("db", 0):.1f};desc="{self.queries} queries"']
+        for name in ("auth", "view", "serialize", "render"):
+            if name in self.durations:
+                entries.append(f"{name};dur={self.durations[name]:.1f}")
+        entries.append(f"total;dur={total:.1f}")
+        return ", ".join(entries)
+
+
+@contextmanager
+def timed(name):
+    """
+    Add the time spent in the block to the `name` timing of the current
+    request, if it is instrumented.
+    """
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, (time.perf_counter() - started) * 1000)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper counting the queries of the current request
+    and their time, and logging the ones slower than AUCTIONS_SLOW_QUERY_MS.
+    """
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = (time.perf_counter() - started) * 1000
+        timings = _timings.get()
+        if timings is not None:
+            timings.queries += 1
+            timings.add("db", duration)
+        if duration >= settings.AUCTIONS_SLOW_QUERY_MS:
+            logger.warning("Slow query (%.1fms) on %s: %s", duration, context["connection"].alias, sql)
+
+
+def instrument(connection):
+    """
+    Add `record_query` to the execute wrappers of `connection` for good.
+
+    Not `connection.execute_wrapper()` around each request: the async
+    views query from threads of their own, with connections of their own,
+    which are instrumented when they connect.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class Histogram:
+    """
+    Counts of observed values per bucket, the last bucket holding the
+    values above the last bound.
+    """
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """
+        Return the upper bound of the bucket holding the `q` quantile, None
+        if it is above the last bound.
+        """
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def as_dict(self):
+        labels = [str(bound) for bound in self.bounds] + ["+Inf"]
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class Metrics:
+    """
+    Per-route histograms of the request timings and query counts, for the
+    requests served by this process.
+    """
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, timings, total):
+        with self._lock:
+            histograms = self._routes.get(route)
+            if histograms is None:
+                histograms = self._routes[route] = {"queries": Histogram(QUERY_BUCKETS), "total": Histogram(TIME_BUCKETS)}
+            histograms["queries"].observe(timings.queries)
+            histograms["total"].observe(total)
+            for name, duration in timings.durations.items():
+                if name not in histograms:
+                    histograms[name] = Histogram(TIME_BUCKETS)
+                histograms[name].observe(duration)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                route: {name: histogram.as_dict() for name, histogram in histograms.items()}
+                for route, histograms in sorted(self._routes.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+metrics = Metrics()
+
+
+def route_name(request):
+    match = getattr(request, "resolver_match", None)
+    return f"{request.method} {match.route if match is not None else '<unmatched>'}"
+
+
+class ServerTimingMiddleware:
+    """
+    Time each request and send its timings in a `Server-Timing` header,
+    and record them in `metrics`. Only used if AUCTIONS_INSTRUMENTATION is
+    set.
+
+    `view` is the time from the view being called to its response being
+    returned, `render` the rendering of a DRF response after it. `db`,
+    `auth` and `serialize` are parts of them.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.AUCTIONS_INSTRUMENTATION:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token, started = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _timings.reset(token)
+        return self.finish(request, response, started)
+
+    async def __acall__(self, request):
+        token, started = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _timings.reset(token)
+        return self.finish(request, response, started)
+
+    def start(self, request):
+        for connection in connections.all(initialized_only=True):
+            instrument(connection)
+        request.timings = RequestTimings()
+        return _timings.set(request.timings), time.perf_counter()
+
+    def finish(self, request, response, started):
+        timings = request.timings
+        if "view" not in timings.durations and hasattr(request, "view_started"):
+            timings.add("view", (time.perf_counter() - request.view_started) * 1000)
+        total = (time.perf_counter() - started) * 1000
+        response["Server-Timing"] = timings.server_timing(total)
+        metrics.record(route_name(request), timings, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Called once the view returned a response still to be rendered.
+        request.timings.add("view", (time.perf_counter() - request.view_started) * 1000)
+        render_started = time.perf_counter()
+
+        def rendered(response):
+            request.timings.add("render", (time.perf_counter() - render_started) * 1000)
+        response.add_post_render_callback(rendered)
+        return response
@@ -0,0 +1,226 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+from decimal import Decimal
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from auctions import urls
+from auctions.export import EXPORTS
+from auctions.feeds import FEEDS
+from auctions.models import User, Listing, Bid, Comment
+from auctions.seeding import WORDS
+
+
+def percentile(latencies, q):
+    """
+    Nearest-rank `q` percentile of the sorted `latencies`.
+    """
+    return latencies[max(0, min(len(latencies), round(q / 100 * len(latencies))) - 1)]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Scenario:
+    """
+    The requests the benchmark sends to each route of auctions/urls.py,
+    against the seeded data: the hottest listing, the one with the most
+    bids, for the listing routes, a regular user and an admin, both
+    authenticated with a token.
+    """
+
+    def __init__(self, user, admin, listing):
+        self.user = user
+        self.admin = admin
+        self.listing = listing
+        self.bid_amount = listing.current_bid
+        self.last_bid = Bid.objects.filter(listing=listing).order_by("-id").values_list("id", flat=True).first()
+        self.since = {
+            name: max((queryset.order_by("-id").values_list("id", flat=True).first() or 0) - 100, 0)
+            for name, (queryset, _) in EXPORTS.items()
+        }
+        self.calls = 0
+
+    def requests(self):
+        """
+        Return the requests of one round, each route at least once, as
+        (url name, method, user or None, path, client options).
+        """
+        self.calls += 1
+        n = self.calls
+        listing = {"pk": self.listing.pk}
+        feed = list(FEEDS)[n % len(FEEDS)]
+        export = list(EXPORTS)[n % len(EXPORTS)]
+        user, admin, anonymous = self.user, self.admin, None
+        return [
+            ("api-root", "GET", anonymous, reverse("api-root"), {}),
+            ("login", "POST", anonymous, reverse("login"), {"data": {"username": "bench-api-user", "password": "bench-password"}}),
+            ("register", "POST", anonymous, reverse("register"), {"data": {
+                "username": f"bench-api-register-{n}", "email": f"bench-api-register-{n}@example.com", "password": "bench-password",
+            }}),
+            ("user-list", "GET", admin, reverse("user-list"), {}),
+            ("user-detail", "GET", admin, reverse("user-detail", kwargs={"pk": self.listing.owner_id}), {}),
+            ("listing-list", "GET", anonymous, reverse("listing-list"), {}),
+            ("listing-list", "POST", user, reverse("listing-list"), {"data": self.new_listing(n)}),
+            ("listing-bulk", "POST", user, reverse("listing-bulk"), {"data": [self.new_listing(f"{n}-{i}") for i in range(10)]}),
+            ("listing-search", "GET", anonymous, reverse("listing-search"), {"data": {"q": WORDS[n % len(WORDS)]}}),
+            ("listing-feed", "GET", anonymous, reverse("listing-feed", kwargs={"name": feed}), {}),
+            ("listing-detail", "GET", anonymous, reverse("listing-detail", kwargs=listing), {}),
+            ("bid-list", "GET", user, reverse("bid-list", kwargs=listing), {}),
+            ("bid-list", "POST", user, reverse("bid-list", kwargs=listing), {"data": {"bid_amount": str(self.next_bid())}}),
+            ("bid-stream", "GET", user, reverse("bid-stream", kwargs=listing), {"data": {"last_event_id": self.last_bid - 1}}),
+            ("comment-list", "GET", user, reverse("comment-list", kwargs=listing), {}),
+            ("comment-list", "POST", user, reverse("comment-list", kwargs=listing), {"data": {"text": f"Benchmark comment {n}."}}),
+            ("bid-replay", "POST", admin, reverse("bid-replay"), {"data": [
+                {"listing": self.listing.pk, "bidder": "bench-api-user", "bid_amount": str(self.next_bid())} for _ in range(10)
+            ]}),
+            ("cache-stats", "GET", admin, reverse("cache-stats"), {}),
+            ("metrics", "GET", admin, reverse("metrics"), {}),
+            ("export", "GET", admin, reverse("export", kwargs={"name": export}), {"data": {"since": self.since[export]}}),
+        ]
+
+    def new_listing(self, n):
+        return {
+            "name": f"Bench listing {n}", "description": "Created by the API benchmark.",
+            "starting_bid": "10.00", "current_bid": "10.00", "category": "Other",
+        }
+
+    def next_bid(self):
+        self.bid_amount += Decimal("0.01")
+        return self.bid_amount
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive every route of auctions/urls.py in-process against the data of seed_auctions, report the "
+        "p50/p95/p99 latency, queries per request and throughput of each, and write them as JSON to compare "
+        "across commits. The requests run in a transaction rolled back at the end, so runs are repeatable."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50, help="Requests per route.")
+        parser.add_argument("--warmup", type=int, default=2, help="Rounds of requests sent before measuring.")
+        parser.add_argument("--output", help="Write the results as JSON to this file.")
+        parser.add_argument("--compare", help="JSON results of an earlier run to compare with.")
+        parser.add_argument(
+            "--threshold", type=float, default=0.2,
+            help="Relative increase of the p95 latency or the throughput drop flagged as a regression.",
+        )
+        parser.add_argument("--fail-on-regression", action="store_true", help="Fail if a route regressed.")
+
+    def handle(self, *args, **options):
+        listing = Listing.objects.filter(active=True).order_by("-bid_count", "id").first()
+        if listing is None or not listing.bid_count:
+            raise CommandError("There are no listings with bids to benchmark, run seed_auctions first.")
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as file:
+                baseline = json.load(file)
+
+        with override_settings(ALLOWED_HOSTS=["testserver"]), transaction.atomic():
+            user = User.objects.create_user(username="bench-api-user", password="bench-password")
+            admin = User.objects.create_superuser(username="bench-api-admin", password="bench-password")
+            scenario = Scenario(user, admin, listing)
+            clients = {None: APIClient()}
+            for client_user in (user, admin):
+                clients[client_user] = APIClient()
+                clients[client_user].credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=client_user).key}")
+
+            for _ in range(options["warmup"]):
+                for request in scenario.requests():
+                    self.send(clients, *request)
+            samples = {}
+            for _ in range(options["requests"]):
+                for request in scenario.requests():
+                    label = f"{request[1]} {request[0]}"
+                    samples.setdefault(label, []).append(self.send(clients, *request))
+            transaction.set_rollback(True)
+
+        results = {
+            "commit": git_commit(),
+            "created_at": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "data": {model.__name__.lower(): model.objects.count() for model in (User, Listing, Bid, Comment)},
+            "routes": {label: self.summarize(route_samples) for label, route_samples in samples.items()},
+        }
+        missing = {pattern.name for pattern in urls.urlpatterns} - {label.split(" ")[1] for label in results["routes"]}
+        if missing:
+            raise CommandError(f"The benchmark does not cover {', '.join(sorted(missing))}.")
+        self.report(results, baseline, options["threshold"])
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(f"Wrote {options['output']}.")
+        regressions = self.regressions(results, baseline, options["threshold"]) if baseline else []
+        if regressions and options["fail_on_regression"]:
+            raise CommandError(f"{len(regressions)} routes regressed: {', '.join(regressions)}")
+
+    def send(self, clients, name, method, client_user, path, options):
+        client = clients[client_user]
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = getattr(client, method.lower())(path, format="json" if method != "GET" else None, **options)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        return elapsed, len(context.captured_queries), response.status_code < 400
+
+    def summarize(self, samples):
+        latencies = sorted(elapsed * 1000 for elapsed, _, _ in samples)
+        return {
+            "requests": len(samples),
+            "errors": sum(1 for _, _, ok in samples if not ok),
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+            "queries": round(statistics.mean(queries for _, queries, _ in samples), 2),
+            "requests_per_sec": round(len(samples) / (sum(latencies) / 1000), 1),
+        }
+
+    def regressions(self, results, baseline, threshold):
+        """
+        Return the routes whose p95 latency grew or whose throughput fell by
+        more than `threshold`, or which send more queries, than in `baseline`.
+        """
+        regressed = []
+        for label, route in results["routes"].items():
+            before = baseline["routes"].get(label)
+            if before is not None and (
+                route["p95_ms"] > before["p95_ms"] * (1 + threshold)
+                or route["requests_per_sec"] < before["requests_per_sec"] * (1 - threshold)
+                or route["queries"] > before["queries"]
+            ):
+                regressed.append(label)
+        return regressed
+
+    def report(self, results, baseline, threshold):
+        regressions = set(self.regressions(results, baseline, threshold)) if baseline else set()
+        for label, route in results["routes"].items():
+            line = (
+                f"{label}: p50 {route['p50_ms']:.1f}ms, p95 {route['p95_ms']:.1f}ms, p99 {route['p99_ms']:.1f}ms, "
+                f"{route['queries']:g} queries, {route['requests_per_sec']:.0f} requests/sec"
+            )
+            if route["errors"]:
+                line += f", {route['errors']} errors"
+            before = baseline["routes"].get(label) if baseline else None
+            if before is not None:
+                line += f" (p95 was {before['p95_ms']:.1f}ms, {before['queries']:g} queries)"
+            if label in regressions:
+                line += " REGRESSED"
+            self.stdout.write(line)
@@ -0,0 +1,118 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from types import ModuleType
+from wsgiref.util import setup_testing_defaults
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import path
+
+from auctions import async_views, views
+from auctions.models import User, Listing, CollectionVersion
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve the listing list to many slow clients at once through commerce/wsgi.py with a fixed pool of "
+        "worker threads, and through commerce/asgi.py with the sync and the async views, and compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--connections", type=int, default=200, help="Concurrent client connections.")
+        parser.add_argument("--client-delay", type=float, default=0.05, help="Seconds each client takes to receive its response.")
+        parser.add_argument("--workers", type=int, default=8, help="Worker threads of the WSGI server.")
+        parser.add_argument("--listings", type=int, default=50, help="Listings created for the benchmark.")
+
+    def handle(self, *args, **options):
+        owner = User.objects.get_or_create(username="bench-async-owner")[0]
+        Listing.objects.bulk_create(
+            Listing(owner=owner, name=f"Bench listing {i}", description="Created by the async reads benchmark.",
+                    starting_bid=Decimal("1.00"), current_bid=Decimal("1.00"))
+            for i in range(options["listings"])
+        )
+        CollectionVersion.bump(Listing.COLLECTION)
+
+        from commerce.asgi import application as asgi_application
+        from commerce.wsgi import application as wsgi_application
+
+        runs = (
+            ("wsgi", views.ListingList, lambda: self.run_wsgi(wsgi_application, options)),
+            ("asgi, sync views", views.ListingList, lambda: asyncio.run(self.run_asgi(asgi_application, options))),
+            ("asgi, async views", async_views.ListingList, lambda: asyncio.run(self.run_asgi(asgi_application, options))),
+        )
+        try:
+            for label, view, run in runs:
+                urlconf = ModuleType("bench_urls")
+                urlconf.urlpatterns = [path("listings/", view.as_view(), name="listing-list")]
+                with override_settings(ROOT_URLCONF=urlconf, ALLOWED_HOSTS=["testserver"]):
+                    self.in_flight = self.peak = 0
+                    # Every client connects at the start, the latency of a
+                    # request includes the time it waited for a worker.
+                    self.started = time.perf_counter()
+                    results = run()
+                    elapsed = time.perf_counter() - self.started
+                self.report(label, results, elapsed)
+        finally:
+            Listing.objects.filter(owner=owner).delete()
+
+    def enter(self):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+
+    def run_wsgi(self, application, options):
+        def connection(_):
+            environ = {"PATH_INFO": "/listings/", "HTTP_HOST": "testserver"}
+            setup_testing_defaults(environ)
+            status = []
+            body = application(environ, lambda code, headers, exc_info=None: status.append(code))
+            self.enter()
+            try:
+                for _ in body:
+                    # A slow client keeps the worker busy writing to it.
+                    time.sleep(options["client_delay"])
+            finally:
+                body.close()
+                self.in_flight -= 1
+            return status[0].startswith("200"), time.perf_counter() - self.started
+
+        # Every worker handles one connection at a time, like a threaded
+        # WSGI server (gunicorn --threads, mod_wsgi, ...).
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            return list(pool.map(connection, range(options["connections"])))
+
+    async def run_asgi(self, application, options):
+        async def connection():
+            scope = {
+                "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+                "scheme": "http", "path": "/listings/", "raw_path": b"/listings/", "query_string": b"",
+                "headers": [(b"host", b"testserver")], "server": ("testserver", 80), "client": ("127.0.0.1", 0),
+            }
+            status = []
+
+            async def receive():
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    status.append(message["status"])
+                    self.enter()
+                elif not message.get("more_body"):
+                    await asyncio.sleep(options["client_delay"])
+                    self.in_flight -= 1
+
+            await application(scope, receive, send)
+            return status[0] == 200, time.perf_counter() - self.started
+
+        return await asyncio.gather(*(connection() for _ in range(options["connections"])))
+
+    def report(self, label, results, elapsed):
+        latencies = sorted(latency for _, latency in results)
+        ok = sum(1 for success, _ in results if success)
+        self.stdout.write(
+            f"{label}: {ok}/{len(results)} OK in {elapsed:.2f}s, {len(results) / elapsed:.0f} requests/sec, "
+            f"peak {self.peak} connections served at once, "
+            f"p50 {statistics.median(latencies) * 1000:.0f}ms, p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.0f}ms"
+        )
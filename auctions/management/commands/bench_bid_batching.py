@@ -0,0 +1,77 @@
+import threading
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+
+from auctions.bidding import BidBatcher, BidConflict, place_bid
+from auctions.models import User, Listing
+
+
+BID_INCREMENT = Decimal("0.01")
+
+
+class Command(BaseCommand):
+    help = "Compare bids/sec on a single hot listing between per-request bid placement and the batching queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16, help="Number of concurrent bidders.")
+        parser.add_argument("--bids", type=int, default=50, help="Bids attempted by each bidder.")
+        parser.add_argument("--window", type=float, default=0.005, help="Batching window in seconds.")
+
+    def handle(self, *args, **options):
+        owner = User.objects.get_or_create(username="bench-owner")[0]
+        bidders = [
+            User.objects.get_or_create(username=f"bench-bidder-{i}")[0]
+            for i in range(options["threads"])
+        ]
+        batcher = BidBatcher(window=options["window"])
+
+        def per_request(listing, bidder, bid_amount):
+            place_bid(listing, bidder, bid_amount)
+
+        def batched(listing, bidder, bid_amount):
+            batcher.submit(listing, bidder, bid_amount).result(timeout=30)
+
+        for label, bid in (("per-request", per_request), ("batched", batched)):
+            listing = Listing.objects.create(
+                owner=owner, name=f"Bench listing ({label})", description="Hot listing for the bid benchmark.",
+                starting_bid=Decimal("1.00"), current_bid=Decimal("1.00"),
+            )
+            counts = self.run(listing, bidders, options["bids"], bid)
+            self.stdout.write(
+                f"{label}: {counts['attempts']} bids in {counts['elapsed']:.2f}s, "
+                f"{counts['attempts'] / counts['elapsed']:.0f} bids/sec "
+                f"({counts['accepted']} accepted, {counts['conflicts']} conflicts, {counts['locked']} locked)"
+            )
+
+    def run(self, listing, bidders, bids, bid):
+        counts = {"accepted": 0, "conflicts": 0, "locked": 0}
+        lock = threading.Lock()
+
+        def bid_loop(index, bidder):
+            try:
+                for _ in range(bids):
+                    try:
+                        current = Listing.objects.only("id", "name", "current_bid").get(pk=listing.pk)
+                        bid(current, bidder, current.current_bid + BID_INCREMENT * (index + 1))
+                        outcome = "accepted"
+                    except BidConflict:
+                        outcome = "conflicts"
+                    except OperationalError:
+                        outcome = "locked"
+                    with lock:
+                        counts[outcome] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=bid_loop, args=(index, bidder)) for index, bidder in enumerate(bidders)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counts["elapsed"] = time.perf_counter() - started
+        counts["attempts"] = counts["accepted"] + counts["conflicts"] + counts["locked"]
+        return counts
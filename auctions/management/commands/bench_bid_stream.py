@@ -0,0 +1,90 @@
+import asyncio
+import resource
+import threading
+import time
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from auctions.bidding import place_bid
+from auctions.events import publish_bid
+from auctions.models import User, Listing
+
+
+class Command(BaseCommand):
+    help = (
+        "Open many idle bid streams through commerce/asgi.py, report the memory held per subscriber "
+        "and how long a new bid takes to reach all of them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--subscribers", type=int, default=5000, help="Concurrent bid stream connections.")
+
+    def handle(self, *args, **options):
+        owner = User.objects.get_or_create(username="bench-stream-owner")[0]
+        token = Token.objects.get_or_create(user=owner)[0]
+        listing = Listing.objects.create(
+            owner=owner, name="Bench listing", description="Created by the bid stream benchmark.",
+            starting_bid=Decimal("1.00"), current_bid=Decimal("1.00"),
+        )
+        try:
+            with override_settings(ALLOWED_HOSTS=["testserver"]):
+                asyncio.run(self.run(listing, token, options["subscribers"]))
+        finally:
+            listing.delete()
+
+    async def run(self, listing, token, subscribers):
+        from commerce.asgi import application
+
+        path = reverse("bid-stream", kwargs={"pk": listing.pk}).encode()
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": path.decode(), "raw_path": path, "query_string": b"",
+            "headers": [(b"host", b"testserver"), (b"authorization", f"Token {token.key}".encode())],
+            "server": ("testserver", 80), "client": ("127.0.0.1", 0),
+        }
+        connected = asyncio.Semaphore(0)
+        received = asyncio.Semaphore(0)
+
+        def receive():
+            # The clients send no body and stay connected.
+            messages = asyncio.Queue()
+            messages.put_nowait({"type": "http.request", "body": b"", "more_body": False})
+            return messages.get
+
+        async def send(message):
+            body = message.get("body", b"")
+            if body.startswith(b"retry:"):
+                connected.release()
+            elif body.startswith(b"id:"):
+                received.release()
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        connections = [asyncio.create_task(application(dict(scope), receive(), send)) for _ in range(subscribers)]
+        for _ in range(subscribers):
+            await connected.acquire()
+        elapsed = time.perf_counter() - started
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        self.stdout.write(
+            f"{subscribers} subscribers connected in {elapsed:.2f}s, peak RSS {rss_before / 1024:.0f} -> {rss_after / 1024:.0f} MiB "
+            f"({(rss_after - rss_before) / subscribers:.1f} KiB per idle subscriber), {threading.active_count()} threads"
+        )
+
+        def bid():
+            listing.current_bid = Listing.objects.values_list("current_bid", flat=True).get(pk=listing.pk)
+            publish_bid(place_bid(listing, listing.owner, listing.current_bid + 1))
+
+        started = time.perf_counter()
+        await sync_to_async(bid)()
+        for _ in range(subscribers):
+            await received.acquire()
+        self.stdout.write(f"1 bid pushed to {subscribers} subscribers in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+        for connection in connections:
+            connection.cancel()
+        await asyncio.gather(*connections, return_exceptions=True)
@@ -0,0 +1,41 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from auctions.models import User, Listing
+
+
+class Command(BaseCommand):
+    help = "Compare creating listings with one POST each against a single bulk POST, in-process."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000, help="Number of listings created by each method.")
+
+    def handle(self, *args, **options):
+        seller = User.objects.get_or_create(username="bench-seller")[0]
+        client = APIClient()
+        client.force_authenticate(user=seller)
+        rows = [
+            {"name": f"Bench listing {i}", "description": "Created by the bulk create benchmark.",
+             "starting_bid": "10.00", "current_bid": "10.00", "category": "Other"}
+            for i in range(options["rows"])
+        ]
+
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            started = time.perf_counter()
+            for row in rows:
+                client.post(reverse("listing-list"), row, format="json")
+            single = time.perf_counter() - started
+
+            started = time.perf_counter()
+            response = client.post(reverse("listing-bulk"), json.dumps(rows), content_type="application/json")
+            bulk = time.perf_counter() - started
+
+        count = len(response.data["created"])
+        self.stdout.write(f"{options['rows']} single POSTs: {single:.2f}s, {options['rows'] / single:.0f} listings/sec")
+        self.stdout.write(f"1 bulk POST of {count} listings: {bulk:.2f}s, {count / bulk:.0f} listings/sec ({single / bulk:.1f}x)")
+        Listing.objects.filter(owner=seller).delete()
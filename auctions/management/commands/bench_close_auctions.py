@@ -0,0 +1,87 @@
+import statistics
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from auctions.bidding import BidConflict, place_bid
+from auctions.closing import close_all_expired_auctions
+from auctions.models import User, Listing, Bid
+
+
+class Command(BaseCommand):
+    help = (
+        "Close many expired auctions in batches while bids are placed on an open auction, "
+        "and report the closing rate and the bid latency meanwhile."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--auctions", type=int, default=20000, help="Expired auctions to close.")
+        parser.add_argument("--bids", type=int, default=2, help="Bids placed on each expired auction.")
+        parser.add_argument("--bidders", type=int, default=1, help="Threads bidding on an open auction meanwhile.")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Auctions closed per transaction.")
+
+    def handle(self, *args, **options):
+        owner = User.objects.get_or_create(username="bench-close-owner")[0]
+        bidder = User.objects.get_or_create(username="bench-close-bidder")[0]
+        ended = timezone.now() - timedelta(minutes=1)
+        Listing.objects.bulk_create([
+            Listing(owner=owner, name=f"Bench listing {i}", description="Created by the closing benchmark.",
+                    starting_bid=Decimal("1.00"), current_bid=Decimal("1.00") + options["bids"], ends_at=ended)
+            for i in range(options["auctions"])
+        ], batch_size=1000)
+        expired = Listing.objects.filter(owner=owner)
+        Bid.objects.bulk_create([
+            Bid(listing_id=pk, bidder=bidder, bid_amount=Decimal("1.00") + amount)
+            for pk in expired.values_list("id", flat=True)
+            for amount in range(1, options["bids"] + 1)
+        ], batch_size=1000)
+        listing = Listing.objects.create(
+            owner=owner, name="Bench open listing", description="Created by the closing benchmark.",
+            starting_bid=Decimal("1.00"), current_bid=Decimal("1.00"), ends_at=timezone.now() + timedelta(hours=1),
+        )
+
+        latencies = []
+        done = threading.Event()
+
+        def bid():
+            try:
+                while not done.is_set():
+                    started = time.perf_counter()
+                    try:
+                        place_bid(listing, bidder, listing.current_bid + 1)
+                    except BidConflict:
+                        # Outbid by another bidder thread.
+                        listing.current_bid += 1
+                        continue
+                    latencies.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+
+        try:
+            bidders = [threading.Thread(target=bid) for _ in range(options["bidders"])]
+            for bidder_thread in bidders:
+                bidder_thread.start()
+            started = time.perf_counter()
+            closed = close_all_expired_auctions(batch_size=options["batch_size"])
+            elapsed = time.perf_counter() - started
+            done.set()
+            for bidder_thread in bidders:
+                bidder_thread.join()
+
+            self.stdout.write(
+                f"Closed {closed} auctions in {elapsed:.2f}s, {closed / elapsed * 60:.0f} auctions/minute "
+                f"(batches of {options['batch_size']})"
+            )
+            if latencies:
+                latencies.sort()
+                self.stdout.write(
+                    f"{len(latencies)} concurrent bids, latency median {statistics.median(latencies) * 1000:.1f}ms, "
+                    f"max {latencies[-1] * 1000:.1f}ms"
+                )
+        finally:
+            Listing.objects.filter(owner=owner).delete()
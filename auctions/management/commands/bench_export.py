@@ -0,0 +1,65 @@
+import resource
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from auctions.export import FORMATS, stream_export
+from auctions.models import User, Listing, Bid
+
+
+class Command(BaseCommand):
+    help = (
+        "Insert synthetic bids, stream them through the bid export and report rows/sec and peak memory. "
+        "Run it against a scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bids", type=int, default=1000000, help="Number of synthetic bids.")
+        parser.add_argument("--format", choices=list(FORMATS), default="ndjson")
+        parser.add_argument("--keep", action="store_true", help="Keep the synthetic bids afterwards.")
+        parser.add_argument("--trace", action="store_true", help="Also report peak Python memory, which slows the export down.")
+
+    def handle(self, *args, **options):
+        bidder = User.objects.get_or_create(username="bench-bidder-0")[0]
+        listing = Listing.objects.create(
+            owner=bidder, name="Export benchmark", description="Listing holding the synthetic bids.",
+            starting_bid=Decimal("1.00"), current_bid=Decimal("1.00"),
+        )
+        since = Bid.objects.order_by("-id").values_list("id", flat=True).first() or 0
+        batch = 10000
+        for start in range(0, options["bids"], batch):
+            Bid.objects.bulk_create([
+                Bid(listing=listing, bidder=bidder, bid_amount=Decimal(f"{(start + i) % 9999 + 1}.00"))
+                for i in range(min(batch, options["bids"] - start))
+            ])
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if options["trace"]:
+            tracemalloc.start()
+        started = time.perf_counter()
+        rows = size = 0
+        for chunk in stream_export("bids", options["format"], since=since):
+            rows += chunk.count("\n")
+            size += len(chunk)
+        elapsed = time.perf_counter() - started
+        if options["trace"]:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        if options["format"] == "csv":
+            rows -= 1
+        self.stdout.write(
+            f"Exported {rows} bids ({size / 2 ** 20:.1f} MiB) in {elapsed:.2f}s, {rows / elapsed:.0f} rows/sec, "
+            f"peak RSS {rss_before / 1024:.0f} -> {rss_after / 1024:.0f} MiB"
+        )
+        if options["trace"]:
+            self.stdout.write(f"Peak Python memory during the export: {peak / 2 ** 20:.1f} MiB")
+
+        if not options["keep"]:
+            with connection.cursor() as cursor:
+                cursor.execute("DELETE FROM auctions_bid WHERE listing_id = %s", [listing.pk])
+            listing.delete()
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from auctions.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Log in through the login endpoint from a single thread, for each password work factor, "
+        "and report the logins per second of one core and the queries per login."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logins", type=int, default=20, help="Logins per work factor.")
+        parser.add_argument(
+            "--iterations", default="600000,100000,10000",
+            help="Comma-separated PBKDF2 work factors (AUCTIONS_PASSWORD_ITERATIONS) to compare.",
+        )
+
+    def handle(self, *args, **options):
+        client = APIClient()
+        url = reverse("login")
+        for iterations in [int(value) for value in options["iterations"].split(",")]:
+            with override_settings(ALLOWED_HOSTS=["testserver"], AUCTIONS_PASSWORD_ITERATIONS=iterations):
+                user = User.objects.create_user(username="bench-login", password="bench-password")
+                try:
+                    credentials = {"username": user.username, "password": "bench-password"}
+                    # The first login creates the token.
+                    client.post(url, credentials, format="json")
+                    with CaptureQueriesContext(connection) as context:
+                        started = time.perf_counter()
+                        for _ in range(options["logins"]):
+                            response = client.post(url, credentials, format="json")
+                        elapsed = time.perf_counter() - started
+                    assert response.status_code == 200, response.content
+                finally:
+                    user.delete()
+            self.stdout.write(
+                f"{iterations} iterations: {options['logins'] / elapsed:.1f} logins/sec on one core, "
+                f"{elapsed / options['logins'] * 1000:.1f}ms and {len(context.captured_queries) / options['logins']:.0f} queries per login"
+            )
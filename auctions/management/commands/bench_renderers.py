@@ -0,0 +1,94 @@
+import io
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from auctions.models import User, Listing, Bid, Comment
+from auctions.parsers import FastJSONParser, MessagePackParser
+from auctions.renderers import FastJSONRenderer, MessagePackRenderer, msgpack, orjson
+from auctions.rows import RowSerializer
+from auctions.serializers import ListingSerializer
+from auctions.views import listing_queryset, nested_querysets
+
+
+class StandardJSONRenderer(FastJSONRenderer):
+    use_orjson = False
+
+
+class StandardJSONParser(FastJSONParser):
+    use_orjson = False
+
+
+class Command(BaseCommand):
+    help = (
+        "Render a large page of listings with their nested bids and comments, and parse it back, with DRF's "
+        "JSONRenderer, FastJSONRenderer with and without orjson, and MessagePack, and report the time of each."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listings", type=int, default=200, help="Listings in the payload.")
+        parser.add_argument("--bids", type=int, default=20, help="Bids nested in each listing.")
+        parser.add_argument("--comments", type=int, default=5, help="Comments nested in each listing.")
+        parser.add_argument("--repeat", type=int, default=5, help="Runs of each case, the best one is reported.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.create(options)
+            fields = ListingSerializer.Meta.fields
+            row_serializer = RowSerializer.for_serializer(ListingSerializer())
+            data = {"next": None, "previous": None, "results": row_serializer.serialize(
+                list(row_serializer.values(listing_queryset(fields))), nested_querysets(fields),
+            )}
+            transaction.set_rollback(True)
+
+        cases = [("DRF JSONRenderer", JSONRenderer(), JSONParser())]
+        if orjson is not None:
+            cases.append(("FastJSONRenderer, orjson", FastJSONRenderer(), FastJSONParser()))
+        else:
+            self.stdout.write("orjson is not installed, FastJSONRenderer uses the standard library.")
+        cases.append(("FastJSONRenderer, standard library", StandardJSONRenderer(), StandardJSONParser()))
+        if msgpack is not None:
+            cases.append(("MessagePackRenderer", MessagePackRenderer(), MessagePackParser()))
+        else:
+            self.stdout.write("msgpack is not installed, MessagePack is not offered.")
+
+        for label, renderer, parser in cases:
+            body = renderer.render(data)
+            render = self.best(options["repeat"], lambda: renderer.render(data))
+            parse = self.best(options["repeat"], lambda: parser.parse(io.BytesIO(body)))
+            self.stdout.write(
+                f"{label}: {len(body) / 1024:.0f}KiB, render {render * 1000:.1f}ms ({len(body) / render / 2 ** 20:.0f}MiB/s), "
+                f"parse {parse * 1000:.1f}ms ({len(body) / parse / 2 ** 20:.0f}MiB/s)"
+            )
+
+    def create(self, options):
+        owner = User.objects.create_user(username="bench-renderers")
+        now = timezone.now()
+        listings = Listing.objects.bulk_create(
+            Listing(owner=owner, name=f"Bench listing {i} – ünïcode", description="Created by the renderers benchmark. " * 5,
+                    starting_bid=Decimal("1.00"), current_bid=Decimal("1.00") + options["bids"], image_url="https://example.com/image.jpg",
+                    ends_at=now + timedelta(days=1), bid_count=options["bids"], comment_count=options["comments"], top_bidder=owner)
+            for i in range(options["listings"])
+        )
+        Bid.objects.bulk_create(
+            Bid(listing=listing, bidder=owner, bid_amount=Decimal("1.00") + i, bid_date=now)
+            for listing in listings for i in range(1, options["bids"] + 1)
+        )
+        Comment.objects.bulk_create(
+            Comment(listing=listing, commentor=owner, text="A comment on the listing.")
+            for listing in listings for _ in range(options["comments"])
+        )
+
+    def best(self, repeat, function):
+        elapsed = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            function()
+            elapsed.append(time.perf_counter() - started)
+        return min(elapsed)
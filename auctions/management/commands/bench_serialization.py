@@ -0,0 +1,68 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from auctions.models import User, Listing, Bid, Comment
+from auctions.rows import RowSerializer
+from auctions.serializers import ListingSerializer, ListingSummarySerializer, BidSerializer, CommentSerializer
+from auctions.views import listing_queryset, nested_querysets
+
+
+class Command(BaseCommand):
+    help = (
+        "Serialize listings, bids and comments with the DRF serializers and from .values() rows with "
+        "RowSerializer, and report the rows serialized per second, with and without fetching them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000, help="Listings created, each with a bid and a comment.")
+        parser.add_argument("--repeat", type=int, default=5, help="Runs of each case, the best one is reported.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.create(options["rows"])
+            summary = ListingSummarySerializer.default_fields
+            full = ListingSerializer.Meta.fields
+            cases = [
+                ("listings", ListingSummarySerializer, {}, listing_queryset(summary), {}),
+                ("listings with bids and comments", ListingSerializer, {}, listing_queryset(full), nested_querysets(full)),
+                ("bids", BidSerializer, {}, Bid.objects.select_related("bidder", "listing"), {}),
+                ("comments", CommentSerializer, {}, Comment.objects.select_related("commentor", "listing"), {}),
+            ]
+            for label, serializer_class, kwargs, queryset, nested in cases:
+                row_serializer = RowSerializer.for_serializer(serializer_class(**kwargs))
+                instances = list(queryset)
+                rows = list(row_serializer.values(queryset))
+                nested_rows = {name: list(values) for name, values in row_serializer.nested_values(rows, nested).items()}
+                timings = {
+                    "serializer": self.best(options["repeat"], lambda: serializer_class(instances, many=True, **kwargs).data),
+                    "rows": self.best(options["repeat"], lambda: row_serializer.to_representation(rows, nested_rows)),
+                    "serializer, fetched": self.best(options["repeat"], lambda: serializer_class(list(queryset.all()), many=True, **kwargs).data),
+                    "rows, fetched": self.best(options["repeat"], lambda: row_serializer.serialize(list(row_serializer.values(queryset)), nested)),
+                }
+                self.stdout.write(
+                    f"{label}: " + ", ".join(f"{name} {len(rows) / elapsed:.0f} rows/sec" for name, elapsed in timings.items())
+                    + f" ({timings['serializer'] / timings['rows']:.1f}x, {timings['serializer, fetched'] / timings['rows, fetched']:.1f}x fetched)"
+                )
+            transaction.set_rollback(True)
+
+    def create(self, count):
+        owner = User.objects.create_user(username="bench-serialization")
+        listings = Listing.objects.bulk_create(
+            Listing(owner=owner, name=f"Bench listing {i}", description="Created by the serialization benchmark.",
+                    starting_bid=Decimal("1.00"), current_bid=Decimal("2.00"), image_url="https://example.com/image.jpg",
+                    bid_count=1, comment_count=1, top_bidder=owner)
+            for i in range(count)
+        )
+        Bid.objects.bulk_create(Bid(listing=listing, bidder=owner, bid_amount=Decimal("2.00")) for listing in listings)
+        Comment.objects.bulk_create(Comment(listing=listing, commentor=owner, text="A comment.") for listing in listings)
+
+    def best(self, repeat, function):
+        elapsed = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            function()
+            elapsed.append(time.perf_counter() - started)
+        return min(elapsed)
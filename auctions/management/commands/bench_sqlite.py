@@ -0,0 +1,131 @@
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.db.models import F
+
+from auctions.models import User, Listing, Bid
+
+# The database settings compared, each on a new database file: Django's
+# SQLite defaults, a rollback journal and a connection per request, and
+# the settings of the default database.
+PROFILES = {
+    "default": {"ENGINE": "django.db.backends.sqlite3", "CONN_MAX_AGE": 0, "OPTIONS": {}},
+    "configured": {key: value for key, value in settings.DATABASES[DEFAULT_DB_ALIAS].items() if key not in ("NAME", "TEST")},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Run reader and writer threads against a new SQLite database with Django's default settings and with "
+        "the settings of the default database, and report the reads and writes per second and the writes "
+        "that failed with 'database is locked'. Each operation is a request: connections are closed after it "
+        "unless CONN_MAX_AGE keeps them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=4, help="Threads reading the listings and their bids.")
+        parser.add_argument("--writers", type=int, default=4, help="Threads placing bids.")
+        parser.add_argument("--seconds", type=float, default=5, help="Duration of each run.")
+        parser.add_argument("--listings", type=int, default=100, help="Listings the bids are placed on.")
+
+    def handle(self, *args, **options):
+        if "sqlite" not in PROFILES["configured"]["ENGINE"]:
+            raise CommandError("The default database is not SQLite.")
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for name, profile in PROFILES.items():
+                alias = f"bench-sqlite-{name}"
+                connections.settings[alias] = connections.configure_settings({
+                    DEFAULT_DB_ALIAS: connections.settings[DEFAULT_DB_ALIAS],
+                    alias: {**profile, "NAME": os.path.join(directory, f"{name}.sqlite3")},
+                })[alias]
+                try:
+                    results[name] = self.run(alias, options)
+                finally:
+                    connections[alias].close()
+                    del connections[alias]
+                    del connections.settings[alias]
+
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name}: {result['reads'] / options['seconds']:.0f} reads/sec, "
+                f"{result['writes'] / options['seconds']:.0f} writes/sec, {result['locked']} locked, "
+                f"write latency median {result['median_ms']:.1f}ms, max {result['max_ms']:.1f}ms"
+            )
+        default, configured = results["default"], results["configured"]
+        if default["reads"] and default["writes"]:
+            self.stdout.write(
+                f"configured/default: reads x{configured['reads'] / default['reads']:.1f}, "
+                f"writes x{configured['writes'] / default['writes']:.1f}"
+            )
+
+    def run(self, alias, options):
+        call_command("migrate", database=alias, run_syncdb=True, verbosity=0)
+        owner = User.objects.db_manager(alias).create(username="bench-sqlite-owner")
+        Listing.objects.using(alias).bulk_create(
+            Listing(owner=owner, name=f"Bench listing {i}", description="Created by the SQLite benchmark.",
+                    starting_bid=Decimal("1.00"), current_bid=Decimal("1.00"))
+            for i in range(options["listings"])
+        )
+        listing_ids = list(Listing.objects.using(alias).values_list("id", flat=True))
+        connections[alias].close()
+
+        counts = {"reads": 0, "writes": 0, "locked": 0}
+        latencies = []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options["seconds"]
+
+        def work(operation, outcome, seed):
+            rng = random.Random(seed)
+            connection = connections[alias]
+            try:
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    try:
+                        operation(alias, rng.choice(listing_ids), owner.pk)
+                        result = outcome
+                    except OperationalError:
+                        result = "locked"
+                    finally:
+                        # The end of the request.
+                        connection.close_if_unusable_or_obsolete()
+                    with lock:
+                        counts[result] += 1
+                        if outcome == "writes" and result == outcome:
+                            latencies.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=work, args=(self.read, "reads", i)) for i in range(options["readers"])]
+        threads += [threading.Thread(target=work, args=(self.write, "writes", -i)) for i in range(1, options["writers"] + 1)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return {
+            **counts,
+            "median_ms": statistics.median(latencies) * 1000 if latencies else 0,
+            "max_ms": max(latencies) * 1000 if latencies else 0,
+        }
+
+    def read(self, alias, listing_id, user_id):
+        list(Listing.objects.using(alias).filter(active=True).order_by("-id").values("id", "name", "current_bid")[:20])
+        list(Bid.objects.using(alias).filter(listing_id=listing_id).order_by("-id").values("id", "bid_amount")[:20])
+
+    def write(self, alias, listing_id, user_id):
+        # Read, then write: the transaction needs the write lock it did not
+        # take when it began, unless it began IMMEDIATE.
+        with transaction.atomic(using=alias):
+            current_bid = Listing.objects.using(alias).values_list("current_bid", flat=True).get(pk=listing_id)
+            amount = current_bid + Decimal("0.01")
+            Bid.objects.using(alias).bulk_create([Bid(listing_id=listing_id, bidder_id=user_id, bid_amount=amount)])
+            Listing.objects.using(alias).filter(pk=listing_id).update(current_bid=amount, bid_count=F("bid_count") + 1)
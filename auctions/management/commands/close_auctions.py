@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from auctions.closing import AuctionCloser, close_all_expired_auctions
+
+
+class Command(BaseCommand):
+    help = "Close the auctions that have ended and record their winning bid."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.AUCTIONS_CLOSE_BATCH_SIZE,
+            help="Auctions closed per transaction.",
+        )
+        parser.add_argument("--loop", action="store_true", help="Keep closing auctions as they end, until interrupted.")
+        parser.add_argument(
+            "--interval", type=float, default=settings.AUCTIONS_CLOSE_INTERVAL,
+            help="Seconds between two sweeps with --loop.",
+        )
+
+    def handle(self, *args, **options):
+        if options["loop"]:
+            try:
+                AuctionCloser(options["interval"], options["batch_size"]).run()
+            except KeyboardInterrupt:
+                pass
+            return
+        closed = close_all_expired_auctions(batch_size=options["batch_size"])
+        self.stdout.write(f"Closed {closed} auctions.")
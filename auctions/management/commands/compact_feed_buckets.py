@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from auctions.feeds import compact_bid_buckets
+
+
+class Command(BaseCommand):
+    help = "Delete the bid counters of the listing feeds that are older than AUCTIONS_FEED_RETENTION."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000, help="Counters deleted per statement.")
+
+    def handle(self, *args, **options):
+        deleted = compact_bid_buckets(batch_size=options["batch_size"])
+        self.stdout.write(f"Deleted {deleted} bid counters.")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from auctions.export import CHUNK_SIZE, EXPORTS, FORMATS, stream_export
+
+
+class Command(BaseCommand):
+    help = "Stream every listing, bid or comment as NDJSON or CSV, with constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", choices=list(EXPORTS), help="What to export.")
+        parser.add_argument("--format", choices=list(FORMATS), default="ndjson")
+        parser.add_argument("--since", type=int, help="Only export the rows after this id.")
+        parser.add_argument("--output", help="File to write to, standard output by default.")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows fetched from the database at a time.")
+
+    def handle(self, *args, **options):
+        chunks = stream_export(options["name"], options["format"], options["since"], options["chunk_size"])
+        if options["output"]:
+            with open(options["output"], "w", newline="", encoding="utf-8") as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
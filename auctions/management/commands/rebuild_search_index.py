@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from auctions.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of listings from the listing table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Database to rebuild the index of.")
+
+    def handle(self, *args, **options):
+        if connections[options["database"]].vendor != "sqlite":
+            raise CommandError("The search index is only used on SQLite, other databases search with LIKE queries.")
+        count = rebuild_search_index(options["database"])
+        self.stdout.write(f"Indexed {count} listings.")
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions.activity import check_activity
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the bid count, comment count, last bid date and top bidder of the listings "
+        "that drifted from their bids and comments."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Listings checked per query.")
+        parser.add_argument(
+            "--verify", action="store_true",
+            help="Only report the listings that drifted, and fail if there are any.",
+        )
+
+    def handle(self, *args, **options):
+        checked, drifted = check_activity(options["batch_size"], fix=not options["verify"])
+        if options["verify"]:
+            if drifted:
+                shown = ", ".join(str(pk) for pk in drifted[:20]) + (", ..." if len(drifted) > 20 else "")
+                raise CommandError(f"{len(drifted)} of {checked} listings drifted: {shown}")
+            self.stdout.write(f"Checked {checked} listings, none drifted.")
+        else:
+            self.stdout.write(f"Checked {checked} listings, recomputed {len(drifted)}.")
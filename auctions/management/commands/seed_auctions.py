@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions.seeding import clear_seeded, seed_auctions
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-generate users, listings, bids and comments at production scale, with most of the activity "
+        "on a few hot listings, for the benchmarks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000, help="Users created.")
+        parser.add_argument("--listings", type=int, default=10000, help="Listings created.")
+        parser.add_argument("--bids", type=int, default=100000, help="Bids created.")
+        parser.add_argument("--comments", type=int, default=20000, help="Comments created.")
+        parser.add_argument("--hot", type=int, default=10, help="Listings getting --hot-share of the bids and comments.")
+        parser.add_argument("--hot-share", type=float, default=0.5, help="Share of the bids and comments on the hot listings.")
+        parser.add_argument("--days", type=float, default=1, help="Days over which the bids were placed.")
+        parser.add_argument("--prefix", default="seed", help="Prefix of the usernames of the seeded users.")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed, the same seed gives the same data.")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per INSERT.")
+        parser.add_argument(
+            "--clear", action="store_true",
+            help="Delete the users seeded with --prefix before, with their listings, bids and comments.",
+        )
+
+    def handle(self, *args, **options):
+        if options["users"] < 1 and options["listings"]:
+            raise CommandError("Listings need at least one user to own them.")
+        if not 0 <= options["hot_share"] <= 1:
+            raise CommandError("--hot-share must be between 0 and 1.")
+        if options["clear"]:
+            self.stdout.write(f"Deleted {clear_seeded(options['prefix'])} seeded users.")
+        started = time.perf_counter()
+        try:
+            counts = seed_auctions(
+                users=options["users"], listings=options["listings"], bids=options["bids"], comments=options["comments"],
+                hot=options["hot"], hot_share=options["hot_share"], days=options["days"], prefix=options["prefix"],
+                seed=options["seed"], batch_size=options["batch_size"],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Created {counts['users']} users, {counts['listings']} listings, {counts['bids']} bids "
+            f"and {counts['comments']} comments in {elapsed:.1f}s."
+        )
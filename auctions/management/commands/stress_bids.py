@@ -0,0 +1,80 @@
+import threading
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from auctions.bidding import BidConflict, place_bid
+from auctions.models import User, Listing
+
+
+BID_INCREMENT = Decimal("0.01")
+
+
+class Command(BaseCommand):
+    help = "Place bids from several threads on a single hot listing, check that no update was lost and report bids/sec."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8, help="Number of concurrent bidders.")
+        parser.add_argument("--bids", type=int, default=100, help="Bids attempted by each bidder.")
+        parser.add_argument("--listing", type=int, help="Listing to bid on, a new one is created by default.")
+
+    def handle(self, *args, **options):
+        bidders = [
+            User.objects.get_or_create(username=f"stress-bidder-{i}")[0]
+            for i in range(options["threads"])
+        ]
+        if options["listing"]:
+            listing = Listing.objects.get(pk=options["listing"])
+        else:
+            listing = Listing.objects.create(
+                owner=User.objects.get_or_create(username="stress-owner")[0],
+                name="Stress listing", description="Hot listing for the bid stress test.",
+                starting_bid=Decimal("1.00"), current_bid=Decimal("1.00"),
+            )
+        start_bid_id = listing.bids.order_by("-id").values_list("id", flat=True).first() or 0
+
+        counts = {"accepted": 0, "conflicts": 0, "locked": 0}
+        lock = threading.Lock()
+
+        def bid_loop(bidder):
+            try:
+                for _ in range(options["bids"]):
+                    try:
+                        current = Listing.objects.only("id", "current_bid").get(pk=listing.pk)
+                        place_bid(current, bidder, current.current_bid + BID_INCREMENT)
+                        outcome = "accepted"
+                    except BidConflict:
+                        outcome = "conflicts"
+                    except OperationalError:
+                        outcome = "locked"
+                    with lock:
+                        counts[outcome] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=bid_loop, args=(bidder,)) for bidder in bidders]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        amounts = list(listing.bids.filter(id__gt=start_bid_id).order_by("id").values_list("bid_amount", flat=True))
+        listing.refresh_from_db(fields=["current_bid"])
+        attempts = sum(counts.values())
+        self.stdout.write(
+            f"{attempts} bids in {elapsed:.2f}s: {attempts / elapsed:.0f} bids/sec, "
+            f"{counts['accepted'] / elapsed:.0f} accepted/sec "
+            f"({counts['accepted']} accepted, {counts['conflicts']} conflicts, {counts['locked']} locked)"
+        )
+
+        if len(amounts) != counts["accepted"]:
+            raise CommandError(f"{counts['accepted']} bids were accepted but {len(amounts)} were stored.")
+        if any(later <= earlier for earlier, later in zip(amounts, amounts[1:])):
+            raise CommandError("A bid was stored that was not greater than the bid before it.")
+        if amounts and listing.current_bid != amounts[-1]:
+            raise CommandError(f"Current bid is {listing.current_bid} but the last accepted bid is {amounts[-1]}.")
+        self.stdout.write("No lost updates.")
@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from auctions.replicas import copy_to_replica
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the SQLite primary database into the SQLite replicas of AUCTIONS_READ_REPLICAS, to try the "
+        "read replicas locally. Other databases replicate on their own."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep copying until interrupted, a replica lagging by --interval.")
+        parser.add_argument("--interval", type=float, default=1, help="Seconds between two copies with --loop.")
+
+    def handle(self, *args, **options):
+        if not settings.AUCTIONS_READ_REPLICAS:
+            raise CommandError("There are no read replicas, see AUCTIONS_READ_REPLICAS.")
+        for alias in (DEFAULT_DB_ALIAS, *settings.AUCTIONS_READ_REPLICAS):
+            if connections[alias].vendor != "sqlite":
+                raise CommandError(f"The {alias} database is not SQLite.")
+        try:
+            while True:
+                for alias in settings.AUCTIONS_READ_REPLICAS:
+                    copy_to_replica(alias)
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        if not options["loop"]:
+            self.stdout.write(f"Copied the primary into {', '.join(settings.AUCTIONS_READ_REPLICAS)}.")
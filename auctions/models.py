@@ -1,7 +1,8 @@
 import datetime
 
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q
 from django.utils import timezone
 
 class User(AbstractUser):
@@ -10,7 +11,69 @@ class User(AbstractUser):
         return self.username
 
 
+class CollectionVersion(models.Model):
+    """
+    Version of a whole collection, bumped whenever anything in it changes.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=1)
+
+    @classmethod
+    def current(cls, name):
+        return cls.objects.filter(name=name).values_list("version", flat=True).first() or 0
+
+    @classmethod
+    async def acurrent(cls, name):
+        return await cls.objects.filter(name=name).values_list("version", flat=True).afirst() or 0
+
+    @classmethod
+    def bump(cls, name):
+        """
+        Bump the version of collection `name` once the current transaction
+        is committed, in a short transaction of its own: every write to the
+        collection updates this single row, so bumping it inside the write
+        transactions would make them wait for each other. The readers may
+        meanwhile see the new rows tagged with the old version, which only
+        costs them another fetch once it is bumped.
+        """
+        transaction.on_commit(lambda: cls._bump(name), robust=True)
+
+    @classmethod
+    def _bump(cls, name):
+        if not cls.objects.filter(name=name).update(version=F("version") + 1):
+            cls.objects.get_or_create(name=name)
+
+    def __str__(self) -> str:
+        return f"{self.name} {self.version}"
+
+
+class ListingQuerySet(models.QuerySet):
+    def bump_version(self, **updates):
+        """
+        Update the listings with `updates` and bump their version and the
+        version of the listing collection.
+        """
+        updated = self.update(version=F("version") + 1, **updates)
+        if updated:
+            CollectionVersion.bump(Listing.COLLECTION)
+        return updated
+
+    def accepting_bids(self, now=None):
+        """
+        Listings whose auction is still running at `now`.
+        """
+        return self.filter(Q(ends_at__isnull=True) | Q(ends_at__gt=now or timezone.now()), active=True)
+
+    def expired(self, now=None):
+        """
+        Active listings whose auction ended by `now`, in the order they
+        ended. Answered from the `listing_open_ends_idx` partial index.
+        """
+        return self.filter(active=True, ends_at__lte=now or timezone.now()).order_by("ends_at", "id")
+
+
 class Listing(models.Model):
+    COLLECTION = "listings"
     CATEGORY_CHOICES = (
         ("Fashion", "Fashion"),
         ("Electronics", "Electronics"),
@@ -37,6 +100,42 @@ class Listing(models.Model):
     image_url = models.URLField(blank=True, null=True)
     active = models.BooleanField(default=True)
     category = models.CharField(max_length=80, choices=CATEGORY_CHOICES, default='Other')
+    version = models.PositiveIntegerField(default=1, editable=False)
+    ends_at = models.DateTimeField(blank=True, null=True)
+    winning_bid = models.ForeignKey("Bid", related_name="+", blank=True, null=True, on_delete=models.SET_NULL)
+    # Activity of the listing, kept up to date by the bid and comment write
+    # paths, see auctions.activity.
+    bid_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    last_bid_at = models.DateTimeField(blank=True, null=True, editable=False)
+    top_bidder = models.ForeignKey(User, related_name="+", blank=True, null=True, editable=False, on_delete=models.SET_NULL)
+
+    objects = ListingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="listing_created_id_idx"),
+            models.Index(fields=["category", "active", "created_at", "id"], name="listing_cat_active_created_idx"),
+            models.Index(fields=["current_bid", "id"], name="listing_bid_id_idx"),
+            # Only the running auctions, in the order they end. A partial
+            # index because `active=True` is compiled to a bare "active",
+            # which SQLite cannot match against a leading index column.
+            models.Index(fields=["ends_at", "id"], condition=Q(active=True), name="listing_open_ends_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if not adding:
+            self.version = F("version") + 1
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "version"}
+        super().save(*args, **kwargs)
+        if not adding:
+            self.refresh_from_db(fields=["version"])
+        CollectionVersion.bump(self.COLLECTION)
+
+    def is_accepting_bids(self, now=None):
+        return self.active and (self.ends_at is None or self.ends_at > (now or timezone.now()))
 
     def was_added_recently(self):
         now = timezone.now()
@@ -50,7 +149,18 @@ class Bid(models.Model):
     listing = models.ForeignKey(Listing, related_name="bids", on_delete=models.CASCADE)
     bidder = models.ForeignKey(User, related_name="bids", on_delete=models.CASCADE)
     bid_amount = models.DecimalField(max_digits=6, decimal_places=2)
-    bid_date = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add, so that the write paths can copy it to
+    # `Listing.last_bid_at`.
+    bid_date = models.DateTimeField(default=timezone.now, editable=False)
+    # Whether saving the bid bumps the version of its listing, see
+    # auctions.signals. Cleared by the write paths that bump it along with
+    # the activity of the listing.
+    bumps_listing = True
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["listing", "bid_date", "id"], name="bid_listing_date_id_idx"),
+        ]
 
 
     def __str__(self) -> str:
@@ -62,8 +172,57 @@ class Comment(models.Model):
     commentor = models.ForeignKey(User, related_name="comments", on_delete=models.CASCADE)
     text = models.TextField(max_length=1000)
     comment_at = models.DateTimeField(auto_now_add=True)
+    # See `Bid.bumps_listing`.
+    bumps_listing = True
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["listing", "comment_at", "id"], name="comment_listing_at_id_idx"),
+        ]
 
 
     def __str__(self) -> str:
         return self.text
      
+
+
+class ListingBidBucket(models.Model):
+    """
+    Number of bids placed on a listing during one time bucket, the
+    AUCTIONS_FEED_BUCKET_SECONDS long interval numbered `bucket` since the
+    epoch. Kept up to date by the bid paths, read by the listing feeds and
+    aged out by `manage.py compact_feed_buckets`.
+    """
+    listing = models.ForeignKey(Listing, related_name="bid_buckets", on_delete=models.CASCADE)
+    bucket = models.PositiveIntegerField()
+    bid_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["listing", "bucket"], name="bidbucket_listing_bucket_uniq"),
+        ]
+        indexes = [
+            # Covers the feeds, which sum the recent buckets per listing.
+            models.Index(fields=["bucket", "listing", "bid_count"], name="bidbucket_bucket_listing_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.listing_id} {self.bucket} {self.bid_count}"
+
+
+class ListingSearchIndex(models.Model):
+    """
+    The SQLite FTS5 index over the name and description of listings.
+
+    The virtual table and the triggers keeping it in sync are created by
+    `auctions.search.create_search_index` after `migrate`, this model only
+    lets querysets join it. `rank` is the bm25 score of the current match.
+    """
+    listing = models.OneToOneField(Listing, primary_key=True, db_column="rowid", related_name="search_index", on_delete=models.DO_NOTHING)
+    name = models.CharField(max_length=200)
+    description = models.TextField()
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "auctions_listing_fts"
@@ -0,0 +1,165 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination keyed on every field of `ordering`, not only the first.
+
+    The cursor stores the values of the last row that was sent, and the next
+    page is selected with a row-value comparison against them, e.g.
+    `created_at < c OR (created_at = c AND id < i)` for ("-created_at", "-id").
+    Together with a composite index on the same fields, fetching page 1000
+    costs the same as fetching page one.
+    """
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page([instance async for instance in queryset])
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        Return the query fetching the page asked for, plus one row to tell
+        whether there is a page after it, or None if paging is disabled.
+        """
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, position = False, None
+        else:
+            reverse, position = self.cursor.reverse, self.decode_position(self.cursor.position)
+
+        if reverse:
+            queryset = queryset.order_by(*_invert_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.get_keyset_filter(position, reverse))
+            except (ValidationError, ValueError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+        self.reverse, self.current_position = reverse, position
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = self.current_position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.current_position is not None
+        return self.page
+
+    def get_keyset_filter(self, position, reverse):
+        """
+        Return the `Q` object selecting the rows that come after `position`.
+        """
+        names = [field.lstrip("-") for field in self.ordering]
+        keyset_filter = Q()
+        for index, field in enumerate(self.ordering):
+            descending = field.startswith("-")
+            lookup = "lt" if descending != reverse else "gt"
+            clause = Q(**{f"{names[index]}__{lookup}": position[index]})
+            for name, value in zip(names[:index], position[:index]):
+                clause &= Q(**{name: value})
+            keyset_filter |= clause
+        return keyset_filter
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if self.page:
+            position = self._get_position_from_instance(self.page[-1], self.ordering)
+        else:
+            position = self.encode_position(self.current_position)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.page:
+            position = self._get_position_from_instance(self.page[0], self.ordering)
+        else:
+            position = self.encode_position(self.current_position)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def encode_position(self, values):
+        return json.dumps([str(value) for value in values], separators=(",", ":"))
+
+    def decode_position(self, position):
+        if position is None:
+            return None
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip("-")
+            if isinstance(instance, dict):
+                values.append(instance[name])
+            else:
+                values.append(getattr(instance, name))
+        return self.encode_position(values)
+
+
+def _invert_ordering(ordering):
+    return tuple(field[1:] if field.startswith("-") else "-" + field for field in ordering)
+
+
+class ListingPagination(KeysetPagination):
+    ordering = ("-created_at", "-id")
+
+
+class UserPagination(KeysetPagination):
+    ordering = ("id",)
+
+
+class BidPagination(KeysetPagination):
+    ordering = ("-bid_date", "-id")
+
+
+class CommentPagination(KeysetPagination):
+    ordering = ("-comment_at", "-id")
+
+
+class SearchPagination(KeysetPagination):
+    """
+    Page through search results by rank, or by recency when the search
+    falls back to LIKE queries and no rank is available.
+    """
+    ordering = ("rank", "id")
+
+    def get_ordering(self, request, queryset, view):
+        if "rank" in queryset.query.annotations:
+            return self.ordering
+        return ListingPagination.ordering
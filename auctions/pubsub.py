@@ -0,0 +1,166 @@
+import abc
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class BaseBackend(abc.ABC):
+    """
+    Transport of a `Hub`: calls the callbacks subscribed to a channel with
+    every message published on it. Messages are strings.
+
+    A backend for a broker (Redis, Postgres LISTEN/NOTIFY, ...) publishes
+    to the broker and calls the local callbacks from its listener.
+    """
+
+    @abc.abstractmethod
+    def subscribe(self, channel, callback):
+        """Call `callback` with every message published on `channel`."""
+
+    @abc.abstractmethod
+    def unsubscribe(self, channel, callback):
+        """Stop calling `callback` with the messages of `channel`."""
+
+    @abc.abstractmethod
+    def publish(self, channel, message):
+        """Publish `message` on `channel`."""
+
+
+class LocalBackend(BaseBackend):
+    """
+    Deliver messages to the subscribers of this process only.
+    """
+
+    def __init__(self):
+        self._callbacks = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel, callback):
+        with self._lock:
+            self._callbacks[channel].add(callback)
+
+    def unsubscribe(self, channel, callback):
+        with self._lock:
+            callbacks = self._callbacks.get(channel)
+            if callbacks is not None:
+                callbacks.discard(callback)
+                if not callbacks:
+                    del self._callbacks[channel]
+
+    def publish(self, channel, message):
+        with self._lock:
+            callbacks = list(self._callbacks.get(channel, ()))
+        for callback in callbacks:
+            callback(message)
+
+
+class Subscription:
+    """
+    Messages of a channel queued for a coroutine, see `Hub.subscribe()`.
+
+    If more than `max_queued` messages are waiting, the next ones are
+    dropped and `overflowed` is set, for the subscriber to catch up from
+    the database.
+    """
+
+    def __init__(self, fanout, max_queued):
+        self.fanout = fanout
+        self.max_queued = max_queued
+        self.overflowed = False
+        self._queue = asyncio.Queue()
+
+    def put(self, message):
+        if self._queue.qsize() >= self.max_queued:
+            self.overflowed = True
+        else:
+            self._queue.put_nowait(message)
+
+    async def get(self):
+        return await self._queue.get()
+
+    def close(self):
+        self.fanout.remove(self)
+
+
+class Fanout:
+    """
+    The subscriptions to a channel from one event loop, subscribed to the
+    backend as a single callback.
+
+    An idle subscription costs a queue, not a thread. A message published
+    from any thread is handed to the event loop once, which then queues
+    it for each subscription.
+    """
+
+    def __init__(self, hub, channel, loop):
+        self.hub = hub
+        self.channel = channel
+        self.loop = loop
+        self.subscriptions = set()
+
+    def __call__(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self.deliver, message)
+        except RuntimeError:
+            # The event loop was closed before the subscriptions.
+            pass
+
+    def deliver(self, message):
+        for subscription in list(self.subscriptions):
+            subscription.put(message)
+
+    def remove(self, subscription):
+        with self.hub._lock:
+            self.subscriptions.discard(subscription)
+            if not self.subscriptions:
+                del self.hub._fanouts[self.channel, self.loop]
+                self.hub.backend.unsubscribe(self.channel, self)
+
+
+class Hub:
+    """
+    In-process publish/subscribe hub. Publishing is sync, subscribing is
+    async; the transport is the pluggable `backend`.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._fanouts = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        self.backend.publish(channel, message)
+
+    def subscribe(self, channel, max_queued=1000):
+        """
+        Return a `Subscription` to `channel` for the running event loop.
+        Close it when done.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            fanout = self._fanouts.get((channel, loop))
+            if fanout is None:
+                fanout = self._fanouts[channel, loop] = Fanout(self, channel, loop)
+                self.backend.subscribe(channel, fanout)
+            subscription = Subscription(fanout, max_queued)
+            fanout.subscriptions.add(subscription)
+        return subscription
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub():
+    """
+    Return the process-wide `Hub`, with the backend named by
+    AUCTIONS_PUBSUB_BACKEND.
+    """
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            _hub = Hub(import_string(settings.AUCTIONS_PUBSUB_BACKEND)())
+        return _hub
@@ -0,0 +1,117 @@
+import csv
+import decimal
+import io
+import json
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+_encoder = encoders.JSONEncoder()
+
+
+def encode_default(obj):
+    """
+    Encode what JSON and MessagePack have no type for like DRF's encoder,
+    except decimals, which are kept exact as strings when serializers
+    coerce them to strings (COERCE_DECIMAL_TO_STRING).
+    """
+    if isinstance(obj, decimal.Decimal) and api_settings.COERCE_DECIMAL_TO_STRING:
+        return str(obj)
+    return _encoder.default(obj)
+
+
+class ExactDecimalEncoder(encoders.JSONEncoder):
+    def default(self, obj):
+        return encode_default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    The JSON of `JSONRenderer`, encoded straight to bytes by orjson when
+    it is installed, with the standard library otherwise, and with exact
+    decimals. Indented JSON (`indent=` in the media type, the browsable
+    API) and ASCII-only JSON (UNICODE_JSON off) are left to the standard
+    library.
+    """
+    encoder_class = ExactDecimalEncoder
+    use_orjson = orjson is not None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if not self.use_orjson or self.ensure_ascii or not self.compact or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            body = orjson.dumps(data, default=encode_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits are encoded by the standard library,
+            # which raises like JSONRenderer for what cannot be encoded.
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped as by JSONRenderer, so that the JSON is a strict subset
+        # of JavaScript.
+        if b"\xe2\x80\xa8" in body or b"\xe2\x80\xa9" in body:
+            body = body.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return body
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack, for the internal services, when msgpack is installed.
+    Decimals, dates and times are encoded as strings, as in the JSON.
+    """
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if msgpack is None:
+            raise ImproperlyConfigured("MessagePackRenderer needs the msgpack package.")
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline delimited JSON: one object per line.
+    """
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        items = data if isinstance(data, list) else [data]
+        return "".join(json.dumps(item, separators=(",", ":")) + "\n" for item in items).encode()
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    CSV with a header row, for a list of objects or a single object.
+    """
+    media_type = "text/csv"
+    format = "csv"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        items = data if isinstance(data, list) else [data]
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=list(items[0]) if items else [])
+        writer.writeheader()
+        writer.writerows(items)
+        return output.getvalue().encode()
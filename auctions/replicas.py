@@ -0,0 +1,152 @@
+import hashlib
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+_routing = ContextVar("routing", default=None)
+
+
+class RequestRouting:
+    """
+    The database the reads of the current request go to, None for the
+    primary.
+    """
+
+    def __init__(self):
+        self.database = None
+
+
+def credentials_key(request):
+    """
+    Return the cache key pinning the client of `request` to the primary,
+    from its token or session cookie, or None if it sends neither.
+    """
+    credentials = request.headers.get("Authorization") or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credentials:
+        return None
+    return f"primary:{hashlib.sha256(credentials.encode()).hexdigest()}"
+
+
+class ReplicaRouter:
+    """
+    Send the reads of the auctions models made by the safe requests of the
+    routes in AUCTIONS_REPLICA_ROUTES to one of AUCTIONS_READ_REPLICAS, as
+    chosen by `ReplicaMiddleware`, and everything else to the primary, the
+    default database.
+
+    Users, tokens and sessions are always read from the primary, so that
+    credentials work as soon as they are created. Replicas are copies of
+    the primary and are not migrated.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or routing.database is None:
+            return None
+        if model._meta.app_label != "auctions" or model._meta.label == settings.AUTH_USER_MODEL:
+            return None
+        return routing.database
+
+    def db_for_write(self, model, **hints):
+        # Django writes an instance to the database it was read from.
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db in settings.AUCTIONS_READ_REPLICAS:
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.AUCTIONS_READ_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.AUCTIONS_READ_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    """
+    Choose a replica at random for the reads of the safe requests of the
+    routes in AUCTIONS_REPLICA_ROUTES, see `ReplicaRouter`, unless the
+    client wrote in the last AUCTIONS_REPLICA_PIN_SECONDS: the clients
+    that sent a successful unsafe request with a token or a session are
+    pinned to the primary meanwhile, to read their own writes while the
+    replicas catch up. Only used if AUCTIONS_READ_REPLICAS is set.
+
+    The pins must be seen by every process serving the client, so
+    AUCTIONS_REPLICA_PIN_CACHE cannot be a local-memory cache.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.AUCTIONS_READ_REPLICAS:
+            raise MiddlewareNotUsed()
+        if isinstance(self.pins, (LocMemCache, DummyCache)):
+            raise ImproperlyConfigured(
+                f"AUCTIONS_REPLICA_PIN_CACHE must name a cache shared by the processes serving requests, "
+                f"not the local-memory {settings.AUCTIONS_REPLICA_PIN_CACHE!r} cache."
+            )
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @property
+    def pins(self):
+        return caches[settings.AUCTIONS_REPLICA_PIN_CACHE]
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _routing.set(RequestRouting())
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        self.pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        token = _routing.set(RequestRouting())
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        self.pin(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in SAFE_METHODS or request.resolver_match.url_name not in settings.AUCTIONS_REPLICA_ROUTES:
+            return
+        key = credentials_key(request)
+        if key is not None and self.pins.get(key):
+            return
+        _routing.get().database = random.choice(settings.AUCTIONS_READ_REPLICAS)
+
+    def pin(self, request, response):
+        if request.method in SAFE_METHODS or response.status_code >= 400:
+            return
+        key = credentials_key(request)
+        if key is not None:
+            self.pins.set(key, True, timeout=settings.AUCTIONS_REPLICA_PIN_SECONDS)
+
+
+def copy_to_replica(alias):
+    """
+    Copy the SQLite primary database into the SQLite database `alias`,
+    with SQLite's online backup, for a replica to try locally.
+    """
+    primary, replica = connections[DEFAULT_DB_ALIAS], connections[alias]
+    primary.ensure_connection()
+    replica.ensure_connection()
+    primary.connection.backup(replica.connection)
@@ -0,0 +1,77 @@
+import asyncio
+import contextlib
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.urls import Resolver404, resolve
+
+
+class StreamHandler(ASGIHandler):
+    """
+    Django's ASGI handler for the long-lived streams.
+
+    Django's handler runs the sync code of each request, the middleware
+    among it, in a thread of its own, kept until the response ends, so an
+    open stream would hold a thread. Here the sync code of every stream
+    shares asgiref's single sync thread, so an idle subscriber costs a
+    coroutine and a queue.
+
+    It also listens to the client while the response is sent, which
+    Django's handler does not, and cancels the response when the client
+    disconnects, so that the stream stops and unsubscribes. The response
+    is closed either way, which sends `request_finished`.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.handle(scope, receive, send)
+
+    async def handle(self, scope, receive, send):
+        messages = asyncio.Queue()
+
+        async def listen():
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    return
+
+        listener = asyncio.create_task(listen())
+        handler = asyncio.create_task(super().handle(scope, messages.get, send))
+        try:
+            await asyncio.wait({listener, handler}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            listener.cancel()
+            handler.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await handler
+
+    async def send_response(self, response, send):
+        try:
+            await super().send_response(response, send)
+        except asyncio.CancelledError:
+            await sync_to_async(response.close, thread_sensitive=True)()
+            raise
+
+
+class StreamRouter:
+    """
+    ASGI application serving the long-lived streams (the views named in
+    `url_names`) with a `StreamHandler` and everything else with
+    `application`, the Django ASGI handler.
+    """
+    url_names = {"bid-stream"}
+
+    def __init__(self, application):
+        self.application = application
+        self.stream_handler = StreamHandler()
+
+    async def __call__(self, scope, receive, send):
+        match = None
+        if scope["type"] == "http" and scope["method"] == "GET":
+            try:
+                match = resolve(scope["path"])
+            except Resolver404:
+                pass
+        if match is None or match.url_name not in self.url_names:
+            return await self.application(scope, receive, send)
+        await self.stream_handler(scope, receive, send)
@@ -0,0 +1,242 @@
+import decimal
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.utils import timezone
+from rest_framework import fields, relations, serializers
+from rest_framework.settings import api_settings
+
+
+def decimal_converter(field, tz):
+    coerce_to_string = getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING)
+    if field.decimal_places is None or field.localize or not coerce_to_string:
+        return field.to_representation
+    exponent = decimal.Decimal(".1") ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return "{:f}".format(value.quantize(exponent, rounding=rounding, context=context))
+    return convert
+
+
+def datetime_converter(field, tz):
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    tz = field.timezone if hasattr(field, "timezone") else tz
+    if tz is None or output_format is None or output_format.lower() != fields.ISO_8601:
+        return field.to_representation
+
+    def convert(value):
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+    return convert
+
+
+# How the fields of each class convert a column value, given the field and
+# the current time zone, in the order they are matched: the same as their
+# `to_representation()`, with what can be computed once taken out of it.
+# Other fields use their `to_representation()`.
+CONVERTERS = [
+    (fields.DecimalField, decimal_converter),
+    (fields.DateTimeField, datetime_converter),
+    (fields.IntegerField, lambda field, tz: int),
+    (fields.BooleanField, lambda field, tz: bool),
+    (fields.CharField, lambda field, tz: str),
+]
+# Fields whose representation is not built from a single column value.
+UNSUPPORTED_FIELDS = (
+    relations.RelatedField, relations.ManyRelatedField, fields.SerializerMethodField,
+    fields.FileField, serializers.BaseSerializer,
+)
+
+
+def converter(field, tz):
+    """
+    Return the function converting a column value read by `field` to its
+    representation, or None if it is represented as is.
+    """
+    if isinstance(field, relations.PrimaryKeyRelatedField):
+        return None if field.pk_field is None else field.pk_field.to_representation
+    if type(field) is fields.ReadOnlyField:
+        return None
+    for field_class, factory in CONVERTERS:
+        if isinstance(field, field_class):
+            return factory(field, tz)
+    return field.to_representation
+
+
+def column_path(model, source_attrs, related):
+    """
+    Return the `.values()` path of the column read by a field with
+    `source_attrs` on `model`, or None if it does not read a single
+    column. `related` is whether the field reads the primary key of a
+    relation.
+    """
+    for index, attr in enumerate(source_attrs):
+        last = index == len(source_attrs) - 1
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            # An annotation, or a property that .values() rejects.
+            return attr if len(source_attrs) == 1 and not related else None
+        if not model_field.is_relation:
+            return "__".join(source_attrs) if last and not related else None
+        if not model_field.concrete or not (model_field.many_to_one or model_field.one_to_one):
+            return None
+        if last:
+            return "__".join(source_attrs) if related else None
+        model = model_field.related_model
+    return None
+
+
+class RowSerializer:
+    """
+    Build the representation of a read-only serializer from `.values()`
+    rows, with a function generated for its fields, instead of
+    instantiating models and running `get_attribute()` and
+    `to_representation()` field by field. The output is the same.
+
+    Nested `many=True` serializers of reverse foreign keys are read with
+    one query each, like a prefetch. Use `for_serializer()`.
+    """
+    # The most recently used compiled serializers, by serializer class and
+    # fields: clients choose the fields, so the cache is bounded.
+    max_compiled = 256
+    _compiled = OrderedDict()
+    _compiled_lock = threading.Lock()
+
+    def __init__(self, serializer, model):
+        self.model = model
+        self.paths = []
+        # The fields converting their column, and the nested serializers
+        # with their foreign key.
+        self.columns = []
+        self.nested = []
+        entries = []
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.ListSerializer):
+                entries.append(self.add_nested(field))
+                continue
+            related = isinstance(field, relations.PrimaryKeyRelatedField)
+            if isinstance(field, UNSUPPORTED_FIELDS) and not related:
+                raise ValueError(f"{field.field_name} is not read from a column.")
+            path = column_path(model, field.source_attrs, related) if field.source != "*" else None
+            if path is None:
+                raise ValueError(f"{field.field_name} is not read from a column.")
+            self.add_path(path)
+            if converter(field, None) is None:
+                entries.append(f"{field.field_name!r}: row[{path!r}]")
+            else:
+                self.columns.append(field)
+                name = f"c{len(self.columns) - 1}"
+                entries.append(f"{field.field_name!r}: None if (value := row[{path!r}]) is None else {name}(value)")
+        self.make = self.generate(entries)
+
+    @classmethod
+    def for_serializer(cls, serializer):
+        """
+        Return the `RowSerializer` of the fields of `serializer`, compiled
+        once per serializer class and fields while among the `max_compiled`
+        most recently used, or None if one of them is not read from a
+        single column.
+        """
+        key = (type(serializer), tuple(serializer.fields))
+        with cls._compiled_lock:
+            if key in cls._compiled:
+                cls._compiled.move_to_end(key)
+                return cls._compiled[key]
+        try:
+            compiled = cls(serializer, serializer.Meta.model)
+        except ValueError:
+            compiled = None
+        with cls._compiled_lock:
+            cls._compiled[key] = compiled
+            while len(cls._compiled) > cls.max_compiled:
+                cls._compiled.popitem(last=False)
+        return compiled
+
+    def add_path(self, path):
+        if path not in self.paths:
+            self.paths.append(path)
+
+    def add_nested(self, field):
+        try:
+            relation = self.model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            raise ValueError(f"{field.field_name} is not a relation.")
+        if not relation.one_to_many:
+            raise ValueError(f"{field.field_name} is not a reverse foreign key.")
+        child = RowSerializer(field.child, relation.related_model)
+        if child.nested:
+            raise ValueError(f"{field.field_name} is nested twice.")
+        foreign_key = relation.field
+        child.add_path(foreign_key.attname)
+        self.add_path(foreign_key.target_field.attname)
+        self.nested.append((field.field_name, child, foreign_key))
+        return f"{field.field_name!r}: n{len(self.nested) - 1}.get(row[{foreign_key.target_field.attname!r}], [])"
+
+    def generate(self, entries):
+        """
+        Return the function taking the converters of the columns and the
+        nested representations by parent key, and returning the function
+        that builds the dict of a row.
+        """
+        parameters = [f"c{index}" for index in range(len(self.columns))]
+        parameters += [f"n{index}" for index in range(len(self.nested))]
+        source = (
+            f"def make({', '.join(parameters)}):\n"
+            f"    def to_dict(row):\n"
+            f"        return {{{', '.join(entries)}}}\n"
+            f"    return to_dict\n"
+        )
+        namespace = {}
+        exec(source, namespace)
+        return namespace["make"]
+
+    def values(self, queryset, *paths):
+        """
+        Return `queryset` fetching the columns of the fields, and `paths`.
+        Raises FieldError if a field reads an annotation `queryset` lacks.
+        """
+        return queryset.prefetch_related(None).values(*self.paths, *[path for path in paths if path not in self.paths])
+
+    def nested_values(self, rows, querysets=None):
+        """
+        Return the `.values()` querysets of the nested rows of `rows`, by
+        field name, filtering `querysets[name]` if given, like a prefetch.
+        """
+        querysets = querysets or {}
+        nested = {}
+        for name, child, foreign_key in self.nested:
+            keys = {row[foreign_key.target_field.attname] for row in rows}
+            queryset = querysets.get(name, child.model._default_manager.all())
+            nested[name] = child.values(queryset.filter(**{f"{foreign_key.attname}__in": keys}))
+        return nested
+
+    def to_representation(self, rows, nested_rows=None):
+        """
+        Return the representation of `rows`, given the rows of the nested
+        querysets of `nested_values()`.
+        """
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        groups = []
+        for name, child, foreign_key in self.nested:
+            by_parent = {}
+            child_rows = nested_rows[name]
+            for key, data in zip((row[foreign_key.attname] for row in child_rows), child.to_representation(child_rows)):
+                by_parent.setdefault(key, []).append(data)
+            groups.append(by_parent)
+        to_dict = self.make(*[converter(field, tz) for field in self.columns], *groups)
+        return [to_dict(row) for row in rows]
+
+    def serialize(self, rows, querysets=None):
+        nested = {name: list(queryset) for name, queryset in self.nested_values(rows, querysets).items()}
+        return self.to_representation(rows, nested)
@@ -0,0 +1,162 @@
+import logging
+import time
+from contextlib import contextmanager
+
+from django.db import connections, DatabaseError
+from django.db.models import BooleanField, Expression, F, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Substr
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from auctions.models import ListingSearchIndex
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = ListingSearchIndex._meta.db_table
+
+# Weights of the name and description columns in the bm25 rank.
+RANK_WEIGHTS = (10.0, 1.0)
+
+SNIPPET_TOKENS = 16
+
+# Number of SQLite VM instructions between two checks of the time limit.
+PROGRESS_INSTRUCTIONS = 10000
+
+_available = {}
+
+
+class SearchTimeout(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "The search took too long, please use more specific terms."
+    default_code = "search_timeout"
+
+
+def create_search_index(using="default"):
+    """
+    Create the FTS5 table and the triggers that keep it in sync with
+    `auctions_listing`, if the database is SQLite with FTS5 support.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return False
+    statements = [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+            name, description, content='auctions_listing', content_rowid='id')""",
+        f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON auctions_listing BEGIN
+            INSERT INTO {SEARCH_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON auctions_listing BEGIN
+            INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        END""",
+        # Only edits of the indexed columns touch the index, not bids.
+        f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update AFTER UPDATE OF name, description ON auctions_listing BEGIN
+            INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO {SEARCH_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+        END""",
+        f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rank) VALUES ('rank', 'bm25({RANK_WEIGHTS[0]}, {RANK_WEIGHTS[1]})')",
+    ]
+    try:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+    except DatabaseError:
+        logger.warning("Could not create the listing search index, search falls back to LIKE queries.", exc_info=True)
+        return False
+    _available[using] = True
+    return True
+
+
+def rebuild_search_index(using="default"):
+    """
+    Rebuild the whole FTS5 index from `auctions_listing` in one statement.
+    """
+    create_search_index(using)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT count(*) FROM {SEARCH_TABLE}")
+        return cursor.fetchone()[0]
+
+
+def has_search_index(using="default"):
+    if using not in _available:
+        connection = connections[using]
+        if connection.vendor != "sqlite":
+            _available[using] = False
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [SEARCH_TABLE])
+                _available[using] = cursor.fetchone() is not None
+    return _available[using]
+
+
+def build_match_query(terms):
+    """
+    Turn user input into an FTS5 query matching every term, the last one
+    as a prefix, with any FTS5 syntax in the input quoted away.
+    """
+    quoted = ['"%s"' % term.replace('"', '""') for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+class Match(Expression):
+    """
+    `<search table> MATCH <query>`, for a queryset that joins the search table.
+    """
+    output_field = BooleanField()
+    conditional = True
+
+    def __init__(self, query):
+        super().__init__()
+        self.query = query
+
+    def as_sql(self, compiler, connection):
+        return f"{compiler.quote_name_unless_alias(SEARCH_TABLE)} MATCH %s", [self.query]
+
+
+def search_listings(queryset, q, using="default"):
+    """
+    Filter `queryset` down to the listings matching every term of `q`.
+
+    With the FTS5 index the listings are annotated with their `rank` and
+    with `highlight`/`snippet` marking the matched terms. Without it every
+    term is matched with LIKE against the name and description.
+    """
+    terms = q.split()
+    if has_search_index(using):
+        # Filtering on the relation makes the join to the search table an
+        # INNER JOIN, MATCH is not usable on the right side of a LEFT JOIN.
+        return queryset.filter(search_index__isnull=False).annotate(
+            rank=F("search_index__rank"),
+            highlight=RawSQL(f"highlight({SEARCH_TABLE}, 0, '<mark>', '</mark>')", ()),
+            snippet=RawSQL(f"snippet({SEARCH_TABLE}, 1, '<mark>', '</mark>', '…', {SNIPPET_TOKENS})", ()),
+        ).filter(Match(build_match_query(terms)))
+
+    for term in terms:
+        queryset = queryset.filter(Q(name__icontains=term) | Q(description__icontains=term))
+    return queryset.annotate(highlight=F("name"), snippet=Substr("description", 1, 200))
+
+
+@contextmanager
+def time_limit(seconds, using="default"):
+    """
+    Abort the SQLite queries run inside the block once `seconds` have
+    passed, raising `SearchTimeout`.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite" or not seconds:
+        yield
+        return
+    connection.ensure_connection()
+    deadline = time.monotonic() + seconds
+    connection.connection.set_progress_handler(lambda: time.monotonic() > deadline, PROGRESS_INSTRUCTIONS)
+    try:
+        yield
+    except DatabaseError as error:
+        if "interrupted" in str(error):
+            raise SearchTimeout()
+        raise
+    finally:
+        connection.connection.set_progress_handler(None, 0)
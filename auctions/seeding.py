@@ -0,0 +1,150 @@
+import random
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from auctions.activity import bid_bucket
+from auctions.models import User, Listing, ListingBidBucket, Bid, Comment, CollectionVersion
+
+WORDS = (
+    "vintage", "leather", "jacket", "camera", "lens", "guitar", "amplifier", "vinyl", "record", "bicycle",
+    "helmet", "watch", "ring", "necklace", "lamp", "chair", "table", "rug", "puzzle", "board",
+    "game", "console", "controller", "poster", "painting", "sculpture", "coin", "stamp", "comic", "novel",
+    "atlas", "tent", "kayak", "skates", "racket", "engine", "tyre", "speaker", "headphones", "keyboard",
+    "teapot", "espresso", "grinder", "aquarium", "saddle", "easel", "canvas", "quilt", "mirror", "clock",
+)
+# Highest bid the seeded bids may reach, leaving room under the 9999.99
+# limit of `bid_amount` for the bids placed afterwards.
+MAX_SEEDED_BID = Decimal("9000.00")
+
+
+def skewed_counts(total, ids, hot, hot_share, rng):
+    """
+    Spread `total` items over `ids`: `hot_share` of them over the first
+    `hot` ids, the rest over the others with weights falling as 1/rank.
+    """
+    if not ids:
+        return Counter()
+    hot_ids, other_ids = ids[:hot], ids[hot:] or ids[:hot]
+    hot_total = round(total * hot_share) if hot_ids else 0
+    counts = Counter(rng.choices(hot_ids, k=hot_total)) if hot_total else Counter()
+    weights = [1 / rank for rank in range(1, len(other_ids) + 1)]
+    counts.update(rng.choices(other_ids, weights=weights, k=total - hot_total))
+    return counts
+
+
+def bid_amounts(starting_bid, count, rng):
+    """
+    Return `count` increasing bid amounts above `starting_bid`, by random
+    steps of 5.00 on average, under MAX_SEEDED_BID.
+    """
+    start = int(starting_bid * 100)
+    budget = min(int(MAX_SEEDED_BID * 100) - start, count * 500)
+    if budget < count:
+        raise ValueError(f"{count} bids do not fit between {starting_bid} and {MAX_SEEDED_BID}.")
+    steps = list(accumulate(rng.randint(1, 100) for _ in range(count)))
+    # One cent per bid, plus the random steps scaled to the rest of the budget.
+    return [Decimal(start + i + 1 + step * (budget - count) // steps[-1]) / 100 for i, step in enumerate(steps)]
+
+
+def seed_auctions(users=100, listings=1000, bids=10000, comments=2000, hot=5, hot_share=0.5, days=1,
+                  prefix="seed", seed=0, batch_size=1000):
+    """
+    Bulk-create `users`, `listings`, `bids` and `comments` with usernames
+    starting with `prefix`, in a single transaction.
+
+    `hot_share` of the bids and comments go to `hot` listings, the rest to
+    the other listings with weights falling as 1/rank, the few very active
+    auctions of production. Bids are placed over the last `days` days, in
+    increasing amounts per listing, and the activity of the listings and
+    their feed buckets are set from them. The same `seed` gives the same
+    data.
+
+    Return the number of objects created, by kind.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    categories = [value for value, _ in Listing.CATEGORY_CHOICES]
+    password = make_password(f"{prefix}-password")
+
+    with transaction.atomic():
+        created_users = User.objects.bulk_create([
+            User(username=f"{prefix}-user-{i}", email=f"{prefix}-user-{i}@example.com", password=password)
+            for i in range(users)
+        ], batch_size=batch_size)
+        user_ids = [user.pk for user in created_users]
+
+        created_listings = []
+        for i in range(listings):
+            starting_bid = Decimal(rng.randint(100, 50000)) / 100
+            created_listings.append(Listing(
+                owner_id=rng.choice(user_ids), name=" ".join(rng.sample(WORDS, 3)).capitalize(),
+                description=" ".join(rng.choices(WORDS, k=20)), starting_bid=starting_bid, current_bid=starting_bid,
+                category=rng.choice(categories),
+                ends_at=now + timedelta(seconds=rng.randint(3600, 7 * 86400)) if rng.random() < 0.9 else None,
+            ))
+        created_listings = Listing.objects.bulk_create(created_listings, batch_size=batch_size)
+        listing_ids = [listing.pk for listing in created_listings]
+        by_id = {listing.pk: listing for listing in created_listings}
+
+        # Bids in date order, so that their ids follow their dates.
+        rows = []
+        for listing_id, count in skewed_counts(bids, listing_ids, hot, hot_share, rng).items():
+            listing = by_id[listing_id]
+            dates = sorted(now - timedelta(seconds=rng.uniform(0, days * 86400)) for _ in range(count))
+            for bid_date, amount in zip(dates, bid_amounts(listing.starting_bid, count, rng)):
+                bidder_id = rng.choice(user_ids)
+                rows.append((bid_date, listing_id, bidder_id, amount))
+                listing.current_bid, listing.last_bid_at, listing.top_bidder_id = amount, bid_date, bidder_id
+                listing.bid_count += 1
+        rows.sort()
+        buckets = Counter()
+        for start in range(0, len(rows), batch_size):
+            Bid.objects.bulk_create([
+                Bid(listing_id=listing_id, bidder_id=bidder_id, bid_amount=amount, bid_date=bid_date)
+                for bid_date, listing_id, bidder_id, amount in rows[start:start + batch_size]
+            ])
+        for bid_date, listing_id, _, _ in rows:
+            buckets[listing_id, bid_bucket(bid_date)] += 1
+        ListingBidBucket.objects.bulk_create([
+            ListingBidBucket(listing_id=listing_id, bucket=bucket, bid_count=count)
+            for (listing_id, bucket), count in buckets.items()
+        ], batch_size=batch_size)
+
+        comment_counts = skewed_counts(comments, listing_ids, hot, hot_share, rng)
+        texts = {}
+        for listing_id, count in comment_counts.items():
+            by_id[listing_id].comment_count = count
+            texts[listing_id] = [" ".join(rng.choices(WORDS, k=rng.randint(3, 15))).capitalize() for _ in range(count)]
+        Comment.objects.bulk_create([
+            Comment(listing_id=listing_id, commentor_id=rng.choice(user_ids), text=text)
+            for listing_id, listing_texts in texts.items() for text in listing_texts
+        ], batch_size=batch_size)
+
+        Listing.objects.bulk_update(
+            [listing for listing in created_listings if listing.bid_count or listing.comment_count],
+            ["current_bid", "bid_count", "comment_count", "last_bid_at", "top_bidder"], batch_size=batch_size,
+        )
+        CollectionVersion.bump(Listing.COLLECTION)
+
+    return {"users": len(user_ids), "listings": len(listing_ids), "bids": len(rows), "comments": sum(comment_counts.values())}
+
+
+def clear_seeded(prefix="seed"):
+    """
+    Delete the users created by `seed_auctions` with `prefix`, and their
+    listings, bids and comments. Return the number of users deleted.
+    """
+    users = User.objects.filter(username__startswith=f"{prefix}-user-")
+    count = users.count()
+    with transaction.atomic():
+        # The listings first, so that their bids and comments are not
+        # deleted one bidder at a time, each recomputing its listing.
+        Listing.objects.filter(owner__in=users).delete()
+        users.delete()
+    return count
@@ -1,38 +1,218 @@
 from auctions.models import User, Listing, Bid, Comment
 from rest_framework import serializers
+from rest_framework.settings import api_settings
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
 
-class BidSerializer(serializers.ModelSerializer):
+from auctions.instrumentation import timed
+
+
+class TimedSerializerMixin:
+    """
+    Count the time spent building `.data` of a top-level serializer as the
+    `serialize` timing of the request, see `auctions.instrumentation`.
+    """
+
+    @property
+    def data(self):
+        if self.parent is not None:
+            return super().data
+        with timed("serialize"):
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class BidSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     bidder = serializers.ReadOnlyField(source='bidder.username')
     listing = serializers.ReadOnlyField(source='listing.name')
     
     class Meta:
         model = Bid
         fields = ["id", "listing", "bidder", "bid_amount", "bid_date"]
+        list_serializer_class = TimedListSerializer
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     commentor = serializers.ReadOnlyField(source='commentor.username')
     listing = serializers.ReadOnlyField(source='listing.name')
 
     class Meta:
         model = Comment
         fields = ["id", "listing", "commentor", "text", "comment_at"]
+        list_serializer_class = TimedListSerializer
+
+class BulkCreateListSerializer(serializers.ListSerializer):
+    """
+    Validates each item on its own, so that invalid items do not reject
+    the valid ones: `validated_data` holds the valid items and
+    `item_errors` the errors of every item, empty for the valid ones.
+    `save()` inserts the valid items with `bulk_create`.
+    """
+    batch_size = 500
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            message = self.error_messages['not_a_list'].format(input_type=type(data).__name__)
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code='not_a_list')
+        validated = []
+        self.item_errors = []
+        for item in data:
+            try:
+                validated.append(self.child.run_validation(item))
+                self.item_errors.append({})
+            except serializers.ValidationError as exc:
+                self.item_errors.append(exc.detail)
+        return validated
 
-class ListingSerializer(serializers.ModelSerializer):
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        return model.objects.bulk_create([model(**attrs) for attrs in validated_data], batch_size=self.batch_size)
+
+
+class DynamicFieldsModelSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    A ModelSerializer that takes an additional `fields` argument that
+    controls which fields should be displayed.
+    """
+    default_fields = None
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        if fields is None:
+            fields = self.default_fields
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+
+class ListingSerializer(DynamicFieldsModelSerializer):
     owner = serializers.ReadOnlyField(source='owner.username')
     bids = BidSerializer(many=True, read_only=True)
     comments = CommentSerializer(many=True, read_only=True)
+    winning_bid = serializers.PrimaryKeyRelatedField(read_only=True)
+    top_bidder = serializers.ReadOnlyField(source='top_bidder.username', default=None)
     class Meta:
         model = Listing
-        fields = ["id", "owner", "name", "description", "starting_bid", "current_bid", "bids","comments", "created_at", "image_url", "active", "category"]
+        fields = ["id", "owner", "name", "description", "starting_bid", "current_bid", "bids","comments", "created_at", "image_url", "active", "category", "ends_at", "winning_bid", "bid_count", "comment_count", "last_bid_at", "top_bidder"]
+        list_serializer_class = TimedListSerializer
+
+    def validate_ends_at(self, value):
+        if value is not None and value <= timezone.now():
+            raise serializers.ValidationError("Must be in the future.")
+        return value
+
+
+class ListingSummarySerializer(ListingSerializer):
+    """
+    The listing as shown in a grid, without the nested bids and comments
+    unless they are asked for. Their counts and the top bidder are read
+    from the listing row.
+    """
+    default_fields = ["id", "name", "current_bid", "image_url", "category", "bid_count", "comment_count", "last_bid_at", "top_bidder"]
+
 
+class ListingSearchSerializer(ListingSummarySerializer):
+    """
+    A listing summary with the matched terms of the search marked in the
+    name (`highlight`) and in an excerpt of the description (`snippet`).
+    """
+    highlight = serializers.ReadOnlyField()
+    snippet = serializers.ReadOnlyField()
+    default_fields = ListingSummarySerializer.default_fields + ["highlight", "snippet"]
 
+    class Meta(ListingSummarySerializer.Meta):
+        fields = ListingSummarySerializer.Meta.fields + ["highlight", "snippet"]
 
-class UserSerializer(serializers.HyperlinkedModelSerializer):
-    listings = serializers.HyperlinkedRelatedField(many=True, view_name='listing-detail', read_only=True)
+
+class ListingFeedSerializer(ListingSummarySerializer):
+    """
+    A listing summary with the `score` it is ranked by in the trending and
+    most bid feeds.
+    """
+    score = serializers.ReadOnlyField(default=None)
+    default_fields = ListingSummarySerializer.default_fields + ["score"]
+
+    class Meta(ListingSummarySerializer.Meta):
+        fields = ListingSummarySerializer.Meta.fields + ["score"]
+
+
+class BidReplaySerializer(serializers.ModelSerializer):
+    """
+    A historical bid to replay, referring to its listing by id and to its
+    bidder by username. Both are resolved in bulk by the replay view. The
+    bid is dated `bid_date`, now by default.
+    """
+    listing = serializers.IntegerField()
+    bidder = serializers.CharField()
+    bid_date = serializers.DateTimeField(required=False)
+
+    class Meta:
+        model = Bid
+        fields = ["listing", "bidder", "bid_amount", "bid_date"]
+
+    def validate_bid_date(self, value):
+        if value > timezone.now():
+            raise serializers.ValidationError("Must not be in the future.")
+        return value
+
+class TemplatedURLMixin:
+    """
+    Build the URL of each object by filling its pk in a URL reversed once
+    per field, instead of a `reverse()` per object. For views looked up by
+    pk alone.
+    """
+    # Reversed in place of the pk, a number no route can mistake for more.
+    placeholder = 918273645546372819
+
+    def get_url(self, obj, view_name, request, format):
+        if hasattr(obj, "pk") and obj.pk in (None, ""):
+            return None
+        if self.lookup_field != "pk":
+            return super().get_url(obj, view_name, request, format)
+        templates = self.__dict__.setdefault("_url_templates", {})
+        if (view_name, format) not in templates:
+            url = self.reverse(view_name, kwargs={self.lookup_url_kwarg: self.placeholder}, request=request, format=format)
+            parts = url.split(str(self.placeholder))
+            templates[view_name, format] = parts if len(parts) == 2 else None
+        parts = templates[view_name, format]
+        if parts is None:
+            return super().get_url(obj, view_name, request, format)
+        return f"{parts[0]}{obj.pk}{parts[1]}"
+
+
+class TemplatedHyperlinkedRelatedField(TemplatedURLMixin, serializers.HyperlinkedRelatedField):
+    pass
+
+
+class TemplatedHyperlinkedIdentityField(TemplatedURLMixin, serializers.HyperlinkedIdentityField):
+    pass
+
+
+class UserSerializer(DynamicFieldsModelSerializer):
+    """
+    The user with the number of their listings, annotated by
+    `auctions.accounts.with_listing_count()`, and the links to the listings
+    only when asked for.
+    """
+    url = TemplatedHyperlinkedIdentityField(view_name='user-detail')
+    listing_count = serializers.IntegerField(read_only=True)
+    listings = TemplatedHyperlinkedRelatedField(many=True, view_name='listing-detail', read_only=True)
     password = serializers.CharField(write_only=True, required=True)
+    default_fields = ["url", "id", "username", "email", "password", "listing_count"]
     class Meta:
         model = User
-        fields = ["url", "id", "username", "email", "password", "listings"]
+        fields = ["url", "id", "username", "email", "password", "listing_count", "listings"]
+        list_serializer_class = TimedListSerializer
+
+    def create(self, validated_data):
+        # Hashed before the insert, the plain password is never stored.
+        validated_data["password"] = make_password(validated_data["password"])
+        user = super().create(validated_data)
+        user.listing_count = 0
+        return user
 
 # class UserSerializer(serializers.ModelSerializer):
 #     listings = serializers.PrimaryKeyRelatedField(many=True, queryset=Listing.objects.all())
@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models import Q, QuerySet
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from auctions.activity import recompute_activity_on_commit
+from auctions.cache import listing_cache, token_cache
+from auctions.instrumentation import instrument
+from auctions.models import CollectionVersion, User, Listing, Bid, Comment
+from auctions.search import create_search_index
+
+
+@receiver(post_delete, sender=Listing)
+def listing_deleted(sender, instance, **kwargs):
+    CollectionVersion.bump(Listing.COLLECTION)
+
+
+def deleting_listings(origin):
+    """
+    Whether the deletion started from `origin` deletes listings, and with
+    them the bids and comments being deleted.
+    """
+    return (origin.model if isinstance(origin, QuerySet) else type(origin)) is Listing
+
+
+@receiver(post_delete, sender=Bid)
+def bid_deleted(sender, instance, origin=None, **kwargs):
+    if not deleting_listings(origin):
+        recompute_activity_on_commit([instance.listing_id], ["bid_count", "last_bid_at", "top_bidder"])
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, origin=None, **kwargs):
+    if not deleting_listings(origin):
+        recompute_activity_on_commit([instance.listing_id], ["comment_count"])
+
+
+@receiver(post_save, sender=Bid)
+@receiver(post_save, sender=Comment)
+def bump_listing(sender, instance, raw=False, **kwargs):
+    # The nested bids and comments are versioned with their listing.
+    if instance.bumps_listing and not raw:
+        Listing.objects.filter(pk=instance.listing_id).bump_version()
+
+
+@receiver(post_save, sender=User)
+def bump_user_listings(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # The listings show the usernames of their owner, bidders and commentors.
+    if created or raw or (update_fields is not None and "username" not in update_fields):
+        return
+    Listing.objects.filter(
+        Q(owner=instance)
+        | Q(pk__in=Bid.objects.filter(bidder=instance).values("listing"))
+        | Q(pk__in=Comment.objects.filter(commentor=instance).values("listing"))
+    ).bump_version()
+
+
+@receiver(post_save, sender=Listing)
+@receiver(post_delete, sender=Listing)
+def invalidate_listing(sender, instance, **kwargs):
+    listing_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Bid)
+@receiver(post_delete, sender=Bid)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_listing_activity(sender, instance, **kwargs):
+    listing_cache.invalidate(instance.listing_id)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    # A deactivated or changed user is authenticated again from the
+    # database. Deleting a user deletes its tokens, see invalidate_token().
+    if not created:
+        token_cache.invalidate(*Token.objects.filter(user_id=instance.pk).values_list("key", flat=True))
+
+
+@receiver(post_migrate)
+def listing_search_index(sender, using, **kwargs):
+    if sender.name == "auctions":
+        create_search_index(using)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    if settings.AUCTIONS_INSTRUMENTATION:
+        instrument(connection)
@@ -0,0 +1,94 @@
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Django's SQLite backend with three more OPTIONS:
+
+    - `pragmas`: the PRAGMAs set on each new connection, e.g.
+      {"journal_mode": "WAL", "synchronous": "NORMAL"}.
+    - `transaction_mode`: "DEFERRED" (SQLite's default), "IMMEDIATE" or
+      "EXCLUSIVE", how `atomic()` blocks begin. An IMMEDIATE transaction
+      takes the write lock when it begins, waiting up to `timeout` for it,
+      instead of failing with "database is locked" when a transaction that
+      has read tries to write while another one holds the lock, which no
+      timeout can avoid.
+    - `write_lock`: whether the `atomic()` blocks of the threads of the
+      process wait for each other on a lock of the database file before
+      they begin, in turn, instead of polling SQLite's lock with sleeps
+      of up to 100ms. Not used for in-memory databases.
+    """
+    TRANSACTION_MODES = ("DEFERRED", "IMMEDIATE", "EXCLUSIVE")
+    # The write locks of the process, by database file.
+    write_locks = {}
+    write_locks_lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        options = self.settings_dict["OPTIONS"]
+        self.pragmas = dict(options.get("pragmas", {}))
+        self.transaction_mode = options.get("transaction_mode", "DEFERRED").upper()
+        if self.transaction_mode not in self.TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"transaction_mode of the {self.alias} database must be one of {', '.join(self.TRANSACTION_MODES)}."
+            )
+        self.use_write_lock = options.get("write_lock", False)
+        self.held_write_lock = None
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        for option in ("pragmas", "transaction_mode", "write_lock"):
+            kwargs.pop(option, None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def get_write_lock(self):
+        # The test database replaces NAME after the connection is created.
+        if not self.use_write_lock or self.is_in_memory_db():
+            return None
+        with self.write_locks_lock:
+            return self.write_locks.setdefault(self.settings_dict["NAME"], threading.Lock())
+
+    def release_write_lock(self):
+        if self.held_write_lock is not None:
+            self.held_write_lock.release()
+            self.held_write_lock = None
+
+    def _start_transaction_under_autocommit(self):
+        lock = self.get_write_lock()
+        if lock is not None:
+            if not lock.acquire(timeout=self.settings_dict["OPTIONS"].get("timeout", 5)):
+                raise OperationalError("database is locked")
+            self.held_write_lock = lock
+        try:
+            self.cursor().execute(f"BEGIN {self.transaction_mode}")
+        except BaseException:
+            self.release_write_lock()
+            raise
+
+    def _commit(self):
+        try:
+            super()._commit()
+        finally:
+            self.release_write_lock()
+
+    def _rollback(self):
+        try:
+            super()._rollback()
+        finally:
+            self.release_write_lock()
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            self.release_write_lock()
@@ -1,9 +1,51 @@
-from django.test import TestCase, RequestFactory
-from django.urls import reverse
-from rest_framework import status
+import asyncio
+import csv
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from types import ModuleType
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync, sync_to_async
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import request_finished
+from django.core.management import CommandError, call_command
+from django.core.cache import caches
+from django.db import OperationalError, connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, reverse
+from django.utils import timezone
+from rest_framework import exceptions, generics, relations, serializers, status
+from rest_framework.authtoken.models import Token
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
-from auctions.models import User, Listing, Bid, Comment
-from auctions.serializers import UserSerializer, ListingSerializer, CommentSerializer, BidSerializer
+from auctions import async_views, urls, views
+from auctions.activity import bid_bucket, check_activity, record_bids
+from auctions.bidding import AuctionClosed, BidBatcher, BidConflict, PendingBid, place_bid
+from auctions.cache import token_cache
+from auctions.closing import close_all_expired_auctions, close_expired_auctions
+from auctions.conditional import ConditionalGetMixin
+from auctions.events import bid_channel, publish_bid
+from auctions.feeds import compact_bid_buckets
+from auctions.instrumentation import metrics
+from auctions.parsers import FastJSONParser
+from auctions.pubsub import BaseBackend, Hub, LocalBackend, get_hub
+from auctions.replicas import ReplicaMiddleware, ReplicaRouter, copy_to_replica
+from auctions.renderers import FastJSONRenderer, msgpack
+from auctions.models import User, CollectionVersion, Listing, ListingBidBucket, Bid, Comment
+from auctions.rows import RowSerializer
+from auctions.sqlite3.base import DatabaseWrapper
+from auctions.serializers import TemplatedHyperlinkedRelatedField, UserSerializer, ListingSerializer, ListingSummarySerializer, CommentSerializer, BidSerializer
 
 class UserSerializerTestCase(TestCase):
     """
@@ -20,7 +62,7 @@ class UserSerializerTestCase(TestCase):
         self.assertEqual(self.serializer.is_valid(), True)
         self.serializer.save()
         data = self.serializer.data
-        expected_fields = {"url", "id", "username", "email", "listings"}
+        expected_fields = {"url", "id", "username", "email", "listing_count"}
         self.assertSetEqual(set(data.keys()), expected_fields)
 
     def test_username_field_content(self):
@@ -44,6 +86,106 @@ class UserSerializerTestCase(TestCase):
         data = self.serializer.initial_data
         self.assertEqual(data['password'], self.user_data['password'])
 
+@override_settings(AUCTIONS_PASSWORD_ITERATIONS=1000)
+class AccountTestCase(TestCase):
+    """
+    Test case for the register and login views
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpass')
+        self.credentials = {'username': 'testuser', 'password': 'testpass'}
+
+    def test_register_inserts_hashed_user_once(self):
+        """
+        Test that registering inserts the user once, with the password already hashed, and its token
+        """
+        data = {'username': 'newuser', 'email': 'newuser@example.com', 'password': 'newpass'}
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(reverse('register'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        user = User.objects.get(username='newuser')
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+        self.assertTrue(user.check_password('newpass'))
+        self.assertEqual(response.data['token'], Token.objects.get(user=user).key)
+        self.assertNotIn('password', response.data['user'])
+        writes = [q['sql'].split()[0] + ' ' + q['sql'].split()[2] for q in context.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(writes, ['INSERT "auctions_user"', 'INSERT "authtoken_token"'])
+
+    def test_register_invalid(self):
+        """
+        Test that registering an existing username is rejected without writes
+        """
+        response = self.client.post(reverse('register'), {'username': 'testuser', 'password': 'other'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('username', response.data)
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_login_single_query(self):
+        """
+        Test that a login fetches the user and its token with a single query
+        """
+        token = Token.objects.create(user=self.user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(reverse('login'), self.credentials, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['token'], token.key)
+        self.assertEqual(response.data['user']['username'], 'testuser')
+        queries = [q['sql'] for q in context.captured_queries if 'authtoken_token' in q['sql']]
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"auctions_user"', queries[0])
+
+    def test_login_creates_missing_token(self):
+        """
+        Test that the first login of a user without a token creates it
+        """
+        response = self.client.post(reverse('login'), self.credentials, format='json')
+        self.assertEqual(response.data['token'], Token.objects.get(user=self.user).key)
+
+    def test_login_rejected(self):
+        """
+        Test that a wrong password or an unknown username is rejected
+        """
+        for credentials in ({'username': 'testuser', 'password': 'wrong'}, {'username': 'nobody', 'password': 'testpass'}, {}):
+            response = self.client.post(reverse('login'), credentials, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, credentials)
+        self.assertFalse(Token.objects.exists())
+
+    def test_login_rehashes_with_new_work_factor(self):
+        """
+        Test that a login rehashes a password made with another work factor
+        """
+        with override_settings(AUCTIONS_PASSWORD_ITERATIONS=2000):
+            self.client.post(reverse('login'), self.credentials, format='json')
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+        self.assertTrue(self.user.check_password('testpass'))
+
+    def test_async_login(self):
+        """
+        Test that the async login view answers like the sync one
+        """
+        token = Token.objects.create(user=self.user)
+        view = async_views.Login.as_view()
+        request = RequestFactory().post(reverse('login'), self.credentials, content_type='application/json')
+        response = async_to_sync(view)(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = json.loads(response.content)
+        self.assertEqual(data['token'], token.key)
+        self.assertEqual(data['user']['username'], 'testuser')
+        request = RequestFactory().post(reverse('login'), {'username': 'testuser', 'password': 'wrong'}, content_type='application/json')
+        self.assertEqual(async_to_sync(view)(request).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bench_logins(self):
+        """
+        Test that the login benchmark reports the logins per second of each work factor
+        """
+        out = StringIO()
+        call_command('bench_logins', logins=2, iterations='1000,2000', stdout=out)
+        self.assertIn('1000 iterations:', out.getvalue())
+        self.assertIn('2000 iterations:', out.getvalue())
+
+
 class ListingSerializerTestCase(TestCase):
     """
     Test case for ListingSerializer
@@ -60,7 +202,7 @@ class ListingSerializerTestCase(TestCase):
         self.assertEqual(self.serializer.is_valid(), True)
         self.serializer.save(owner=self.user)
         data = self.serializer.data
-        self.assertEqual(set(data.keys()), set(["id", "owner", "name", "description", "starting_bid", "current_bid", "bids","comments", "created_at", "image_url", "active", "category"]))
+        self.assertEqual(set(data.keys()), set(["id", "owner", "name", "description", "starting_bid", "current_bid", "bids","comments", "created_at", "image_url", "active", "category", "ends_at", "winning_bid", "bid_count", "comment_count", "last_bid_at", "top_bidder"]))
 
     def test_name_field_content(self):
         """
@@ -326,6 +468,27 @@ class BidCreateViewTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(response.data, ['Bid amount must be greater than current bid.'])
 
+    def test_bid_updates_current_bid(self):
+        """
+        Test that an accepted bid becomes the current bid of the listing
+        """
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(self.url, {'bid_amount': '10.01'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['listing'], 'Test Listing')
+        self.listing.refresh_from_db()
+        self.assertEqual(str(self.listing.current_bid), '10.01')
+
+    def test_outbid_by_concurrent_bid(self):
+        """
+        Test that a bid that loses the race against a concurrent bid gets a 409
+        """
+        stale = Listing.objects.get(pk=self.listing.pk)
+        Listing.objects.filter(pk=self.listing.pk).update(current_bid=25)
+        with self.assertRaises(BidConflict):
+            place_bid(stale, self.user, Decimal('20.00'))
+        self.assertEqual(Bid.objects.count(), 0)
+
 
 class ApiRootViewTestCase(TestCase):
     """
@@ -341,4 +504,2262 @@ class ApiRootViewTestCase(TestCase):
         """
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, {'users': 'http://testserver/api/users/', 'listings': 'http://testserver/api/listings/'})
\ No newline at end of file
+        self.assertEqual(response.data, {'users': 'http://testserver/api/users/', 'listings': 'http://testserver/api/listings/'})
+
+class ListingQueryCountTestCase(TestCase):
+    """
+    Test case for the number of queries used by the listing views
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpass')
+
+    def create_listings(self, count):
+        start = Listing.objects.count()
+        for i in range(start, start + count):
+            listing = Listing.objects.create(name=f'Listing {i}', description='This is a test listing.', starting_bid=10.0, current_bid=10.0, owner=self.user)
+            bidder = User.objects.create_user(username=f'bidder{i}', password='testpass')
+            Bid.objects.create(bid_amount=20.0, bidder=bidder, listing=listing)
+            Bid.objects.create(bid_amount=30.0, bidder=self.user, listing=listing)
+            Comment.objects.create(text='This is a test comment.', commentor=bidder, listing=listing)
+
+    def test_listing_list_query_count_is_constant(self):
+        """
+        Test that the listing list uses the same number of queries for any number of listings
+        """
+        url = reverse('listing-list') + '?expand=bids,comments&fields=id,owner,name'
+        self.create_listings(3)
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.create_listings(20)
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_listing_summary_does_not_touch_bids_or_comments(self):
+        """
+        Test that the listing summary only reads the version and the listings
+        """
+        self.create_listings(5)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('listing-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_listing_detail_query_count(self):
+        """
+        Test that the listing detail fetches the version, the listing, its bids and its comments in four queries
+        """
+        self.create_listings(1)
+        listing = Listing.objects.get()
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('listing-detail', kwargs={'pk': listing.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['bids']), 2)
+        self.assertEqual(response.data['bids'][0]['listing'], listing.name)
+        self.assertEqual(response.data['comments'][0]['commentor'], 'bidder0')
+
+
+class KeysetPaginationTestCase(TestCase):
+    """
+    Test case for the cursor pagination of listings, bids and comments
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpass')
+        for i in range(7):
+            Listing.objects.create(name=f'Listing {i}', description='This is a test listing.', starting_bid=10.0, current_bid=10.0, owner=self.user)
+        # Give some listings the same timestamp so that the id has to break the tie
+        first = Listing.objects.order_by('id').first()
+        Listing.objects.filter(id__lte=first.id + 3).update(created_at=first.created_at)
+
+    def collect(self, url):
+        names = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            names.extend(item['name'] for item in response.data['results'])
+            url = response.data['next']
+        return names
+
+    def test_pages_cover_every_listing_once(self):
+        """
+        Test that following the next links returns every listing exactly once, newest first
+        """
+        names = self.collect(reverse('listing-list') + '?page_size=2')
+        expected = list(Listing.objects.order_by('-created_at', '-id').values_list('name', flat=True))
+        self.assertEqual(names, expected)
+
+    def test_previous_link_returns_previous_page(self):
+        """
+        Test that the previous link of the second page returns the first page
+        """
+        first = self.client.get(reverse('listing-list') + '?page_size=3')
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+
+    def test_invalid_cursor(self):
+        """
+        Test that a malformed cursor returns a 404
+        """
+        response = self.client.get(reverse('listing-list') + '?cursor=bogus')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bid_list_is_scoped_to_listing(self):
+        """
+        Test that the bid list only pages through the bids of its listing
+        """
+        listing, other = Listing.objects.all()[:2]
+        for amount in (11, 12, 13):
+            Bid.objects.create(bid_amount=amount, bidder=self.user, listing=listing)
+        Bid.objects.create(bid_amount=50, bidder=self.user, listing=other)
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('bid-list', kwargs={'pk': listing.pk}) + '?page_size=2')
+        self.assertEqual(len(response.data['results']), 2)
+        second = self.client.get(response.data['next'])
+        self.assertEqual(len(second.data['results']), 1)
+        self.assertIsNone(second.data['next'])
+        amounts = [item['bid_amount'] for item in response.data['results'] + second.data['results']]
+        self.assertEqual(amounts, ['13.00', '12.00', '11.00'])
+
+
+class ListingRepresentationTestCase(TestCase):
+    """
+    Test case for the summary/detail representations and sparse fieldsets of listings
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpass')
+        self.listing = Listing.objects.create(name='Test Listing', description='This is a test listing.', starting_bid=10.0, current_bid=30.0, owner=self.user)
+        for amount in (20.0, 30.0, 25.0):
+            Bid.objects.create(bid_amount=amount, bidder=self.user, listing=self.listing)
+        Comment.objects.create(text='This is a test comment.', commentor=self.user, listing=self.listing)
+        self.list_url = reverse('listing-list')
+        self.detail_url = reverse('listing-detail', kwargs={'pk': self.listing.pk})
+
+    def test_list_returns_summary(self):
+        """
+        Test that the listing list returns the summary fields only
+        """
+        response = self.client.get(self.list_url)
+        self.assertEqual(set(response.data['results'][0].keys()), {'id', 'name', 'current_bid', 'image_url', 'category', 'bid_count', 'comment_count', 'last_bid_at', 'top_bidder'})
+
+    def test_detail_returns_full_listing(self):
+        """
+        Test that the listing detail returns every field
+        """
+        response = self.client.get(self.detail_url)
+        self.assertEqual(set(response.data.keys()), set(ListingSerializer.Meta.fields))
+
+    def test_sparse_fieldset(self):
+        """
+        Test that ?fields= restricts the returned fields and the selected columns
+        """
+        with self.assertNumQueries(2):
+            response = self.client.get(self.detail_url + '?fields=id,owner,description')
+        self.assertEqual(response.data, {'id': self.listing.pk, 'owner': 'testuser', 'description': 'This is a test listing.'})
+
+    def test_empty_fieldset(self):
+        """
+        Test that an empty ?fields= returns the default fields with the queries of the default fields
+        """
+        with self.assertNumQueries(4):
+            response = self.client.get(self.detail_url + '?fields=')
+        self.assertEqual(set(response.data.keys()), set(ListingSerializer.Meta.fields))
+        with self.assertNumQueries(2):
+            response = self.client.get(self.list_url + '?fields=')
+        self.assertEqual(set(response.data['results'][0].keys()), set(ListingSummarySerializer.default_fields))
+
+    def test_expand(self):
+        """
+        Test that ?expand= adds the nested bids and comments to the summary
+        """
+        response = self.client.get(self.list_url + '?expand=bids,comments')
+        item = response.data['results'][0]
+        self.assertEqual(len(item['bids']), 3)
+        self.assertEqual(len(item['comments']), 1)
+        self.assertEqual(item['bids'][0]['listing'], 'Test Listing')
+
+    def test_bids_limit(self):
+        """
+        Test that ?bids_limit= returns only the highest bids
+        """
+        response = self.client.get(self.detail_url + '?bids_limit=2')
+        self.assertEqual([bid['bid_amount'] for bid in response.data['bids']], ['30.00', '25.00'])
+
+    def test_invalid_parameters(self):
+        """
+        Test that unknown fields and invalid limits are rejected
+        """
+        self.assertEqual(self.client.get(self.list_url + '?fields=secret').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.list_url + '?expand=owner').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.detail_url + '?bids_limit=0').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_returns_full_listing(self):
+        """
+        Test that creating a listing still returns the full representation
+        """
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(self.list_url, {'name': 'New Listing', 'description': 'New.', 'starting_bid': 5.0, 'current_bid': 5.0})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(set(response.data.keys()), set(ListingSerializer.Meta.fields))
+
+
+class BidStressTestCase(TransactionTestCase):
+    """
+    Test case for concurrent bids on a single listing
+    """
+    def test_no_lost_updates(self):
+        """
+        Test that concurrent bidders never lose an update
+        """
+        out = StringIO()
+        call_command('stress_bids', threads=4, bids=25, stdout=out)
+        self.assertIn('No lost updates.', out.getvalue())
+        listing = Listing.objects.get(name='Stress listing')
+        self.assertEqual(listing.current_bid, listing.bids.order_by('-id').first().bid_amount)
+
+
+class BidBatcherTestCase(TestCase):
+    """
+    Test case for resolving a batch of queued bids
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpass')
+        self.listing = Listing.objects.create(name='Test Listing', description='This is a test listing.', starting_bid=10.0, current_bid=10.0, owner=self.user)
+
+    def test_flush_accepts_bids_in_arrival_order(self):
+        """
+        Test that each bid of a batch is accepted only if it beats the bids queued before it
+        """
+        amounts = ['12.00', '11.00', '15.00', '15.00', '9.00', '16.00']
+        pending_bids = [PendingBid(self.listing, self.user, Decimal(amount)) for amount in amounts]
+        # Read, update, bulk insert and feed bucket update and insert, plus the savepoint of the test transaction;
+        # the collection version is bumped after the commit
+        with self.assertNumQueries(7):
+            BidBatcher().flush(pending_bids)
+        accepted = [pending.result().bid_amount for pending in pending_bids if pending.error is None]
+        self.assertEqual(accepted, [Decimal('12.00'), Decimal('15.00'), Decimal('16.00')])
+        for index in (1, 3, 4):
+            with self.assertRaises(BidConflict):
+                pending_bids[index].result()
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.current_bid, Decimal('16.00'))
+        self.assertEqual(list(self.listing.bids.order_by('id').values_list('bid_amount', flat=True)), accepted)
+
+
+class ListingActivityTestCase(TestCase):
+    """
+    Test case for the bid and comment counts and top bidder kept on listings
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpass')
+        self.bidder = User.objects.create_user(username='bidder', email='bidder@example.com', password='testpass')
+        self.listing = Listing.objects.create(name='Test Listing', description='This is a test listing.', starting_bid=10.0, current_bid=10.0, owner=self.user)
+
+    def assertActivity(self, bid_count, comment_count, top_bidder):
+        self.listing.refresh_from_db()
+        self.assertEqual((self.listing.bid_count, self.listing.comment_count, self.listing.top_bidder), (bid_count, comment_count, top_bidder))
+        last_bid = self.listing.bids.order_by('-bid_date', '-id').first()
+        self.assertEqual(self.listing.last_bid_at, last_bid and last_bid.bid_date)
+        self.assertEqual(check_activity(), (1, []))
+
+    def test_write_paths_update_activity(self):
+        """
+        Test that placing bids and posting comments through the API keeps the activity up to date
+        """
+        self.client.force_authenticate(user=self.bidder)
+        self.client.post(reverse('bid-list', kwargs={'pk': self.listing.pk}), {'bid_amount': 20.0})
+        self.client.post(reverse('comment-list', kwargs={'pk': self.listing.pk}), {'text': 'Nice listing.'})
+        self.assertActivity(1, 1, self.bidder)
+        place_bid(self.listing, self.user, Decimal('25.00'))
+        self.assertActivity(2, 1, self.user)
+
+    def test_batched_bids_update_activity(self):
+        """
+        Test that a batch of bids adds its accepted bids and its highest bidder
+        """
+        pending_bids = [PendingBid(self.listing, bidder, Decimal(amount)) for bidder, amount in ((self.user, '12.00'), (self.user, '11.00'), (self.bidder, '15.00'))]
+        BidBatcher().flush(pending_bids)
+        self.assertActivity(2, 0, self.bidder)
+
+    def test_replayed_bids_update_activity(self):
+        """
+        Test that replayed bids update the activity of their listings
+        """
+        admin = User.objects.create_superuser(username='admin', password='testpass')
+        self.client.force_authenticate(user=admin)
+        rows = [{'listing': self.listing.pk, 'bidder': 'bidder', 'bid_amount': '11.00'}, {'listing': self.listing.pk, 'bidder': 'admin', 'bid_amount': '12.00'}]
+        self.assertEqual(self.client.post(reverse('bid-replay'), rows, format='json').status_code, status.HTTP_201_CREATED)
+        self.assertActivity(2, 0, admin)
+
+    def test_deletes_recompute_activity(self):
+        """
+        Test that deleting the top bid or a comment recomputes the activity
+        """
+        place_bid(self.listing, self.bidder, Decimal('20.00'))
+        bid = place_bid(self.listing, self.user, Decimal('25.00'))
+        comment = Comment.objects.create(text='Nice listing.', commentor=self.user, listing=self.listing)
+        Listing.objects.filter(pk=self.listing.pk).update(comment_count=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            bid.delete()
+            comment.delete()
+        self.assertActivity(1, 0, self.bidder)
+
+    def test_deleting_user_recomputes_each_listing_once(self):
+        """
+        Test that deleting a user with many bids and comments recomputes the activity of their listings in one UPDATE
+        """
+        listings = [self.listing] + [
+            Listing.objects.create(name=f'Listing {i}', description='Test description', starting_bid=10.0, current_bid=10.0, owner=self.user)
+            for i in range(2)
+        ]
+        for listing in listings:
+            for amount in ('11.00', '12.00', '13.00'):
+                place_bid(listing, self.bidder, Decimal(amount))
+            Comment.objects.create(text='Nice listing.', commentor=self.bidder, listing=listing)
+        Listing.objects.update(comment_count=1)
+        with CaptureQueriesContext(connection) as context, self.captureOnCommitCallbacks(execute=True):
+            self.bidder.delete()
+        recomputes = [q for q in context.captured_queries if q['sql'].startswith('UPDATE "auctions_listing"') and '"bid_count"' in q['sql']]
+        self.assertEqual(len(recomputes), 1)
+        self.assertEqual(set(Listing.objects.values_list('bid_count', 'comment_count', 'top_bidder')), {(0, 0, None)})
+        self.assertEqual(check_activity(), (3, []))
+
+    def test_summary_skips_bids_and_comments(self):
+        """
+        Test that the listing summary shows the activity without querying the bids or comments
+        """
+        place_bid(self.listing, self.bidder, Decimal('20.00'))
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('listing-list'))
+        item = response.data['results'][0]
+        self.assertEqual((item['bid_count'], item['comment_count'], item['top_bidder']), (1, 0, 'bidder'))
+        self.assertIsNotNone(item['last_bid_at'])
+        self.assertFalse([q for q in context.captured_queries if 'auctions_bid' in q['sql'] or 'auctions_comment' in q['sql']])
+
+    def test_recompute_command(self):
+        """
+        Test that the recompute command reports drifted listings with --verify and fixes them otherwise
+        """
+        place_bid(self.listing, self.bidder, Decimal('20.00'))
+        Listing.objects.filter(pk=self.listing.pk).update(bid_count=5, top_bidder=None)
+        with self.assertRaisesMessage(CommandError, f'1 of 1 listings drifted: {self.listing.pk}'):
+            call_command('recompute_listing_activity', verify=True, stdout=StringIO())
+        out = StringIO()
+        call_command('recompute_listing_activity', batch_size=1, stdout=out)
+        self.assertIn('Checked 1 listings, recomputed 1.', out.getvalue())
+        self.assertActivity(1, 0, self.bidder)
+
+
+class ListingFeedTestCase(TestCase):
+    """
+    Test case for the discovery feeds and their bid counters
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpass')
+        self.now = timezone.now()
+        self.listings = [
+            Listing.objects.create(name=f'Listing {i}', description='A listing.', starting_bid=10.0, current_bid=10.0, owner=self.user, category=category)
+            for i, category in enumerate(['Pets', 'Pets', 'Pets', 'Fashion'])
+        ]
+
+    def feed(self, name, query=''):
+        return self.client.get(reverse('listing-feed', kwargs={'name': name}) + query)
+
+    def test_bids_counted_in_buckets(self):
+        """
+        Test that the bid paths count the bids in the bucket of their time
+        """
+        place_bid(self.listings[0], self.user, Decimal('11.00'))
+        place_bid(self.listings[0], self.user, Decimal('12.00'))
+        bucket = ListingBidBucket.objects.get()
+        self.assertEqual((bucket.listing_id, bucket.bid_count), (self.listings[0].pk, 2))
+        self.assertEqual(bucket.bucket, bid_bucket(self.listings[0].bids.first().bid_date))
+
+    def test_most_bid(self):
+        """
+        Test that the most bid feed ranks listings by their bids in the window with a single indexed query
+        """
+        record_bids(self.listings[0].pk, self.now, 2)
+        record_bids(self.listings[1].pk, self.now - timedelta(minutes=10), 3)
+        record_bids(self.listings[2].pk, self.now - timedelta(hours=2), 10)
+        with CaptureQueriesContext(connection) as context:
+            response = self.feed('most-bid')
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual([(item['id'], item['score']) for item in response.data['results']], [(self.listings[1].pk, 3), (self.listings[0].pk, 2)])
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + context.captured_queries[0]['sql'])
+            plan = ' / '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('bidbucket_bucket_listing_idx', plan)
+
+    def test_trending_favours_recent_bids(self):
+        """
+        Test that recent bids weigh more than older ones in the trending feed
+        """
+        record_bids(self.listings[0].pk, self.now, 3)
+        record_bids(self.listings[1].pk, self.now - timedelta(hours=5), 4)
+        response = self.feed('trending', '?limit=1')
+        self.assertEqual([item['id'] for item in response.data['results']], [self.listings[0].pk])
+
+    def test_feeds_skip_closed_auctions(self):
+        """
+        Test that the bid feeds leave out the auctions no longer accepting bids
+        """
+        record_bids(self.listings[0].pk, self.now, 3)
+        Listing.objects.filter(pk=self.listings[0].pk).update(active=False)
+        self.assertEqual(self.feed('most-bid').data['results'], [])
+
+    def test_ending_soon(self):
+        """
+        Test that the ending soon feed lists the running auctions with an end time, ending first first
+        """
+        Listing.objects.filter(pk=self.listings[0].pk).update(ends_at=self.now + timedelta(hours=2))
+        Listing.objects.filter(pk=self.listings[1].pk).update(ends_at=self.now + timedelta(hours=1))
+        Listing.objects.filter(pk=self.listings[2].pk).update(ends_at=self.now - timedelta(hours=1))
+        with self.assertNumQueries(1):
+            response = self.feed('ending-soon')
+        self.assertEqual([item['id'] for item in response.data['results']], [self.listings[1].pk, self.listings[0].pk])
+
+    def test_newest_per_category(self):
+        """
+        Test that the newest feed returns the newest listings of each category with one indexed query
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = self.feed('newest', '?limit=2&fields=id')
+        self.assertEqual(len(context.captured_queries), 1)
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + context.captured_queries[0]['sql'])
+            plan = ' / '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('listing_cat_active_created_idx (category=? AND active=?)', plan)
+        results = response.data['results']
+        self.assertEqual([item['id'] for item in results['Pets']], [self.listings[2].pk, self.listings[1].pk])
+        self.assertEqual([item['id'] for item in results['Fashion']], [self.listings[3].pk])
+        self.assertEqual(results['Other'], [])
+        # An empty fieldset selects the default fields in the same query
+        with self.assertNumQueries(1):
+            self.feed('newest', '?limit=2&fields=')
+
+    def test_invalid_feed(self):
+        """
+        Test that an unknown feed is not found and an invalid limit is rejected
+        """
+        self.assertEqual(self.feed('unknown').status_code, status.HTTP_404_NOT_FOUND)
+        for query in ('?limit=0', '?limit=101', '?limit=x'):
+            self.assertEqual(self.feed('trending', query).status_code, status.HTTP_400_BAD_REQUEST, query)
+
+    def test_compaction(self):
+        """
+        Test that compaction deletes only the buckets older than the retention
+        """
+        record_bids(self.listings[0].pk, self.now, 1)
+        for hours in (25, 26, 27):
+            record_bids(self.listings[0].pk, self.now - timedelta(hours=hours), 1)
+        self.assertEqual(compact_bid_buckets(batch_size=2), 3)
+        out = StringIO()
+        call_command('compact_feed_buckets', stdout=out)
+        self.assertIn('Deleted 0 bid counters.', out.getvalue())
+        self.assertEqual(ListingBidBucket.objects.count(), 1)
+
+
+class BidBatchingTestCase(TransactionTestCase):
+    """
+    Test case for placing bids through the batching queue
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpass')
+        self.listing = Listing.objects.create(name='Test Listing', description='This is a test listing.', starting_bid=10.0, current_bid=10.0, owner=self.user)
+        self.url = reverse('bid-list', kwargs={'pk': self.listing.pk})
+
+    @override_settings(AUCTIONS_BID_BATCHING=True)
+    def test_bid_view_uses_queue(self):
+        """
+        Test that the bid view returns the outcome of each queued bid
+        """
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(self.url, {'bid_amount': '20.00'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['bid_amount'], '20.00')
+        self.assertIsNotNone(response.data['id'])
+        response = self.client.post(self.url, {'bid_amount': '15.00'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_benchmark(self):
+        """
+        Test that the batching benchmark runs both modes
+        """
+        out = StringIO()
+        call_command('bench_bid_batching', threads=4, bids=10, stdout=out)
+        self.assertIn('per-request:', out.getvalue())
+        self.assertIn('batched:', out.getvalue())
+
+
+class ConditionalGetTestCase(TestCase):
+    """
+    Test case for the ETags of the listing endpoints
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpass')
+        self.listing = Listing.objects.create(name='Test Listing', description='This is a test listing.', starting_bid=10.0, current_bid=10.0, owner=self.user)
+        self.detail_url = reverse('listing-detail', kwargs={'pk': self.listing.pk})
+        self.bids_url = reverse('bid-list', kwargs={'pk': self.listing.pk})
+        self.comments_url = reverse('comment-list', kwargs={'pk': self.listing.pk})
+
+    def assertNotModified(self, url):
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+        return etag
+
+    def test_unchanged_detail_returns_304(self):
+        """
+        Test that polling an unchanged listing returns a 304 after a single query
+        """
+        self.assertNotModified(self.detail_url)
+
+    def test_unchanged_lists_return_304(self):
+        """
+        Test that the listing, bid and comment lists return a 304 when nothing changed
+        """
+        self.assertNotModified(reverse('listing-list'))
+        self.client.force_authenticate(user=self.user)
+        self.assertNotModified(self.bids_url)
+        self.assertNotModified(self.comments_url)
+
+    def test_bid_comment_and_edit_change_etag(self):
+        """
+        Test that a bid, a comment and an edit each change the ETag of the listing and the collection
+        """
+        self.client.force_authenticate(user=self.user)
+        detail_etag = self.client.get(self.detail_url)['ETag']
+        list_etag = self.client.get(reverse('listing-list'))['ETag']
+        writes = [
+            lambda: self.client.post(self.bids_url, {'bid_amount': '20.00'}),
+            lambda: self.client.post(self.comments_url, {'text': 'This is a test comment.'}),
+            lambda: self.client.patch(self.detail_url, {'name': 'Renamed Listing'}),
+        ]
+        for write in writes:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertIn(write().status_code, (status.HTTP_200_OK, status.HTTP_201_CREATED))
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=detail_etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(response['ETag'], detail_etag)
+            detail_etag = response['ETag']
+            response = self.client.get(reverse('listing-list'), HTTP_IF_NONE_MATCH=list_etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            list_etag = response['ETag']
+
+    def test_orm_writes_change_etag(self):
+        """
+        Test that editing a bid, creating a comment and renaming a bidder through the ORM change the ETag of the listing
+        """
+        self.client.force_authenticate(user=self.user)
+        bidder = User.objects.create_user(username='bidder', password='testpass')
+        bid = Bid.objects.create(listing=self.listing, bidder=bidder, bid_amount=11.0)
+
+        def edit_bid():
+            bid.bid_amount = 12.0
+            bid.save()
+
+        def rename_bidder():
+            bidder.username = 'renamed'
+            bidder.save()
+
+        writes = [
+            edit_bid,
+            lambda: Comment.objects.create(listing=self.listing, commentor=self.user, text='Through the ORM.'),
+            rename_bidder,
+        ]
+        for write in writes:
+            etags = {url: self.client.get(url)['ETag'] for url in (self.detail_url, self.bids_url)}
+            write()
+            for url, etag in etags.items():
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertNotEqual(response['ETag'], etag)
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.data['bids'][0]['bid_amount'], '12.00')
+        self.assertEqual(response.data['bids'][0]['bidder'], 'renamed')
+        self.assertEqual(len(response.data['comments']), 1)
+
+    def test_get_version_required(self):
+        """
+        Test that a view tagged with ETags cannot be created without defining its version
+        """
+        class UnversionedList(ConditionalGetMixin, generics.ListAPIView):
+            queryset = Listing.objects.all()
+
+        with self.assertRaises(TypeError):
+            UnversionedList()
+
+    def test_collection_version_bumped_on_commit(self):
+        """
+        Test that the version of the listing collection is bumped once a write commits, outside of its transaction
+        """
+        version = CollectionVersion.current(Listing.COLLECTION)
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                self.listing.name = 'Renamed Listing'
+                self.listing.save()
+                self.assertEqual(CollectionVersion.current(Listing.COLLECTION), version)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(CollectionVersion.current(Listing.COLLECTION), version + 1)
+
+    def test_representations_have_different_etags(self):
+        """
+        Test that different sparse fieldsets of the same listing are tagged differently
+        """
+        full = self.client.get(self.detail_url)['ETag']
+        sparse = self.client.get(self.detail_url + '?fields=id,name')['ETag']
+        self.assertNotEqual(full, sparse)
+
+
+class ListingCacheTestCase(TestCase):
+    """
+    Test case for the cache of serialized listings
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpass')
+        self.listing = Listing.objects.create(name='Test Listing', description='This is a test listing.', starting_bid=10.0, current_bid=10.0, owner=self.user)
+        Bid.objects.create(bid_amount=20.0, bidder=self.user, listing=self.listing)
+        self.url = reverse('listing-detail', kwargs={'pk': self.listing.pk})
+
+    def test_cached_detail_only_reads_version(self):
+        """
+        Test that a cached listing is served after the version lookup only
+        """
+        first = self.client.get(self.url)
+        with self.assertNumQueries(1):
+            second = self.client.get(self.url)
+        self.assertEqual(first.json(), second.json())
+
+    def test_bid_invalidates_cached_listing(self):
+        """
+        Test that a new bid is visible right after it was placed
+        """
+        self.client.get(self.url)
+        self.client.force_authenticate(user=self.user)
+        self.client.post(reverse('bid-list', kwargs={'pk': self.listing.pk}), {'bid_amount': '30.00'})
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['current_bid'], '30.00')
+        self.assertEqual(len(response.data['bids']), 2)
+
+    def test_stats_are_admin_only(self):
+        """
+        Test that the cache counters are only shown to admins
+        """
+        url = reverse('cache-stats')
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        admin = User.objects.create_superuser(username='admin', password='testpass')
+        self.client.force_authenticate(user=admin)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['listings']), {'hits', 'misses', 'hit_rate', 'evictions'})
+
+    def test_lru_eviction(self):
+        """
+        Test that the LRU cache evicts the least recently used entry and counts it
+        """
+        from auctions.cache import LRUCache
+        cache = LRUCache('test-lru', {'OPTIONS': {'MAX_ENTRIES': 2}})
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.evictions, 1)
+
+
+class TokenCacheTestCase(TestCase):
+    """
+    Test case for the cached token authentication
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpass')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = reverse('listing-list')
+
+    def token_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        return response, [q['sql'] for q in context.captured_queries if 'authtoken_token' in q['sql']]
+
+    def test_cached_token_skips_query(self):
+        """
+        Test that only the first request with a token queries the token and its user
+        """
+        response, queries = self.token_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+        hits = token_cache.hits
+        response, queries = self.token_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, [])
+        self.assertEqual(token_cache.hits, hits + 1)
+
+    def test_revoked_token_stops_working(self):
+        """
+        Test that a deleted token is rejected right away although it was cached
+        """
+        self.assertEqual(self.client.post(self.url, {}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.token.delete()
+        self.assertEqual(self.client.post(self.url, {}).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.token_queries()[0].status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_deactivated_user_stops_working(self):
+        """
+        Test that the token of a deactivated user is rejected right away although it was cached
+        """
+        self.token_queries()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.token_queries()[0].status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_changed_user_reloaded(self):
+        """
+        Test that a change of the user of a cached token is seen by the next request
+        """
+        url = reverse('cache-stats')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['tokens']), {'hits', 'misses', 'hit_rate', 'evictions'})
+
+    @override_settings(AUCTIONS_TOKEN_CACHE_TIMEOUT=0)
+    def test_entries_expire(self):
+        """
+        Test that a change without signals is seen once the cached entry expired
+        """
+        self.token_queries()
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.token_queries()[0].status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_async_views_share_cache(self):
+        """
+        Test that the async views authenticate from the token cache and see revocations
+        """
+        self.token_queries()
+        request = RequestFactory().get(self.url, HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        with self.assertNumQueries(0):
+            self.assertEqual(async_to_sync(async_views.aauthenticate)(request), self.user)
+        self.token.delete()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            async_to_sync(async_views.aauthenticate)(request)
+
+
+class ListingFilterTestCase(TestCase):
+    """
+    Test case for filtering and ordering listings
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpass')
+        categories = ['Fashion', 'Pets', 'Books & Magazines']
+        for i in range(30):
+            Listing.objects.create(name=f'Listing {i}', description='This is a test listing.', starting_bid=10.0, current_bid=10 + i,
+                                   category=categories[i % 3], active=i % 5 != 0, owner=self.user)
+        self.url = reverse('listing-list')
+
+    def get_names(self, query):
+        response = self.client.get(self.url + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in response.data['results']]
+
+    def test_filters(self):
+        """
+        Test that each filter only returns the matching listings
+        """
+        self.assertEqual(len(self.get_names('?active=true')), 24)
+        self.assertEqual(len(self.get_names('?active=false')), 6)
+        self.assertEqual(len(self.get_names('?category=Pets')), 10)
+        self.assertEqual(len(self.get_names('?category=Pets,Fashion')), 20)
+        self.assertEqual(len(self.get_names('?category=Pets&category=Books %26 Magazines&active=true')), 16)
+        self.assertEqual(self.get_names('?min_price=35&max_price=37&ordering=current_bid'), ['Listing 25', 'Listing 26', 'Listing 27'])
+        since = Listing.objects.get(name='Listing 27').created_at.isoformat()
+        self.assertEqual(set(self.get_names(f'?created_since={since.replace("+", "%2B")}')), {'Listing 27', 'Listing 28', 'Listing 29'})
+
+    def test_ordering_by_price_pages_through_every_listing(self):
+        """
+        Test that ordering by price works with cursor pagination
+        """
+        names = []
+        url = self.url + '?ordering=-current_bid&page_size=7'
+        while url:
+            response = self.client.get(url)
+            names.extend(item['name'] for item in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(names, [f'Listing {i}' for i in range(29, -1, -1)])
+
+    def test_invalid_filters(self):
+        """
+        Test that invalid filter values are rejected
+        """
+        for query in ('?active=maybe', '?category=Cars', '?min_price=cheap', '?max_price=NaN', '?created_since=yesterday', '?ordering=name'):
+            self.assertEqual(self.client.get(self.url + query).status_code, status.HTTP_400_BAD_REQUEST, query)
+
+    def test_filters_do_not_scan_the_table(self):
+        """
+        Test that no filter combination makes the database scan the whole listing table
+        """
+        queries = [
+            '',
+            '?active=true',
+            '?category=Pets',
+            '?category=Pets,Fashion&active=true',
+            '?category=Pets&active=true&created_since=2000-01-01T00:00:00',
+            '?min_price=12&max_price=20',
+            '?active=true&min_price=12&ordering=-current_bid',
+            '?ordering=current_bid',
+            '?created_since=2000-01-01T00:00:00&ordering=created_at',
+        ]
+        for query in queries:
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(self.url + query)
+            sql = [q['sql'] for q in context.captured_queries if 'FROM "auctions_listing"' in q['sql']]
+            self.assertEqual(len(sql), 1, query)
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql[0])
+                plan = ' / '.join(row[-1] for row in cursor.fetchall())
+            self.assertNotRegex(plan, r'SCAN auctions_listing(?! USING)', f'{query}: {plan}')
+            if 'category' in query or 'price=' in query or 'created_since' in query:
+                self.assertIn('SEARCH auctions_listing USING', plan, f'{query}: {plan}')
+
+
+class ListingSearchTestCase(TestCase):
+    """
+    Test case for the full-text search of listings
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpass')
+        self.shoes = Listing.objects.create(name='Red leather shoes', description='Worn twice.', starting_bid=10.0, current_bid=10.0, owner=self.user)
+        self.bag = Listing.objects.create(name='Handbag', description='Matches the red leather shoes of the other listing.', starting_bid=10.0, current_bid=10.0, owner=self.user)
+        self.hat = Listing.objects.create(name='Blue hat', description='A hat.', starting_bid=10.0, current_bid=10.0, owner=self.user)
+        self.url = reverse('listing-search')
+
+    def search(self, q, **params):
+        response = self.client.get(self.url, {'q': q, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['results']
+
+    def test_results_are_ranked(self):
+        """
+        Test that a match in the name ranks above a match in the description
+        """
+        self.assertEqual([item['id'] for item in self.search('leather shoes')], [self.shoes.pk, self.bag.pk])
+
+    def test_snippet_and_highlight(self):
+        """
+        Test that the matched terms are marked in the name and description
+        """
+        bag = self.search('handbag matches')[0]
+        self.assertEqual(bag['highlight'], '<mark>Handbag</mark>')
+        self.assertIn('<mark>Matches</mark>', bag['snippet'])
+
+    def test_prefix_and_syntax(self):
+        """
+        Test that the last term matches as a prefix and that FTS syntax in the query is harmless
+        """
+        self.assertEqual([item['id'] for item in self.search('blu')], [self.hat.pk])
+        self.assertEqual(self.search('hat" OR "shoes'), [])
+        self.assertEqual(self.search('NEAR(* -'), [])
+
+    def test_index_follows_edits(self):
+        """
+        Test that the index is kept in sync with edited and deleted listings
+        """
+        self.hat.name = 'Green cap'
+        self.hat.save()
+        self.assertEqual(self.search('blue'), [])
+        self.assertEqual([item['id'] for item in self.search('green')], [self.hat.pk])
+        self.shoes.delete()
+        self.assertEqual([item['id'] for item in self.search('shoes')], [self.bag.pk])
+
+    def test_pagination(self):
+        """
+        Test that search results page with a cursor
+        """
+        first = self.client.get(self.url, {'q': 'leather', 'page_size': 1})
+        self.assertEqual(first.data['results'][0]['id'], self.shoes.pk)
+        second = self.client.get(first.data['next'])
+        self.assertEqual(second.data['results'][0]['id'], self.bag.pk)
+        self.assertIsNone(second.data['next'])
+
+    def test_query_is_required(self):
+        """
+        Test that an empty query is rejected
+        """
+        self.assertEqual(self.client.get(self.url, {'q': '  '}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_fallback_without_index(self):
+        """
+        Test that search falls back to LIKE queries without the FTS5 index
+        """
+        with mock.patch('auctions.search.has_search_index', return_value=False):
+            results = self.search('leather shoes')
+        self.assertEqual({item['id'] for item in results}, {self.shoes.pk, self.bag.pk})
+        self.assertEqual(results[0]['snippet'], 'Matches the red leather shoes of the other listing.')
+
+    def test_time_limit(self):
+        """
+        Test that a search running past the time limit is aborted
+        """
+        with mock.patch('auctions.search.PROGRESS_INSTRUCTIONS', 1), override_settings(AUCTIONS_SEARCH_TIME_LIMIT=1e-9):
+            response = self.client.get(self.url, {'q': 'leather'})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_rebuild_command(self):
+        """
+        Test that the rebuild command indexes every listing
+        """
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 3 listings.', out.getvalue())
+        self.assertEqual(len(self.search('leather')), 2)
+
+
+class ExportTestCase(TestCase):
+    """
+    Test case for the streaming exports
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpass')
+        self.admin = User.objects.create_superuser(username='admin', password='testpass')
+        self.listing = Listing.objects.create(name='Test Listing', description='This is a test listing.', starting_bid=10.0, current_bid=10.0, owner=self.user)
+        self.bids = Bid.objects.bulk_create([Bid(bid_amount=10 + i, bidder=self.user, listing=self.listing) for i in range(5)])
+
+    def export(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_is_admin_only(self):
+        """
+        Test that only admins can export
+        """
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get(reverse('export', kwargs={'name': 'bids'})).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_ndjson_export(self):
+        """
+        Test that the bids are exported as one JSON object per line
+        """
+        self.client.force_authenticate(user=self.admin)
+        lines = self.export(reverse('export', kwargs={'name': 'bids'})).splitlines()
+        self.assertEqual(len(lines), 5)
+        first = json.loads(lines[0])
+        self.assertEqual(first['bidder'], 'testuser')
+        self.assertEqual(first['bid_amount'], '10.00')
+        self.assertEqual(first['listing_id'], self.listing.pk)
+
+    def test_csv_export_since(self):
+        """
+        Test that the CSV export only contains the rows after ?since=
+        """
+        self.client.force_authenticate(user=self.admin)
+        content = self.export(reverse('export', kwargs={'name': 'bids'}) + f'?format=csv&since={self.bids[2].pk}')
+        rows = list(csv.reader(content.splitlines()))
+        self.assertEqual(rows[0], ['id', 'listing_id', 'bidder', 'bid_amount', 'bid_date'])
+        self.assertEqual([row[3] for row in rows[1:]], ['13.00', '14.00'])
+
+    def test_listings_and_comments_export(self):
+        """
+        Test that the listings and comments can be exported with the management command
+        """
+        Comment.objects.create(text='This is a test comment.', commentor=self.user, listing=self.listing)
+        for name, expected in (('listings', 'Test Listing'), ('comments', 'This is a test comment.')):
+            out = StringIO()
+            call_command('export_auctions', name, stdout=out)
+            self.assertIn(expected, out.getvalue())
+
+    def test_export_memory_does_not_grow_with_rows(self):
+        """
+        Test that the export streams rows in constant memory
+        """
+        Bid.objects.bulk_create([Bid(bid_amount=1, bidder=self.user, listing=self.listing) for i in range(10000)])
+        from auctions.export import stream_export
+        tracemalloc.start()
+        rows = sum(chunk.count('\n') for chunk in stream_export('bids'))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.assertEqual(rows, 10005)
+        self.assertLess(peak, 4 * 2 ** 20)
+
+
+class BulkCreateTestCase(TestCase):
+    """
+    Test case for the bulk listing and bid endpoints
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpass')
+        self.admin = User.objects.create_superuser(username='admin', password='testpass')
+        self.listing_data = {'name': 'Test Listing', 'description': 'This is a test listing.', 'starting_bid': '10.00', 'current_bid': '10.00'}
+
+    def test_bulk_create_listings(self):
+        """
+        Test that valid listings are created in bulk and invalid ones reported by index
+        """
+        self.client.force_authenticate(user=self.user)
+        rows = [self.listing_data, {'name': 'No price'}, {**self.listing_data, 'name': 'Second'}]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('listing-bulk'), rows, format='json')
+        inserts = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('INSERT INTO "auctions_listing"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['created']), 2)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1])
+        self.assertIn('starting_bid', response.data['errors'][0]['errors'])
+        self.assertEqual(set(Listing.objects.values_list('owner__username', flat=True)), {'testuser'})
+
+    def test_bulk_create_ndjson(self):
+        """
+        Test that listings can be sent as an NDJSON stream
+        """
+        self.client.force_authenticate(user=self.user)
+        body = '\n'.join(json.dumps({**self.listing_data, 'name': f'Listing {i}'}) for i in range(3)) + '\n'
+        response = self.client.post(reverse('listing-bulk'), body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Listing.objects.count(), 3)
+
+    def test_bulk_create_all_invalid(self):
+        """
+        Test that a payload without any valid listing is rejected
+        """
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(reverse('listing-bulk'), [{'name': 'No price'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(reverse('listing-bulk'), {'name': 'Not a list'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_replay_bids(self):
+        """
+        Test that replayed bids must each beat the current bid and update it once
+        """
+        listing = Listing.objects.create(owner=self.user, **self.listing_data)
+        rows = [
+            {'listing': listing.pk, 'bidder': 'testuser', 'bid_amount': '11.00'},
+            {'listing': listing.pk, 'bidder': 'testuser', 'bid_amount': '10.50'},
+            {'listing': listing.pk + 1, 'bidder': 'testuser', 'bid_amount': '12.00'},
+            {'listing': listing.pk, 'bidder': 'nobody', 'bid_amount': '12.00'},
+            {'listing': listing.pk, 'bidder': 'admin', 'bid_amount': '13.00'},
+        ]
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.post(reverse('bid-replay'), rows, format='json').status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(reverse('bid-replay'), rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2, 3])
+        listing.refresh_from_db()
+        self.assertEqual(listing.current_bid, Decimal('13.00'))
+        self.assertEqual(list(listing.bids.order_by('id').values_list('bid_amount', flat=True)), [Decimal('11.00'), Decimal('13.00')])
+
+    def test_replay_on_ended_auction(self):
+        """
+        Test that bids cannot be replayed on an auction that has ended, as they cannot be placed
+        """
+        listing = Listing.objects.create(owner=self.user, ends_at=timezone.now() - timedelta(hours=1), **self.listing_data)
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(reverse('bid-replay'), [{'listing': listing.pk, 'bidder': 'testuser', 'bid_amount': '11.00'}], format='json')
+        self.assertEqual(response.data['created'], [])
+        self.assertEqual(response.data['errors'][0]['index'], 0)
+        self.assertFalse(listing.bids.exists())
+
+    def test_replay_dated_bids(self):
+        """
+        Test that replayed bids keep their date, in order and not in the future, and are published
+        """
+        listing = Listing.objects.create(owner=self.user, **self.listing_data)
+        earlier, later = timezone.now() - timedelta(hours=2), timezone.now() - timedelta(hours=1)
+        rows = [
+            {'listing': listing.pk, 'bidder': 'testuser', 'bid_amount': '11.00', 'bid_date': later.isoformat()},
+            {'listing': listing.pk, 'bidder': 'testuser', 'bid_amount': '12.00', 'bid_date': earlier.isoformat()},
+            {'listing': listing.pk, 'bidder': 'testuser', 'bid_amount': '13.00', 'bid_date': (timezone.now() + timedelta(hours=1)).isoformat()},
+        ]
+        self.client.force_authenticate(user=self.admin)
+        with mock.patch('auctions.views.publish_bid') as publish:
+            response = self.client.post(reverse('bid-replay'), rows, format='json')
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.assertEqual(list(listing.bids.values_list('bid_date', flat=True)), [later])
+        self.assertEqual(publish.call_count, 1)
+        listing.refresh_from_db()
+        self.assertEqual(listing.last_bid_at, later)
+        self.assertEqual(ListingBidBucket.objects.get(listing=listing).bucket, bid_bucket(later))
+
+    def test_benchmark(self):
+        """
+        Test that the bulk create benchmark runs
+        """
+        out = StringIO()
+        call_command('bench_bulk_create', rows=5, stdout=out)
+        self.assertIn('1 bulk POST of 5 listings', out.getvalue())
+
+
+class AsyncReadViewTestCase(TestCase):
+    """
+    Test case for the async read views, routed at the same paths as the sync ones
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpass')
+        self.token = Token.objects.create(user=self.user)
+        self.listing = Listing.objects.create(name='Test Listing', description='This is a test listing.', starting_bid=10.0, current_bid=10.0, owner=self.user)
+        Bid.objects.create(listing=self.listing, bidder=self.user, bid_amount=11.0)
+        Comment.objects.create(listing=self.listing, commentor=self.user, text='Nice listing.')
+        self.urls = [
+            reverse('listing-list'),
+            reverse('listing-list') + '?fields=id,owner&expand=bids',
+            reverse('listing-detail', kwargs={'pk': self.listing.pk}),
+            reverse('bid-list', kwargs={'pk': self.listing.pk}),
+            reverse('comment-list', kwargs={'pk': self.listing.pk}),
+        ]
+        self.urlconf = ModuleType('async_urls')
+        self.urlconf.urlpatterns = [
+            path(self.urls[0].lstrip('/'), async_views.ListingList.as_view()),
+            path('api/listings/<int:pk>/', async_views.ListingDetail.as_view()),
+            path('api/listings/<int:pk>/bids/', async_views.BidList.as_view()),
+            path('api/listings/<int:pk>/comments/', async_views.CommentList.as_view()),
+        ]
+
+    def async_get(self, url, data=None, **headers):
+        return self.async_request('get', url, data, headers=headers)
+
+    def async_request(self, method, url, *args, **kwargs):
+        async def request():
+            return await getattr(self.async_client, method)(url, *args, **kwargs)
+        with override_settings(ROOT_URLCONF=self.urlconf):
+            return async_to_sync(request)()
+
+    def test_same_responses_as_sync_views(self):
+        """
+        Test that the async views answer with the same body and ETag as the sync views
+        """
+        for url in self.urls:
+            response = self.client.get(url, HTTP_AUTHORIZATION=f'Token {self.token.key}')
+            async_response = self.async_get(url, Authorization=f'Token {self.token.key}')
+            self.assertEqual(async_response.status_code, status.HTTP_200_OK, url)
+            self.assertEqual(async_response.json(), json.loads(response.content), url)
+            self.assertEqual(async_response['ETag'], response['ETag'], url)
+
+    def test_unchanged_resources_return_304(self):
+        """
+        Test that the async views return a 304 for an ETag of the sync views without fetching the resource
+        """
+        for url in self.urls[2:]:
+            etag = self.client.get(url, HTTP_AUTHORIZATION=f'Token {self.token.key}')['ETag']
+            # The version, the token was cached by the sync request.
+            with self.assertNumQueries(1):
+                response = self.async_get(url, Authorization=f'Token {self.token.key}', If_None_Match=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response['ETag'], etag)
+
+    def test_authentication(self):
+        """
+        Test that the async views authenticate with a token or a session and keep the permissions of the sync views
+        """
+        bids_url = self.urls[3]
+        self.assertEqual(self.async_get(self.urls[0]).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.async_get(bids_url).status_code, status.HTTP_403_FORBIDDEN)
+        response = self.async_get(bids_url, Authorization='Token invalid')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.json(), {'detail': 'Invalid token.'})
+        self.async_client.force_login(self.user)
+        self.assertEqual(self.async_get(bids_url).status_code, status.HTTP_200_OK)
+
+    def test_errors(self):
+        """
+        Test that the async views report missing listings and invalid parameters like the sync views
+        """
+        response = self.async_get(reverse('listing-detail', kwargs={'pk': self.listing.pk + 1}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.async_get(self.urls[0], data={'ordering': 'name'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ordering', response.json())
+
+    def test_version_and_data_required(self):
+        """
+        Test that an async read view cannot be defined without its version and data
+        """
+        with self.assertRaisesMessage(TypeError, 'UnversionedList must define aget_version().'):
+            class UnversionedList(async_views.AsyncReadView):
+                async def aget_data(self):
+                    return []
+
+    def test_writes_use_sync_views(self):
+        """
+        Test that the methods other than GET are handed to the sync views
+        """
+        bids_url = self.urls[3]
+        response = self.async_request(
+            'post', bids_url, {'bid_amount': '12.00'}, content_type='application/json', headers={'Authorization': f'Token {self.token.key}'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.current_bid, Decimal('12.00'))
+
+    def test_route_selection(self):
+        """
+        Test that only the routes listed in AUCTIONS_ASYNC_VIEWS are served by the async views
+        """
+        from auctions.urls import read_view
+        with override_settings(AUCTIONS_ASYNC_VIEWS=['listing-list']):
+            self.assertTrue(read_view('listing-list', views.ListingList, async_views.ListingList).view_class is async_views.ListingList)
+            self.assertTrue(read_view('listing-detail', views.ListingDetail, async_views.ListingDetail).view_class is views.ListingDetail)
+
+
+class AsyncReadBenchmarkTestCase(TransactionTestCase):
+    """
+    Test case for the WSGI/ASGI load benchmark
+    """
+    def test_benchmark(self):
+        """
+        Test that the benchmark serves every connection on each path
+        """
+        out = StringIO()
+        call_command('bench_async_reads', connections=4, workers=2, client_delay=0, listings=3, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        for line in lines:
+            self.assertIn('4/4 OK', line)
+
+
+class HubTestCase(TestCase):
+    """
+    Test case for the publish/subscribe hub
+    """
+    def test_fan_out(self):
+        """
+        Test that a message published from another thread reaches every subscriber of its channel only
+        """
+        hub = Hub(LocalBackend())
+
+        async def subscribe_and_receive():
+            subscriptions = [hub.subscribe('a') for _ in range(2000)]
+            other = hub.subscribe('b')
+            await asyncio.get_running_loop().run_in_executor(None, hub.publish, 'a', 'message')
+            messages = await asyncio.gather(*(subscription.get() for subscription in subscriptions))
+            self.assertEqual(other._queue.qsize(), 0)
+            for subscription in subscriptions + [other]:
+                subscription.close()
+            return messages
+
+        self.assertEqual(asyncio.run(subscribe_and_receive()), ['message'] * 2000)
+        self.assertEqual(hub.backend._callbacks, {})
+        self.assertEqual(hub._fanouts, {})
+
+    def test_incomplete_backend(self):
+        """
+        Test that a backend missing one of the transport methods cannot be created
+        """
+        class PublishOnlyBackend(BaseBackend):
+            def publish(self, channel, message):
+                pass
+
+        with self.assertRaises(TypeError):
+            PublishOnlyBackend()
+
+    def test_overflow(self):
+        """
+        Test that messages beyond the queue limit are dropped and flagged
+        """
+        hub = Hub(LocalBackend())
+
+        async def overflow():
+            subscription = hub.subscribe('a', max_queued=2)
+            for message in 'xyz':
+                hub.publish('a', message)
+            await asyncio.sleep(0)
+            subscription.close()
+            return [await subscription.get(), await subscription.get()], subscription.overflowed
+
+        self.assertEqual(asyncio.run(overflow()), (['x', 'y'], True))
+
+
+class BidStreamTestCase(TestCase):
+    """
+    Test case for the server-sent events of new bids
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpass')
+        self.token = Token.objects.create(user=self.user)
+        self.listing = Listing.objects.create(name='Test Listing', description='This is a test listing.', starting_bid=10.0, current_bid=10.0, owner=self.user)
+        self.bids = [Bid.objects.create(listing=self.listing, bidder=self.user, bid_amount=amount) for amount in (11, 12, 13)]
+        self.url = reverse('bid-stream', kwargs={'pk': self.listing.pk})
+        self.auth = {'Authorization': f'Token {self.token.key}'}
+
+    async def open_stream(self, **headers):
+        response = await self.async_client.get(self.url, headers={**self.auth, **headers})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content.__aiter__()
+        self.assertEqual(await stream.__anext__(), b'retry: 1000\n\n')
+        return stream
+
+    async def read_events(self, stream, count):
+        events = []
+        for _ in range(count):
+            event = (await asyncio.wait_for(stream.__anext__(), 5)).decode()
+            lines = dict(line.split(': ', 1) for line in event.strip().split('\n'))
+            events.append((int(lines['id']), json.loads(lines['data'])))
+        return events
+
+    def place_bids(self, *amounts):
+        # Sync, for the callbacks to be captured on the connection of the
+        # thread the requests run in.
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        for amount in amounts:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = client.post(reverse('bid-list', kwargs={'pk': self.listing.pk}), {'bid_amount': amount}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    async def test_pushes_new_bids(self):
+        """
+        Test that only the bids placed after connecting are pushed, as they are placed
+        """
+        stream = await self.open_stream()
+        await sync_to_async(self.place_bids)('14.00', '15.00')
+        events = await self.read_events(stream, 2)
+        self.assertEqual([data['bid_amount'] for _, data in events], ['14.00', '15.00'])
+        self.assertEqual([event_id for event_id, _ in events], [data['id'] for _, data in events])
+        self.assertEqual(events[0][1]['bidder'], 'testuser')
+        await stream.aclose()
+
+    async def test_resumes_from_last_event_id(self):
+        """
+        Test that reconnecting with Last-Event-ID sends the bids missed, then the new ones
+        """
+        stream = await self.open_stream(Last_Event_ID=str(self.bids[0].id))
+        events = await self.read_events(stream, 2)
+        self.assertEqual([event_id for event_id, _ in events], [bid.id for bid in self.bids[1:]])
+        await sync_to_async(self.place_bids)('14.00')
+        self.assertEqual((await self.read_events(stream, 1))[0][1]['bid_amount'], '14.00')
+        await stream.aclose()
+
+    async def test_catches_up_after_overflow(self):
+        """
+        Test that a subscriber whose queue is full catches up from the database without gaps
+        """
+        with mock.patch.object(async_views.BidStream, 'max_queued', 1):
+            stream = await self.open_stream()
+            await sync_to_async(self.place_bids)('14.00', '15.00', '16.00')
+            events = await self.read_events(stream, 3)
+        self.assertEqual([data['bid_amount'] for _, data in events], ['14.00', '15.00', '16.00'])
+        await stream.aclose()
+
+    async def test_errors(self):
+        """
+        Test that the stream requires authentication, an existing listing and a valid Last-Event-ID
+        """
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = await self.async_client.get(self.url, headers={**self.auth, 'Last-Event-ID': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = await self.async_client.get(reverse('bid-stream', kwargs={'pk': self.listing.pk + 1}), headers=self.auth)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = await self.async_client.post(self.url, headers=self.auth)
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    @override_settings(AUCTIONS_BID_STREAM_KEEPALIVE=0.01)
+    def test_long_polling_under_wsgi(self):
+        """
+        Test that under WSGI the stream ends after the missed bids, or after the keepalive interval without any
+        """
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, HTTP_LAST_EVENT_ID=str(self.bids[1].id))
+        self.assertIn(f'id: {self.bids[2].id}\n'.encode(), response.content)
+        response = self.client.get(self.url)
+        self.assertEqual(response.content, b'retry: 1000\n\n')
+
+
+class StreamRouterTestCase(TransactionTestCase):
+    """
+    Test case for the ASGI application serving the bid streams without a thread each
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpass')
+        self.token = Token.objects.create(user=self.user)
+        self.listing = Listing.objects.create(name='Test Listing', description='This is a test listing.', starting_bid=10.0, current_bid=10.0, owner=self.user)
+
+    async def request(self, path, messages, count, host=b'testserver', client=None):
+        from commerce.asgi import application
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+            'headers': [(b'host', host), (b'authorization', f'Token {self.token.key}'.encode())],
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 0),
+        }
+        received = asyncio.Queue()
+        # The messages of the client, which disconnects by putting an http.disconnect
+        client = client or asyncio.Queue()
+        client.put_nowait({'type': 'http.request', 'body': b'', 'more_body': False})
+
+        async def send(message):
+            messages.append(message)
+            await received.put(message)
+
+        task = asyncio.create_task(application(scope, client.get, send))
+        for _ in range(count):
+            await asyncio.wait_for(received.get(), 5)
+        return task
+
+    def test_streams_bids(self):
+        """
+        Test that a stream opened through commerce/asgi.py receives the bids placed, without a thread of its own
+        """
+        messages = []
+
+        async def stream():
+            threads = threading.active_count()
+            url = reverse('bid-stream', kwargs={'pk': self.listing.pk})
+            tasks = [await self.request(url, messages, 2) for _ in range(20)]
+            threads = threading.active_count() - threads
+            bid = await sync_to_async(place_bid, thread_sensitive=False)(self.listing, self.user, Decimal('11.00'))
+            await sync_to_async(publish_bid, thread_sensitive=False)(bid)
+            while len(messages) < 60:
+                await asyncio.sleep(0.01)
+            for task in tasks:
+                task.cancel()
+            return threads, bid
+
+        threads, bid = asyncio.run(stream())
+        self.assertEqual([message['status'] for message in messages[:40:2]], [status.HTTP_200_OK] * 20)
+        self.assertEqual({message['body'] for message in messages[1:40:2]}, {b'retry: 1000\n\n'})
+        self.assertTrue(all(message['body'].startswith(f'id: {bid.id}\n'.encode()) for message in messages[40:]))
+        # At most asgiref's sync thread was started
+        self.assertLessEqual(threads, 1)
+
+    def test_disconnect(self):
+        """
+        Test that a stream ends and unsubscribes when its client disconnects, and finishes the request
+        """
+        messages = []
+        finished = []
+        channel = bid_channel(self.listing.pk)
+
+        async def stream():
+            client = asyncio.Queue()
+            task = await self.request(reverse('bid-stream', kwargs={'pk': self.listing.pk}), messages, 2, client=client)
+            subscribed = any(key[0] == channel for key in get_hub()._fanouts)
+            client.put_nowait({'type': 'http.disconnect'})
+            await asyncio.wait_for(task, 5)
+            return subscribed
+
+        def finish(sender, **kwargs):
+            finished.append(sender)
+
+        request_finished.connect(finish)
+        try:
+            subscribed = asyncio.run(stream())
+        finally:
+            request_finished.disconnect(finish)
+        self.assertTrue(subscribed)
+        self.assertFalse(any(key[0] == channel for key in get_hub()._fanouts))
+        self.assertEqual(len(finished), 1)
+
+    def test_other_requests(self):
+        """
+        Test that the other requests are handled by Django
+        """
+        messages = []
+
+        async def listings():
+            await (await self.request(reverse('listing-list'), messages, 2))
+
+        asyncio.run(listings())
+        self.assertEqual(messages[0]['status'], status.HTTP_200_OK)
+        self.assertIn(b'Test Listing', messages[1]['body'])
+
+    def test_disallowed_host(self):
+        """
+        Test that streams are only served to the allowed hosts
+        """
+        messages = []
+
+        async def stream():
+            await (await self.request(reverse('bid-stream', kwargs={'pk': self.listing.pk}), messages, 2, host=b'example.com'))
+
+        asyncio.run(stream())
+        self.assertEqual(messages[0]['status'], status.HTTP_400_BAD_REQUEST)
+
+    def test_benchmark(self):
+        """
+        Test that the bid stream benchmark pushes a bid to every subscriber
+        """
+        out = StringIO()
+        call_command('bench_bid_stream', subscribers=5, stdout=out)
+        self.assertIn('1 bid pushed to 5 subscribers', out.getvalue())
+
+
+class AuctionClosingTestCase(TestCase):
+    """
+    Test case for auction end times and the closing of expired auctions
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpass')
+        self.bidder = User.objects.create_user(username='bidder', email='bidder@example.com', password='testpass')
+        self.ended = timezone.now() - timedelta(minutes=1)
+        self.listing = Listing.objects.create(name='Test Listing', description='This is a test listing.', starting_bid=10.0, current_bid=10.0, owner=self.user, ends_at=timezone.now() + timedelta(hours=1))
+
+    def create_expired(self, count):
+        return [
+            Listing.objects.create(name=f'Expired {i}', description='Ended.', starting_bid=10.0, current_bid=10.0, owner=self.user, ends_at=self.ended)
+            for i in range(count)
+        ]
+
+    def test_close_records_winning_bid(self):
+        """
+        Test that closing an auction records its highest bid, the earliest on a tie
+        """
+        won, unsold = self.create_expired(2)
+        Bid.objects.create(bid_amount=20.0, bidder=self.bidder, listing=won)
+        winner = Bid.objects.create(bid_amount=30.0, bidder=self.bidder, listing=won)
+        Bid.objects.create(bid_amount=30.0, bidder=self.user, listing=won)
+        self.assertEqual(close_all_expired_auctions(), 2)
+        won.refresh_from_db()
+        unsold.refresh_from_db()
+        self.listing.refresh_from_db()
+        self.assertFalse(won.active)
+        self.assertEqual(won.winning_bid, winner)
+        self.assertFalse(unsold.active)
+        self.assertIsNone(unsold.winning_bid)
+        self.assertTrue(self.listing.active)
+
+    def test_close_in_bounded_batches(self):
+        """
+        Test that a batch closes at most batch_size auctions, in the order they ended
+        """
+        expired = self.create_expired(5)
+        self.assertEqual(close_expired_auctions(batch_size=2), 2)
+        self.assertEqual(list(Listing.objects.filter(active=False).order_by('id')), expired[:2])
+        self.assertEqual(close_all_expired_auctions(batch_size=2, pause=0), 3)
+        self.assertEqual(close_expired_auctions(), 0)
+
+    def test_close_uses_partial_index(self):
+        """
+        Test that the expired auctions are found with the partial index instead of a table scan
+        """
+        self.create_expired(3)
+        with CaptureQueriesContext(connection) as context:
+            close_expired_auctions()
+        sql = next(q['sql'] for q in context.captured_queries if q['sql'].startswith('UPDATE "auctions_listing"'))
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = ' / '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('listing_open_ends_idx', plan)
+        self.assertNotRegex(plan, r'SCAN auctions_listing(?! USING)')
+
+    def test_late_bid_rejected(self):
+        """
+        Test that a bid placed after the end of the auction is rejected with a 409, closed or not yet
+        """
+        expired = self.create_expired(1)[0]
+        url = reverse('bid-list', kwargs={'pk': expired.pk})
+        self.client.force_authenticate(user=self.bidder)
+        response = self.client.post(url, {'bid_amount': 20.0})
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['detail'].code, 'auction_closed')
+        close_all_expired_auctions()
+        with self.assertRaises(AuctionClosed):
+            place_bid(expired, self.bidder, Decimal('20.00'))
+        self.assertFalse(Bid.objects.filter(listing=expired).exists())
+
+    def test_running_auction_accepts_bids(self):
+        """
+        Test that an auction accepts bids until it ends
+        """
+        self.client.force_authenticate(user=self.bidder)
+        response = self.client.post(reverse('bid-list', kwargs={'pk': self.listing.pk}), {'bid_amount': 20.0})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(place_bid(self.listing, self.bidder, Decimal('25.00')).bid_amount, Decimal('25.00'))
+
+    def test_ends_at_must_be_in_future(self):
+        """
+        Test that a listing cannot be created with an end time in the past
+        """
+        self.client.force_authenticate(user=self.user)
+        data = {'name': 'New Listing', 'description': 'New.', 'starting_bid': '10.00', 'current_bid': '10.00', 'category': 'Other'}
+        response = self.client.post(reverse('listing-list'), dict(data, ends_at=self.ended.isoformat()), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ends_at', response.data)
+        response = self.client.post(reverse('listing-list'), dict(data, ends_at=(timezone.now() + timedelta(days=1)).isoformat()), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_close_auctions_command(self):
+        """
+        Test that the close_auctions command closes the expired auctions
+        """
+        self.create_expired(3)
+        out = StringIO()
+        call_command('close_auctions', batch_size=2, stdout=out)
+        self.assertIn('Closed 3 auctions.', out.getvalue())
+        self.assertEqual(Listing.objects.filter(active=True).count(), 1)
+
+
+class AuctionClosingBenchmarkTestCase(TransactionTestCase):
+    """
+    Test case for the closing benchmark command
+    """
+    def test_bench_close_auctions(self):
+        """
+        Test that the closing benchmark closes every auction and cleans up
+        """
+        out = StringIO()
+        call_command('bench_close_auctions', auctions=20, bidders=0, batch_size=5, stdout=out)
+        self.assertIn('Closed 20 auctions', out.getvalue())
+        self.assertEqual(Listing.objects.count(), 0)
+
+
+@override_settings(AUCTIONS_INSTRUMENTATION=True)
+class InstrumentationTestCase(TestCase):
+    """
+    Test case for the request timings and the metrics endpoint
+    """
+    def setUp(self):
+        metrics.reset()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpass')
+        self.token = Token.objects.create(user=self.user)
+        self.listing = Listing.objects.create(name='Listing', description='A listing.', starting_bid=10.0, current_bid=10.0, owner=self.user, category='Pets')
+        self.url = reverse('listing-detail', kwargs={'pk': self.listing.pk})
+
+    def server_timing(self, response):
+        entries = {}
+        for entry in response['Server-Timing'].split(', '):
+            name, *params = entry.split(';')
+            entries[name] = dict(param.split('=', 1) for param in params)
+        return entries
+
+    def test_server_timing_header(self):
+        """
+        Test that a response has a Server-Timing header with the time of each part and the query count
+        """
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        entries = self.server_timing(response)
+        self.assertEqual(list(entries), ['db', 'auth', 'view', 'serialize', 'render', 'total'])
+        self.assertEqual(entries['db']['desc'], f'"{len(context.captured_queries)} queries"')
+        for name in ('db', 'serialize', 'render'):
+            self.assertLessEqual(float(entries[name]['dur']), float(entries['total']['dur']))
+
+    def test_metrics_per_route(self):
+        """
+        Test that the metrics endpoint is admin only and has the histograms of each route
+        """
+        for _ in range(3):
+            self.client.get(self.url)
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=User.objects.create_superuser(username='admin', password='adminpass'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['instrumentation'])
+        route = response.data['routes']['GET api/listings/<int:pk>/']
+        self.assertEqual(route['total']['count'], 3)
+        self.assertEqual(sum(route['total']['buckets'].values()), 3)
+        self.assertEqual(set(route), {'queries', 'total', 'db', 'auth', 'view', 'serialize', 'render'})
+        self.assertIn('p95', route['view'])
+        self.assertIn('tokens', response.data['caches'])
+
+    @override_settings(AUCTIONS_SLOW_QUERY_MS=0)
+    def test_slow_queries_logged(self):
+        """
+        Test that the queries slower than the threshold are logged
+        """
+        with self.assertLogs('auctions.instrumentation', 'WARNING') as logs:
+            self.client.get(self.url)
+        self.assertTrue(any('auctions_listing' in message for message in logs.output))
+
+    def test_disabled_by_default(self):
+        """
+        Test that the middleware is left out unless instrumentation is on
+        """
+        with override_settings(AUCTIONS_INSTRUMENTATION=False):
+            response = APIClient().get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Server-Timing', response)
+
+
+class SeedAuctionsTestCase(TestCase):
+    """
+    Test case for the seed_auctions command
+    """
+    def seed(self, **options):
+        out = StringIO()
+        call_command('seed_auctions', users=10, listings=30, bids=500, comments=100, hot=2, hot_share=0.6, stdout=out, **options)
+        return out.getvalue()
+
+    def test_seeded_counts(self):
+        """
+        Test that the requested number of users, listings, bids and comments are created
+        """
+        self.assertIn('Created 10 users, 30 listings, 500 bids and 100 comments', self.seed())
+        self.assertEqual((User.objects.count(), Listing.objects.count(), Bid.objects.count(), Comment.objects.count()), (10, 30, 500, 100))
+
+    def test_hot_listings(self):
+        """
+        Test that the hot listings get their share of the bids
+        """
+        self.seed()
+        hot = Listing.objects.order_by('id')[:2]
+        self.assertEqual(sum(listing.bid_count for listing in hot), 300)
+        self.assertGreater(min(listing.bid_count for listing in hot), Listing.objects.order_by('id')[2].bid_count)
+
+    def test_seeded_activity_consistent(self):
+        """
+        Test that the current bids, activity fields and feed buckets match the seeded bids
+        """
+        self.seed()
+        self.assertEqual(check_activity(), (30, []))
+        for listing in Listing.objects.filter(bid_count__gt=0):
+            bids = list(listing.bids.order_by('bid_date', 'id'))
+            self.assertEqual([bid.bid_amount for bid in bids], sorted({bid.bid_amount for bid in bids}))
+            self.assertEqual(listing.current_bid, bids[-1].bid_amount)
+        self.assertEqual(sum(ListingBidBucket.objects.values_list('bid_count', flat=True)), 500)
+
+    def test_same_seed_same_data(self):
+        """
+        Test that seeding again with --clear and the same seed gives the same data
+        """
+        self.seed()
+        bids = list(Bid.objects.order_by('id').values_list('bid_amount', 'bidder__username', 'listing__name'))
+        self.seed(clear=True)
+        self.assertEqual(User.objects.count(), 10)
+        self.assertEqual(list(Bid.objects.order_by('id').values_list('bid_amount', 'bidder__username', 'listing__name')), bids)
+
+
+@override_settings(AUCTIONS_PASSWORD_ITERATIONS=1000)
+class BenchApiTestCase(TestCase):
+    """
+    Test case for the API benchmark command
+    """
+    def setUp(self):
+        call_command('seed_auctions', users=5, listings=20, bids=100, comments=20, stdout=StringIO())
+
+    def bench(self, **options):
+        out = StringIO()
+        call_command('bench_api', requests=2, warmup=0, stdout=out, **options)
+        return out.getvalue()
+
+    def test_every_route_measured(self):
+        """
+        Test that every route is benchmarked without errors and the data is left unchanged
+        """
+        counts = (User.objects.count(), Listing.objects.count(), Bid.objects.count(), Comment.objects.count())
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            self.bench(output=output)
+            with open(output) as file:
+                results = json.load(file)
+        self.assertEqual({label.split(' ')[1] for label in results['routes']}, {pattern.name for pattern in urls.urlpatterns})
+        for route in results['routes'].values():
+            self.assertEqual((route['requests'], route['errors']), (2, 0))
+            self.assertLessEqual(route['p50_ms'], route['p95_ms'])
+        self.assertEqual(results['data']['bid'], 100)
+        self.assertEqual((User.objects.count(), Listing.objects.count(), Bid.objects.count(), Comment.objects.count()), counts)
+
+    def test_regression_flagged(self):
+        """
+        Test that a route sending more queries than in the baseline is flagged as a regression
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = os.path.join(directory, 'baseline.json')
+            self.bench(output=baseline)
+            with open(baseline) as file:
+                results = json.load(file)
+            results['routes']['GET listing-detail']['queries'] -= 1
+            with open(baseline, 'w') as file:
+                json.dump(results, file)
+            with self.assertRaisesMessage(CommandError, 'GET listing-detail'):
+                self.bench(compare=baseline, threshold=100, fail_on_regression=True)
+
+    def test_requires_seeded_data(self):
+        """
+        Test that the benchmark refuses to run without listings with bids
+        """
+        Bid.objects.all().delete()
+        Listing.objects.update(bid_count=0)
+        with self.assertRaisesMessage(CommandError, 'seed_auctions'):
+            self.bench()
+
+
+class RowSerializationTestCase(TestCase):
+    """
+    Test case for the lists serialized from .values() rows
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpass')
+        self.bidder = User.objects.create_user(username='bidder', email='bidder@example.com', password='testpass')
+        self.listings = [
+            Listing.objects.create(name='Leather jacket', description='A vintage leather jacket.', starting_bid=10.0, current_bid=10.0, owner=self.user, category='Fashion'),
+            Listing.objects.create(name='Camera', description='A film camera.', starting_bid=Decimal('99.5'), current_bid=Decimal('99.5'), owner=self.bidder,
+                                   image_url='https://example.com/camera.jpg', ends_at=timezone.now() + timedelta(days=1)),
+            Listing.objects.create(name='Jacket rack', description='For jackets.', starting_bid=5.0, current_bid=5.0, owner=self.user, active=False),
+        ]
+        for amount in ('11.00', '12.50', '13.00'):
+            place_bid(self.listings[0], self.bidder, Decimal(amount))
+        place_bid(self.listings[1], self.user, Decimal('100.00'))
+        Listing.objects.filter(pk=self.listings[2].pk).update(winning_bid=Bid.objects.first())
+        for text in ('Nice jacket.', 'Does it fit?'):
+            Comment.objects.create(listing=self.listings[0], commentor=self.bidder, text=text)
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def test_same_json_as_serializers(self):
+        """
+        Test that the rows give byte for byte the JSON of the serializers, nested and sparse
+        """
+        sparse = ['id', 'owner', 'winning_bid', 'ends_at', 'top_bidder', 'bids']
+        cases = [
+            (ListingSerializer, {}, views.listing_queryset()),
+            (ListingSerializer, {'fields': sparse}, views.listing_queryset(sparse)),
+            (ListingSummarySerializer, {}, views.listing_queryset(ListingSummarySerializer.default_fields)),
+            (BidSerializer, {}, Bid.objects.select_related('bidder', 'listing')),
+            (CommentSerializer, {}, Comment.objects.select_related('commentor', 'listing')),
+        ]
+        for serializer_class, kwargs, queryset in cases:
+            row_serializer = RowSerializer.for_serializer(serializer_class(**kwargs))
+            self.assertIsNotNone(row_serializer, serializer_class)
+            expected = serializer_class(queryset.order_by('id'), many=True, **kwargs).data
+            rows = list(row_serializer.values(queryset.order_by('id')))
+            self.assertEqual(self.render(row_serializer.serialize(rows)), self.render(expected), serializer_class)
+
+    def test_same_responses(self):
+        """
+        Test that the list endpoints answer with the same body with and without the rows
+        """
+        listing = self.listings[0].pk
+        urls = [
+            reverse('listing-list'),
+            reverse('listing-list') + '?expand=bids,comments',
+            reverse('listing-list') + '?expand=bids&bids_limit=2&fields=id,name,owner,winning_bid,ends_at',
+            reverse('listing-list') + '?page_size=1',
+            reverse('listing-search') + '?q=jacket',
+            reverse('bid-list', kwargs={'pk': listing}),
+            reverse('bid-list', kwargs={'pk': listing}) + '?page_size=2',
+            reverse('comment-list', kwargs={'pk': listing}),
+        ]
+        self.client.force_authenticate(user=self.user)
+        for url in urls:
+            with override_settings(AUCTIONS_ROW_SERIALIZATION=False):
+                expected = self.client.get(url)
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+            self.assertEqual(response.content, expected.content, url)
+            next_url = response.data.get('next')
+            if next_url:
+                with override_settings(AUCTIONS_ROW_SERIALIZATION=False):
+                    expected = self.client.get(next_url)
+                self.assertEqual(self.client.get(next_url).content, expected.content, next_url)
+
+    def test_no_model_instances(self):
+        """
+        Test that the list endpoints do not instantiate models
+        """
+        self.client.force_authenticate(user=self.user)
+        urls = [
+            reverse('listing-list') + '?expand=bids,comments',
+            reverse('bid-list', kwargs={'pk': self.listings[0].pk}),
+            reverse('comment-list', kwargs={'pk': self.listings[0].pk}),
+        ]
+        for model in (Listing, Bid, Comment):
+            with mock.patch.object(model, 'from_db', side_effect=AssertionError(model)):
+                for url in urls:
+                    self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_compiled_cache_bounded(self):
+        """
+        Test that the compiled serializers of the field subsets chosen by clients are bounded
+        """
+        fields = ListingSummarySerializer.Meta.fields
+        with mock.patch.object(RowSerializer, 'max_compiled', 3):
+            for size in range(1, 8):
+                RowSerializer.for_serializer(ListingSummarySerializer(fields=fields[:size]))
+            self.assertLessEqual(len(RowSerializer._compiled), 3)
+            serializer = ListingSummarySerializer(fields=fields[:7])
+            self.assertIs(RowSerializer.for_serializer(serializer), RowSerializer.for_serializer(serializer))
+
+    def test_unsupported_fields(self):
+        """
+        Test that serializers with fields not read from a column are left to the serializer
+        """
+        class MethodSerializer(ListingSerializer):
+            title = serializers.SerializerMethodField()
+
+            class Meta(ListingSerializer.Meta):
+                fields = ['id', 'title']
+
+            def get_title(self, listing):
+                return listing.name.title()
+
+        self.assertIsNone(RowSerializer.for_serializer(MethodSerializer()))
+        self.assertIsNone(RowSerializer.for_serializer(UserSerializer(context={'request': None})))
+
+    def test_bench_serialization(self):
+        """
+        Test that the serialization benchmark reports the rows per second of both paths
+        """
+        out = StringIO()
+        call_command('bench_serialization', rows=20, repeat=1, stdout=out)
+        self.assertIn('listings', out.getvalue())
+        self.assertIn('rows/sec', out.getvalue())
+
+
+class RendererTestCase(TestCase):
+    """
+    Test case for FastJSONRenderer, FastJSONParser and MessagePack
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.listing = Listing.objects.create(owner=self.user, name='Line\u2028separator – ünïcode', description='Test description',
+                                              starting_bid=10, current_bid=10)
+        Bid.objects.create(listing=self.listing, bidder=self.user, bid_amount=11)
+        self.data = {'results': ListingSerializer(Listing.objects.all(), many=True).data, 'count': 2 ** 70}
+
+    def test_same_json(self):
+        """
+        Test that FastJSONRenderer renders the same bytes as JSONRenderer, with or without orjson
+        """
+        class StandardJSONRenderer(FastJSONRenderer):
+            use_orjson = False
+
+        expected = JSONRenderer().render(self.data)
+        self.assertIn(b'\\u2028', expected)
+        self.assertEqual(FastJSONRenderer().render(self.data), expected)
+        self.assertEqual(StandardJSONRenderer().render(self.data), expected)
+        data = {key: value for key, value in self.data.items() if key != 'count'}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_exact_decimals(self):
+        """
+        Test that decimals are rendered as exact strings
+        """
+        self.assertEqual(FastJSONRenderer().render({'amount': Decimal('0.10')}), b'{"amount":"0.10"}')
+
+    def test_indent(self):
+        """
+        Test that indented JSON is rendered like JSONRenderer
+        """
+        media_type = 'application/json; indent=4'
+        self.assertEqual(FastJSONRenderer().render(self.data, media_type), JSONRenderer().render(self.data, media_type))
+
+    def test_parse(self):
+        """
+        Test that FastJSONParser parses like JSONParser and rejects invalid JSON
+        """
+        body = JSONRenderer().render(self.data)
+        self.assertEqual(FastJSONParser().parse(BytesIO(body)), JSONParser().parse(BytesIO(body)))
+        with self.assertRaises(exceptions.ParseError):
+            FastJSONParser().parse(BytesIO(b'{"name": '))
+
+    def test_api_json(self):
+        """
+        Test that the API reads and writes JSON through the fast renderer and parser
+        """
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(reverse('bid-list', kwargs={'pk': self.listing.pk}), {'bid_amount': '12.00'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.get(reverse('listing-detail', kwargs={'pk': self.listing.pk}))
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(response.content)['current_bid'], '12.00')
+        response = self.client.post(reverse('bid-list', kwargs={'pk': self.listing.pk}), '{"bid_amount": ',
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @skipUnless(msgpack, 'msgpack is not installed')
+    def test_msgpack(self):
+        """
+        Test that the API reads and writes MessagePack when it is accepted
+        """
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(reverse('bid-list', kwargs={'pk': self.listing.pk}), msgpack.packb({'bid_amount': '12.00'}),
+                                    content_type='application/msgpack', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(msgpack.unpackb(response.content)['bid_amount'], '12.00')
+        response = self.client.get(reverse('listing-detail', kwargs={'pk': self.listing.pk}), HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content)['current_bid'], '12.00')
+
+    def test_bench_renderers(self):
+        """
+        Test that the renderers benchmark reports each renderer
+        """
+        out = StringIO()
+        call_command('bench_renderers', listings=5, bids=2, comments=1, repeat=1, stdout=out)
+        self.assertIn('DRF JSONRenderer', out.getvalue())
+        self.assertIn('FastJSONRenderer, standard library', out.getvalue())
+        self.assertEqual(Listing.objects.count(), 1)
+
+
+class SQLiteBackendTestCase(TestCase):
+    """
+    Test case for the SQLite backend of auctions.sqlite3
+    """
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.name = os.path.join(directory.name, 'db.sqlite3')
+
+    def connect(self, **options):
+        settings_dict = {**connection.settings_dict, 'NAME': self.name,
+                         'OPTIONS': {**connection.settings_dict['OPTIONS'], **options}}
+        wrapper = DatabaseWrapper(settings_dict, alias='sqlite-test')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_pragmas(self):
+        """
+        Test that new connections are set up with the pragmas of the settings
+        """
+        with self.connect().cursor() as cursor:
+            self.assertEqual(cursor.execute('PRAGMA journal_mode').fetchone(), ('wal',))
+            self.assertEqual(cursor.execute('PRAGMA synchronous').fetchone(), (1,))
+            self.assertEqual(cursor.execute('PRAGMA busy_timeout').fetchone(), (20000,))
+
+    def test_immediate_transactions(self):
+        """
+        Test that transactions take the write lock when they begin
+        """
+        wrapper = self.connect(write_lock=False)
+        wrapper.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        other = self.connect(timeout=0, write_lock=False)
+        with self.assertRaisesMessage(OperationalError, 'database is locked'):
+            other.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        wrapper.commit()
+        other.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        other.rollback()
+
+    def test_write_lock(self):
+        """
+        Test that transactions of the process wait for each other on the write lock
+        """
+        wrapper, other = self.connect(), self.connect(timeout=0.1)
+        wrapper.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        self.assertIs(wrapper.get_write_lock(), other.get_write_lock())
+        with self.assertRaisesMessage(OperationalError, 'database is locked'):
+            other.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        wrapper.commit()
+        other.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        other.close()
+        self.assertFalse(other.get_write_lock().locked())
+        self.assertIsNone(connection.get_write_lock())
+
+    def test_transaction_mode(self):
+        """
+        Test that an unknown transaction mode is rejected
+        """
+        with self.assertRaises(ImproperlyConfigured):
+            self.connect(transaction_mode='LAZY')
+
+    def test_bench_sqlite(self):
+        """
+        Test that the SQLite benchmark compares both profiles without locked writes in the configured one
+        """
+        out = StringIO()
+        call_command('bench_sqlite', readers=1, writers=2, seconds=0.2, listings=5, stdout=out)
+        self.assertIn('default: ', out.getvalue())
+        self.assertIn(', 0 locked', out.getvalue().split('configured: ')[1])
+
+
+@override_settings(AUCTIONS_READ_REPLICAS=['replica'], AUCTIONS_PASSWORD_ITERATIONS=1000)
+class ReplicaTestCase(TransactionTestCase):
+    """
+    Test case for the read replicas, with a copy of the test database in an SQLite file as replica
+    """
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        connections.settings['replica'] = connections.configure_settings({
+            'default': connections.settings['default'],
+            'replica': {**connection.settings_dict, 'NAME': os.path.join(directory.name, 'replica.sqlite3'), 'TEST': {}},
+        })['replica']
+        self.addCleanup(self.remove_replica)
+        pins = override_settings(CACHES={
+            **settings.CACHES,
+            'replica-pins': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': os.path.join(directory.name, 'pins')},
+        })
+        pins.enable()
+        self.addCleanup(pins.disable)
+
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        self.listing = Listing.objects.create(owner=self.user, name='Replicated listing', description='Test description',
+                                              starting_bid=10, current_bid=10)
+        copy_to_replica('replica')
+        self.new_listing = Listing.objects.create(owner=self.user, name='Unreplicated listing', description='Test description',
+                                                  starting_bid=10, current_bid=10)
+
+    def remove_replica(self):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+
+    def test_reads_from_replica(self):
+        """
+        Test that the safe requests of the replica routes read the replica
+        """
+        response = APIClient().get(reverse('listing-list'))
+        self.assertEqual([listing['id'] for listing in response.data['results']], [self.listing.pk])
+        response = APIClient().get(reverse('listing-detail', kwargs={'pk': self.new_listing.pk}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(reverse('listing-list'))
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_other_reads_from_primary(self):
+        """
+        Test that other routes and reads outside requests read the primary
+        """
+        response = APIClient().get(reverse('listing-search'), {'q': 'unreplicated'})
+        self.assertEqual([listing['id'] for listing in response.data['results']], [self.new_listing.pk])
+        self.assertEqual(Listing.objects.count(), 2)
+        self.assertIsNone(ReplicaRouter().db_for_read(Listing))
+
+    def test_read_your_writes(self):
+        """
+        Test that writes go to the primary, and their client reads the primary until its pin expires
+        """
+        response = self.client.post(reverse('bid-list', kwargs={'pk': self.listing.pk}), {'bid_amount': '11.00'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Bid.objects.using('default').count(), 1)
+        self.assertEqual(Bid.objects.using('replica').count(), 0)
+
+        other = APIClient()
+        other.force_authenticate(user=User.objects.create_user(username='otheruser', password='testpass'))
+        url = reverse('bid-list', kwargs={'pk': self.listing.pk})
+        self.assertEqual(len(self.client.get(url).data['results']), 1)
+        self.assertEqual(len(other.get(url).data['results']), 0)
+        caches['replica-pins'].clear()
+        self.assertEqual(len(self.client.get(url).data['results']), 0)
+
+    def test_local_pin_cache(self):
+        """
+        Test that the pins cannot be kept in a cache local to the process
+        """
+        with override_settings(AUCTIONS_REPLICA_PIN_CACHE='default'):
+            with self.assertRaises(ImproperlyConfigured):
+                ReplicaMiddleware(lambda request: None)
+
+    def test_sync_replicas(self):
+        """
+        Test that sync_replicas copies the primary into the replicas
+        """
+        out = StringIO()
+        call_command('sync_replicas', stdout=out)
+        self.assertIn('replica', out.getvalue())
+        self.assertEqual(Listing.objects.using('replica').count(), 2)
+        response = APIClient().get(reverse('listing-detail', kwargs={'pk': self.new_listing.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class UserViewsTestCase(TestCase):
+    """
+    Test case for the user list and detail at the scale of power sellers
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin', password='testpass')
+        cls.sellers = User.objects.bulk_create([User(username=f'seller{i}') for i in range(3)])
+        Listing.objects.bulk_create([
+            Listing(owner=seller, name=f'Listing {i}', description='Test description', starting_bid=10, current_bid=10)
+            for seller, count in zip(cls.sellers, (20000, 2, 0)) for i in range(count)
+        ], batch_size=1000)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def test_listing_count(self):
+        """
+        Test that users come with their listing count and without their listings by default
+        """
+        response = self.client.get(reverse('user-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        counts = {user['username']: user['listing_count'] for user in response.data['results']}
+        self.assertEqual(counts, {'admin': 0, 'seller0': 20000, 'seller1': 2, 'seller2': 0})
+        self.assertNotIn('listings', response.data['results'][0])
+        self.assertEqual(response.data['results'][1]['url'], f'http://testserver/api/users/{self.sellers[0].pk}/')
+        response = self.client.get(reverse('user-detail', kwargs={'pk': self.sellers[0].pk}))
+        self.assertEqual(response.data['listing_count'], 20000)
+
+    def test_query_counts(self):
+        """
+        Test that the user list and detail take one query, and one more with their listings, whatever their size
+        """
+        with self.assertNumQueries(1):
+            self.client.get(reverse('user-list'))
+        with self.assertNumQueries(1):
+            self.client.get(reverse('user-detail', kwargs={'pk': self.sellers[0].pk}))
+        with self.assertNumQueries(2):
+            self.client.get(reverse('user-list'), {'expand': 'listings'})
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('user-detail', kwargs={'pk': self.sellers[0].pk}), {'expand': 'listings'})
+        self.assertEqual(len(response.data['listings']), 20000)
+
+    def test_templated_urls(self):
+        """
+        Test that the listing links are reversed once per response and equal to those of reverse()
+        """
+        listing = Listing.objects.filter(owner=self.sellers[1]).order_by('id').first()
+        with mock.patch.object(relations, 'reverse', wraps=relations.reverse) as mocked:
+            response = self.client.get(reverse('user-detail', kwargs={'pk': self.sellers[0].pk}), {'expand': 'listings'})
+        self.assertEqual(mocked.call_count, 2)
+        response = self.client.get(reverse('user-detail', kwargs={'pk': self.sellers[1].pk}), {'expand': 'listings', 'format': 'json'})
+        self.assertEqual(response.data['listings'][0], f'http://testserver/api/listings/{listing.pk}/?format=json')
+        field = TemplatedHyperlinkedRelatedField(view_name='listing-detail', read_only=True, lookup_field='name')
+        self.assertIsNone(field.get_url(Listing(), 'listing-detail', None, None))
+
+    def test_latency(self):
+        """
+        Test that the detail of a seller with 20000 listings is as fast as the detail of any user
+        """
+        def best(pk):
+            elapsed = []
+            for _ in range(5):
+                started = time.perf_counter()
+                self.client.get(reverse('user-detail', kwargs={'pk': pk}))
+                elapsed.append(time.perf_counter() - started)
+            return min(elapsed)
+        self.assertLess(best(self.sellers[0].pk), max(best(self.sellers[2].pk) * 5, 0.05))
+
+    def test_pagination(self):
+        """
+        Test that users are paginated by id
+        """
+        response = self.client.get(reverse('user-list'), {'page_size': 2})
+        self.assertEqual([user['username'] for user in response.data['results']], ['admin', 'seller0'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([user['username'] for user in response.data['results']], ['seller1', 'seller2'])
+        self.assertIsNone(response.data['next'])
+
+    def test_invalid_expand(self):
+        """
+        Test that only the listings can be expanded
+        """
+        response = self.client.get(reverse('user-list'), {'expand': 'bids'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,17 +1,38 @@
+from django.conf import settings
 from django.urls import path
 from rest_framework.urlpatterns import format_suffix_patterns
-from . import views
+from . import async_views, views
+
+
+def read_view(name, view, async_view):
+    """
+    Route `name` to `async_view` if it is listed in AUCTIONS_ASYNC_VIEWS,
+    and to the sync DRF `view` (a class or an `api_view` function)
+    otherwise.
+    """
+    if name in settings.AUCTIONS_ASYNC_VIEWS:
+        return async_view.as_view()
+    return view.as_view() if isinstance(view, type) else view
+
 
 urlpatterns = [
     path("", views.api_root, name="api-root"),
-    path("login/", views.login_view, name="login"),
+    path("login/", read_view('login', views.login_view, async_views.Login), name="login"),
     path("register/", views.register, name="register"),
     path("users/", views.UserList.as_view(), name='user-list'),
     path("users/<int:pk>/", views.UserDetail.as_view(), name='user-detail'),
-    path("listings/", views.ListingList.as_view(), name='listing-list'),
-    path("listings/<int:pk>/", views.ListingDetail.as_view(), name='listing-detail'),
-    path("listings/<int:pk>/bids/", views.BidList.as_view(), name='bid-list'),
-    path("listings/<int:pk>/comments/", views.CommentList.as_view(), name='comment-list'),
+    path("listings/", read_view('listing-list', views.ListingList, async_views.ListingList), name='listing-list'),
+    path("listings/bulk/", views.ListingBulkCreate.as_view(), name='listing-bulk'),
+    path("listings/search/", views.ListingSearch.as_view(), name='listing-search'),
+    path("listings/feeds/<slug:name>/", views.ListingFeed.as_view(), name='listing-feed'),
+    path("listings/<int:pk>/", read_view('listing-detail', views.ListingDetail, async_views.ListingDetail), name='listing-detail'),
+    path("listings/<int:pk>/bids/", read_view('bid-list', views.BidList, async_views.BidList), name='bid-list'),
+    path("listings/<int:pk>/bids/stream/", async_views.BidStream.as_view(), name='bid-stream'),
+    path("listings/<int:pk>/comments/", read_view('comment-list', views.CommentList, async_views.CommentList), name='comment-list'),
+    path("bids/replay/", views.BidReplay.as_view(), name='bid-replay'),
+    path("cache/stats/", views.cache_stats, name='cache-stats'),
+    path("metrics/", views.metrics_view, name='metrics'),
+    path("export/<slug:name>/", views.Export.as_view(), name='export'),
 ]
 
 urlpatterns = format_suffix_patterns(urlpatterns)
\ No newline at end of file
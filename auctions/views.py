@@ -1,17 +1,203 @@
-from auctions.models import User, Listing, Bid, Comment
-from auctions.serializers import UserSerializer, ListingSerializer, CommentSerializer, BidSerializer
+from auctions.models import User, Listing, Bid, Comment, CollectionVersion
+from auctions.serializers import UserSerializer, ListingSerializer, ListingSummarySerializer, ListingSearchSerializer, ListingFeedSerializer, CommentSerializer, BidSerializer, BidReplaySerializer, BulkCreateListSerializer
 from auctions.permissions import IsOwnerOrReadOnly
+from auctions.bidding import AuctionClosed, BidConflict, place_bid, submit_bid
+from auctions.accounts import login, with_listing_count
+from auctions.activity import bid_activity, bid_bucket, comment_activity, record_bids
+from auctions.authentication import SessionAuthentication, CachedTokenAuthentication
+from auctions.cache import listing_cache, token_cache
+from auctions.conditional import ConditionalGetMixin
+from auctions.events import publish_bid
+from auctions.export import EXPORTS, stream_export
+from auctions.feeds import FEEDS
+from auctions.filters import ListingFilter
+from auctions.instrumentation import metrics, timed
+from auctions.pagination import ListingPagination, UserPagination, BidPagination, CommentPagination, SearchPagination
+from auctions.parsers import FastJSONParser, NDJSONParser
+from auctions.renderers import NDJSONRenderer, CSVRenderer
+from auctions.rows import RowSerializer
+from auctions.search import search_listings, time_limit
 from rest_framework import status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
 from rest_framework import generics
 from rest_framework import permissions
 from rest_framework.reverse import reverse
+from rest_framework.views import APIView
+from rest_framework.exceptions import NotFound
 from rest_framework.authtoken.models import Token
-from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from django.conf import settings
+from django.core.exceptions import FieldError
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
 from rest_framework import serializers
 
+# Columns of `Listing` that are always loaded: the primary key and the
+# fields the listings can be paginated on.
+LISTING_REQUIRED_COLUMNS = ["id", "created_at", "current_bid"]
+
+LISTING_COLUMNS = {field.name for field in Listing._meta.concrete_fields}
+
+
+def listing_queryset(fields=None, bids_limit=None):
+    """
+    Return the query plan for serializing `fields` of a listing.
+
+    The owner is joined in and the nested bids/comments are fetched with
+    one query each, along with the user each of them points at, so the
+    number of queries does not depend on the number of listings
+    serialized. Columns and relations that are not part of `fields` are
+    not fetched at all.
+    """
+    queryset = Listing.objects.all()
+    if fields is None:
+        fields = ListingSerializer.Meta.fields
+    else:
+        columns = set(LISTING_REQUIRED_COLUMNS)
+        for name in fields:
+            if name in ("owner", "top_bidder"):
+                columns.add(f"{name}__username")
+            elif name in ("bids", "comments"):
+                # The nested serializers read the listing name
+                columns.add("name")
+            elif name in LISTING_COLUMNS:
+                columns.add(name)
+        queryset = queryset.only(*columns)
+
+    if "owner" in fields:
+        queryset = queryset.select_related("owner")
+    if "top_bidder" in fields:
+        queryset = queryset.select_related("top_bidder")
+    for name, nested in nested_querysets(fields, bids_limit).items():
+        queryset = queryset.prefetch_related(Prefetch(name, queryset=nested))
+    return queryset
+
+
+def nested_querysets(fields, bids_limit=None):
+    """
+    Return the querysets of the nested bids and comments of `fields`, by
+    field name, along with the user each of them points at.
+    """
+    nested = {}
+    if "bids" in fields:
+        bids = Bid.objects.select_related("bidder")
+        if bids_limit is not None:
+            # Rank the bids of each listing instead of slicing the prefetch
+            # queryset, which the related manager cannot filter afterwards.
+            bids = bids.annotate(
+                rank=Window(RowNumber(), partition_by=F("listing_id"), order_by=[F("bid_amount").desc(), F("id").desc()])
+            ).filter(rank__lte=bids_limit).order_by("-bid_amount", "-id")
+        nested["bids"] = bids
+    if "comments" in fields:
+        nested["comments"] = Comment.objects.select_related("commentor")
+    return nested
+
+
+class RowListMixin:
+    """
+    Serve GET on a list from `.values()` rows with `RowSerializer` when
+    AUCTIONS_ROW_SERIALIZATION is set, without instantiating models or
+    running the serializer fields. Lists whose serializer has a field that
+    is not read from a column are served by the serializer.
+    """
+
+    def get_nested_querysets(self):
+        """
+        Return the querysets of the nested serializers, by field name.
+        """
+        return {}
+
+    def get_row_serializer(self):
+        if not settings.AUCTIONS_ROW_SERIALIZATION:
+            return None
+        return RowSerializer.for_serializer(self.get_serializer())
+
+    def get_row_queryset(self, row_serializer, queryset):
+        """
+        Return the `.values()` rows of `queryset`, with the fields the
+        pagination is ordered by, or None if a field reads an annotation
+        `queryset` lacks.
+        """
+        paths = []
+        if self.paginator is not None:
+            paths = [name.lstrip("-") for name in self.paginator.get_ordering(self.request, queryset, self)]
+        try:
+            return row_serializer.values(queryset, *paths)
+        except FieldError:
+            return None
+
+    def list(self, request, *args, **kwargs):
+        row_serializer = self.get_row_serializer()
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = None if row_serializer is None else self.get_row_queryset(row_serializer, queryset)
+        if rows is None:
+            return super().list(request, *args, **kwargs)
+        page = self.paginate_queryset(rows)
+        rows = list(rows) if page is None else page
+        nested = {name: list(nested) for name, nested in row_serializer.nested_values(rows, self.get_nested_querysets()).items()}
+        with timed("serialize"):
+            data = row_serializer.to_representation(rows, nested)
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+
+class ListingFieldsMixin:
+    """
+    Serialize listings with the fields asked for in `?fields=`, `?expand=`
+    and `?bids_limit=` on safe requests, and fetch only what they read.
+    """
+    expandable_fields = ["bids", "comments"]
+
+    def get_listing_fields(self):
+        if hasattr(self, "_listing_fields"):
+            return self._listing_fields
+        params = self.request.query_params
+        fields = [name for name in params.get("fields", "").split(",") if name]
+        # An empty `?fields=` asks for the default fields.
+        if not fields:
+            serializer_class = self.get_serializer_class()
+            fields = list(serializer_class.default_fields or serializer_class.Meta.fields)
+        expand = [name for name in params.get("expand", "").split(",") if name]
+        if set(expand) - set(self.expandable_fields):
+            raise serializers.ValidationError({"expand": [f"Can only expand {', '.join(self.expandable_fields)}."]})
+        fields += [name for name in expand if name not in fields]
+        unknown = set(fields) - set(self.get_serializer_class().Meta.fields)
+        if unknown:
+            raise serializers.ValidationError({"fields": [f"Unknown field(s): {', '.join(sorted(unknown))}."]})
+        self._listing_fields = fields
+        return fields
+
+    def get_bids_limit(self):
+        bids_limit = self.request.query_params.get("bids_limit")
+        if bids_limit is None:
+            return None
+        try:
+            bids_limit = int(bids_limit)
+        except ValueError:
+            bids_limit = 0
+        if bids_limit < 1:
+            raise serializers.ValidationError({"bids_limit": ["Must be a positive integer."]})
+        return bids_limit
+
+    def get_queryset(self):
+        if self.request.method not in permissions.SAFE_METHODS:
+            return listing_queryset()
+        return listing_queryset(self.get_listing_fields(), self.get_bids_limit())
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method in permissions.SAFE_METHODS:
+            kwargs.setdefault("fields", self.get_listing_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_nested_querysets(self):
+        return nested_querysets(self.get_listing_fields(), self.get_bids_limit())
+
+
 @api_view(['GET'])
 def api_root(request, format=None):
     return Response({
@@ -19,90 +205,353 @@ def api_root(request, format=None):
         'listings': reverse('listing-list', request=request, format=format)
     })
 
+@api_view(['GET'])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
+@permission_classes([permissions.IsAdminUser])
+def cache_stats(request):
+    return Response({"listings": listing_cache.stats(), "tokens": token_cache.stats()})
+
+@api_view(['GET'])
+@authentication_classes([SessionAuthentication, CachedTokenAuthentication])
+@permission_classes([permissions.IsAdminUser])
+def metrics_view(request):
+    """
+    The per-route histograms of the request timings recorded by
+    `ServerTimingMiddleware` in this process, and the cache counters.
+    """
+    return Response({
+        "instrumentation": settings.AUCTIONS_INSTRUMENTATION,
+        "routes": metrics.snapshot(),
+        "caches": {"listings": listing_cache.stats(), "tokens": token_cache.stats()},
+    })
+
 @api_view(['POST'])
 def login_view(request):
-    try:
-        user = User.objects.get(username=request.data["username"])
-    except User.DoesNotExist:
-        return Response({"message":"bad request"}, status=status.HTTP_400_BAD_REQUEST)
-    if not user.check_password(request.data["password"]):
+    credentials = login(request.data.get("username"), request.data.get("password", ""))
+    if credentials is None:
         return Response({"message":"bad request"}, status=status.HTTP_400_BAD_REQUEST)
-    token, created = Token.objects.get_or_create(user=user)
-    serializer = UserSerializer(instance=user)
-    return Response({"token":token.key, "user":serializer.data}, status=status.HTTP_200_OK)
+    user, token = credentials
+    serializer = UserSerializer(instance=user, context={"request": request})
+    return Response({"token":token, "user":serializer.data}, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
 def register(request):
-    serializer = UserSerializer(data=request.data)
+    serializer = UserSerializer(data=request.data, context={"request": request})
     if serializer.is_valid():
-        serializer.save()
-        user = User.objects.get(username=request.data["username"])
-        user.set_password(user.password)
-        user.save()
-        serializer.data["password"] = user.password
-        token = Token.objects.create(user=user)
+        # The password is hashed by the serializer, before the user is inserted.
+        with transaction.atomic():
+            user = serializer.save()
+            token = Token.objects.create(user=user)
         return Response({"token": token.key, "user":serializer.data}, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserList(generics.ListAPIView):
-    queryset = User.objects.all()
+class UserFieldsMixin:
+    """
+    Serialize users with their listing count, and the links to their
+    listings only with `?expand=listings`, fetched with one more query.
+    """
+    expandable_fields = ["listings"]
+
+    def get_expand(self):
+        expand = [name for name in self.request.query_params.get("expand", "").split(",") if name]
+        if set(expand) - set(self.expandable_fields):
+            raise serializers.ValidationError({"expand": [f"Can only expand {', '.join(self.expandable_fields)}."]})
+        return expand
+
+    def get_queryset(self):
+        queryset = with_listing_count(User.objects.all())
+        if "listings" in self.get_expand():
+            # Only the ids are needed to link to the listings.
+            listings = Listing.objects.only("id", "owner_id").order_by("id")
+            queryset = queryset.prefetch_related(Prefetch("listings", queryset=listings))
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault("fields", UserSerializer.default_fields + self.get_expand())
+        return super().get_serializer(*args, **kwargs)
+
+
+class UserList(UserFieldsMixin, generics.ListAPIView):
     serializer_class = UserSerializer
-    authentication_classes = [SessionAuthentication, TokenAuthentication]
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
     permission_classes = [permissions.IsAdminUser, permissions.IsAuthenticated]
+    pagination_class = UserPagination
 
-class UserDetail(generics.RetrieveAPIView):
-    queryset = User.objects.all()
+class UserDetail(UserFieldsMixin, generics.RetrieveAPIView):
     serializer_class = UserSerializer
-    authentication_classes = [SessionAuthentication, TokenAuthentication]
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
     permission_classes = [permissions.IsAdminUser, permissions.IsAuthenticated]
 
-class ListingList(generics.ListCreateAPIView):
-    queryset = Listing.objects.all()
+class ListingVersionMixin(ConditionalGetMixin):
+    """
+    Version the bids and comments of a listing with the listing itself,
+    which is bumped whenever one of them changes.
+    """
+
+    def get_version(self):
+        return Listing.objects.filter(pk=self.kwargs['pk']).values_list("version", flat=True).first()
+
+
+class ListingList(ConditionalGetMixin, ListingFieldsMixin, RowListMixin, generics.ListCreateAPIView):
     serializer_class = ListingSerializer
-    authentication_classes = [SessionAuthentication, TokenAuthentication]
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = ListingPagination
+    filter_backends = [ListingFilter]
+
+    def get_serializer_class(self):
+        if self.request.method in permissions.SAFE_METHODS:
+            return ListingSummarySerializer
+        return ListingSerializer
+
+    def get_version(self):
+        return CollectionVersion.current(Listing.COLLECTION)
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
 
-class ListingDetail(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Listing.objects.all()
+class BulkCreateMixin:
+    """
+    Validate a JSON array or NDJSON stream of items one by one, and answer
+    with the ids of the created items and the errors of the others.
+    """
+    parser_classes = [FastJSONParser, NDJSONParser]
+
+    def get_bulk_serializer(self, child):
+        if isinstance(self.request.data, list) and len(self.request.data) > settings.AUCTIONS_BULK_MAX_ROWS:
+            raise serializers.ValidationError([f"At most {settings.AUCTIONS_BULK_MAX_ROWS} items can be created at once."])
+        serializer = BulkCreateListSerializer(child=child, data=self.request.data)
+        serializer.batch_size = settings.AUCTIONS_BULK_BATCH_SIZE
+        serializer.is_valid(raise_exception=True)
+        return serializer
+
+    def bulk_response(self, created, errors):
+        body = {
+            "created": [instance.pk for instance in created],
+            "errors": [{"index": index, "errors": error} for index, error in enumerate(errors) if error],
+        }
+        if not created and body["errors"]:
+            return Response(body, status=status.HTTP_400_BAD_REQUEST)
+        return Response(body, status=status.HTTP_201_CREATED)
+
+
+class ListingBulkCreate(BulkCreateMixin, generics.GenericAPIView):
     serializer_class = ListingSerializer
-    authentication_classes = [SessionAuthentication, TokenAuthentication]
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, format=None):
+        serializer = self.get_bulk_serializer(ListingSerializer())
+        with transaction.atomic():
+            listings = serializer.save(owner=request.user)
+            if listings:
+                CollectionVersion.bump(Listing.COLLECTION)
+        return self.bulk_response(listings, serializer.item_errors)
+
+
+class BidReplay(BulkCreateMixin, generics.GenericAPIView):
+    """
+    Replay historical bids in bulk, on the auctions still accepting bids.
+    Each bid must beat the current bid of its listing, including the bids
+    replayed before it, and be dated no earlier than its last bid.
+    """
+    serializer_class = BidReplaySerializer
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request, format=None):
+        serializer = self.get_bulk_serializer(BidReplaySerializer())
+        errors = serializer.item_errors
+        rows = serializer.validated_data
+        items = zip([index for index, error in enumerate(errors) if not error], rows)
+        listings = Listing.objects.only("id", "name", "current_bid", "active", "ends_at", "last_bid_at").in_bulk(
+            {row["listing"] for row in rows}
+        )
+        bidders = User.objects.in_bulk({row["bidder"] for row in rows}, field_name="username")
+
+        now = timezone.now()
+        current_bids = {pk: listing.current_bid for pk, listing in listings.items()}
+        last_bid_dates = {pk: listing.last_bid_at for pk, listing in listings.items()}
+        # Number of bids replayed on each listing and the bidder of the last one.
+        replayed = {}
+        # Number of bids replayed per feed bucket of each listing, and a date in it.
+        buckets = {}
+        bids = []
+        for index, row in items:
+            bid_date = row.get("bid_date", now)
+            if row["listing"] not in listings:
+                errors[index] = {"listing": [f"Invalid pk \"{row['listing']}\" - object does not exist."]}
+            elif row["bidder"] not in bidders:
+                errors[index] = {"bidder": [f"Object with username={row['bidder']} does not exist."]}
+            elif not listings[row["listing"]].is_accepting_bids(now):
+                errors[index] = [AuctionClosed.default_detail]
+            elif row["bid_amount"] <= current_bids[row["listing"]]:
+                errors[index] = ["Bid amount must be greater than current bid."]
+            elif last_bid_dates[row["listing"]] is not None and bid_date < last_bid_dates[row["listing"]]:
+                errors[index] = {"bid_date": ["Must not be before the last bid of the listing."]}
+            else:
+                current_bids[row["listing"]] = row["bid_amount"]
+                last_bid_dates[row["listing"]] = bid_date
+                replayed[row["listing"]] = (replayed.get(row["listing"], (0,))[0] + 1, bidders[row["bidder"]])
+                bucket = (row["listing"], bid_bucket(bid_date))
+                buckets[bucket] = (buckets.get(bucket, (0,))[0] + 1, bid_date)
+                bids.append(Bid(listing=listings[row["listing"]], bidder=bidders[row["bidder"]], bid_amount=row["bid_amount"], bid_date=bid_date))
+
+        with transaction.atomic():
+            bids = Bid.objects.bulk_create(bids, batch_size=settings.AUCTIONS_BULK_BATCH_SIZE)
+            for pk, (count, bidder) in replayed.items():
+                listing = listings[pk]
+                updates = bid_activity(bidder, last_bid_dates[pk], count)
+                listing_row = Listing.objects.filter(pk=pk, current_bid=listing.current_bid).accepting_bids(now)
+                if not listing_row.bump_version(current_bid=current_bids[pk], **updates):
+                    raise BidConflict()
+            for (pk, _), (count, bid_date) in buckets.items():
+                record_bids(pk, bid_date, count)
+            for bid in bids:
+                publish_bid(bid)
+        return self.bulk_response(bids, errors)
+
+
+class ListingSearch(ListingFieldsMixin, RowListMixin, generics.ListAPIView):
+    serializer_class = ListingSearchSerializer
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
+    permission_classes = [permissions.AllowAny]
+    pagination_class = SearchPagination
+
+    def get_queryset(self):
+        q = self.request.query_params.get("q", "").strip()
+        if not q:
+            raise serializers.ValidationError({"q": ["This parameter is required."]})
+        return search_listings(super().get_queryset(), q)
+
+    def list(self, request, *args, **kwargs):
+        with time_limit(settings.AUCTIONS_SEARCH_TIME_LIMIT):
+            return super().list(request, *args, **kwargs)
+
+
+class ListingFeed(ListingFieldsMixin, generics.GenericAPIView):
+    """
+    The discovery feeds of the homepage, see `auctions.feeds.FEEDS`: the
+    `?limit=` first listings of the feed, or of each category for the
+    newest listings. Each feed is read with a single query.
+    """
+    serializer_class = ListingFeedSerializer
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
+    permission_classes = [permissions.AllowAny]
+    default_limit = 20
+    max_limit = 100
+
+    def get_limit(self):
+        limit = self.request.query_params.get("limit", self.default_limit)
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= self.max_limit:
+            raise serializers.ValidationError({"limit": [f"Must be an integer between 1 and {self.max_limit}."]})
+        return limit
+
+    def get(self, request, name, format=None):
+        if name not in FEEDS:
+            raise NotFound()
+        listings = FEEDS[name](self.get_queryset(), self.get_limit())
+        if isinstance(listings, dict):
+            results = {key: self.get_serializer(value, many=True).data for key, value in listings.items()}
+        else:
+            results = self.get_serializer(listings, many=True).data
+        return Response({"results": results})
+
+
+class ListingDetail(ListingVersionMixin, ListingFieldsMixin, generics.RetrieveUpdateDestroyAPIView):
+    serializer_class = ListingSerializer
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
 
+    def retrieve(self, request, *args, **kwargs):
+        # Only the default representation is cached, sparse fieldsets are
+        # cheap to build and would multiply the entries per listing.
+        if request.query_params or self.version is None:
+            return super().retrieve(request, *args, **kwargs)
+        data = listing_cache.get(self.kwargs['pk'], self.version)
+        if data is None:
+            response = super().retrieve(request, *args, **kwargs)
+            listing_cache.set(self.kwargs['pk'], self.version, response.data)
+            return response
+        return Response(data)
 
-class BidList(generics.ListCreateAPIView):
-    queryset = Bid.objects.all()
+
+class BidList(ListingVersionMixin, RowListMixin, generics.ListCreateAPIView):
+    queryset = Bid.objects.select_related("bidder", "listing")
     serializer_class = BidSerializer
-    authentication_classes = [SessionAuthentication, TokenAuthentication]
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = BidPagination
+
+    def get_queryset(self):
+        return super().get_queryset().filter(listing_id=self.kwargs['pk'])
 
     def perform_create(self, serializer):
         pk = self.kwargs['pk']
-        listing = get_object_or_404(Listing, pk=pk)
+        listing = get_object_or_404(Listing.objects.only("id", "name", "current_bid", "active", "ends_at"), pk=pk)
+        if not listing.is_accepting_bids():
+            raise AuctionClosed()
         bid_amount = serializer.validated_data["bid_amount"]
-        if float(bid_amount) > listing.current_bid:
-            serializer.save(bidder=self.request.user, listing=listing)
-            listing.current_bid = bid_amount
-            listing.save()
-        else:
+        if bid_amount <= listing.current_bid:
             raise serializers.ValidationError("Bid amount must be greater than current bid.")
+        if settings.AUCTIONS_BID_BATCHING:
+            serializer.instance = submit_bid(listing, self.request.user, bid_amount)
+        else:
+            serializer.instance = place_bid(listing, self.request.user, bid_amount)
+        publish_bid(serializer.instance)
         
-class CommentList(generics.ListCreateAPIView):
-    queryset = Comment.objects.all()
+class CommentList(ListingVersionMixin, RowListMixin, generics.ListCreateAPIView):
+    queryset = Comment.objects.select_related("commentor", "listing")
     serializer_class = CommentSerializer
-    authentication_classes = [SessionAuthentication, TokenAuthentication]
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CommentPagination
+
+    def get_queryset(self):
+        return super().get_queryset().filter(listing_id=self.kwargs['pk'])
 
     def perform_create(self, serializer):
         pk = self.kwargs['pk']
         listing = get_object_or_404(Listing, pk=pk)
         comment_text = serializer.validated_data["text"]
         if len(comment_text) > 0:
-            serializer.save(commentor=self.request.user, listing=listing)
+            comment = Comment(commentor=self.request.user, listing=listing, **serializer.validated_data)
+            comment.bumps_listing = False
+            with transaction.atomic():
+                comment.save()
+                Listing.objects.filter(pk=listing.pk).bump_version(**comment_activity())
+            serializer.instance = comment
         else:
-            raise serializers.ValidationError("Comment must not be empty.")
\ No newline at end of file
+            raise serializers.ValidationError("Comment must not be empty.")
+
+
+class Export(APIView):
+    """
+    Stream every listing, bid or comment as NDJSON or CSV, in id order.
+    Pass the id of the last row received as `?since=` to only get the
+    rows added after it.
+    """
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+
+    def get(self, request, name, format=None):
+        if name not in EXPORTS:
+            raise NotFound()
+        since = request.query_params.get("since")
+        if since is not None:
+            try:
+                since = int(since)
+            except ValueError:
+                raise serializers.ValidationError({"since": ["Must be the id of the last row received."]})
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(stream_export(name, renderer.format, since), content_type=renderer.media_type)
+        response["Content-Disposition"] = f'attachment; filename="{name}.{renderer.format}"'
+        return response
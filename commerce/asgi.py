@@ -13,4 +13,10 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'commerce.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from auctions.closing import start_auction_closer  # noqa: E402, needs the apps loaded
+from auctions.routing import StreamRouter  # noqa: E402
+
+application = StreamRouter(django_application)
+start_auction_closer()
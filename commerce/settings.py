@@ -11,6 +11,8 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 """
 
 import os
+import tempfile
+from importlib.util import find_spec
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -43,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'auctions.instrumentation.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -50,8 +53,29 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'auctions.replicas.ReplicaMiddleware',
 ]
 
+REST_FRAMEWORK = {
+    # JSON encoded and parsed by orjson when it is installed, see
+    # auctions.renderers.FastJSONRenderer.
+    'DEFAULT_RENDERER_CLASSES': [
+        'auctions.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'auctions.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# MessagePack (application/msgpack) is offered to the internal services
+# when msgpack is installed.
+if find_spec('msgpack') is not None:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('auctions.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].append('auctions.parsers.MessagePackParser')
+
 ROOT_URLCONF = 'commerce.urls'
 
 TEMPLATES = [
@@ -76,18 +100,177 @@ WSGI_APPLICATION = 'commerce.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 
+# SQLite tuned for concurrent requests, see auctions.sqlite3.base and
+# `manage.py bench_sqlite`: WAL lets reads run while a write commits,
+# atomic() blocks take the write lock when they begin, in turn within the
+# process, and wait up to `timeout` seconds for it, and connections are
+# kept for CONN_MAX_AGE seconds instead of being opened by every request.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'auctions.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'write_lock': True,
+            'pragmas': {
+                'journal_mode': 'WAL',
+                # Durable up to the last checkpoint in WAL mode, without
+                # an fsync per commit.
+                'synchronous': 'NORMAL',
+                'cache_size': -64000,  # KiB
+                'mmap_size': 256 * 2 ** 20,
+                'temp_store': 'MEMORY',
+            },
+        },
+    }
+}
+
+# Read replicas of the default database, the primary: aliases of DATABASES
+# serving the reads of the safe requests of AUCTIONS_REPLICA_ROUTES, see
+# auctions.replicas. To try them locally with two SQLite files, set
+# AUCTIONS_SQLITE_REPLICA to the path of the replica and copy the primary
+# into it with `manage.py sync_replicas [--loop]`; unset it to run the
+# tests, whose classes only query the default database.
+if os.environ.get('AUCTIONS_SQLITE_REPLICA'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['AUCTIONS_SQLITE_REPLICA'],
+        'TEST': {'MIRROR': 'default'},
     }
+AUCTIONS_READ_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+AUCTIONS_REPLICA_ROUTES = ['listing-list', 'listing-detail', 'bid-list', 'comment-list']
+
+DATABASE_ROUTERS = ['auctions.replicas.ReplicaRouter']
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'listings': {
+        'BACKEND': 'auctions.cache.LRUCache',
+        'LOCATION': 'listings',
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
+    },
+    'tokens': {
+        'BACKEND': 'auctions.cache.LRUCache',
+        'LOCATION': 'tokens',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    # Shared by the processes of the host; use a memcached or Redis cache
+    # when they run on several hosts.
+    'replica-pins': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'commerce-replica-pins'),
+    },
 }
 
+# Cache alias holding the serialized listings, see auctions.cache.ListingCache.
+AUCTIONS_LISTING_CACHE = 'listings'
+
+# Cache alias holding the users of API tokens, see auctions.cache.TokenCache,
+# and the seconds a token is trusted without checking the database.
+AUCTIONS_TOKEN_CACHE = 'tokens'
+AUCTIONS_TOKEN_CACHE_TIMEOUT = 60
+
+# Cache alias holding the clients pinned to the primary, and for how many
+# seconds after they write, so that they read their own writes while the
+# replicas catch up. It must be shared by all the processes serving
+# requests, ReplicaMiddleware refuses a local-memory cache.
+AUCTIONS_REPLICA_PIN_CACHE = 'replica-pins'
+AUCTIONS_REPLICA_PIN_SECONDS = 10
+
+# Routes whose reads are served by the async views of auctions.async_views,
+# e.g. ['listing-list', 'listing-detail', 'bid-list', 'comment-list'], and
+# 'login' to check passwords off the event loop. Only
+# worth it under ASGI (commerce/asgi.py), under WSGI each of their requests
+# would need an event loop of its own.
+AUCTIONS_ASYNC_VIEWS = []
+
+# Transport of the publish/subscribe hub feeding the bid streams, see
+# auctions.pubsub.BaseBackend.
+AUCTIONS_PUBSUB_BACKEND = 'auctions.pubsub.LocalBackend'
+
+# Seconds between keepalive comments on an idle bid stream.
+AUCTIONS_BID_STREAM_KEEPALIVE = 15
+
+# Auctions closed per transaction by auctions.closing.close_expired_auctions.
+AUCTIONS_CLOSE_BATCH_SIZE = 1000
+# Seconds between two batches, for bids to get the database lock.
+AUCTIONS_CLOSE_PAUSE = 0.01
+
+# Start a thread closing expired auctions every AUCTIONS_CLOSE_INTERVAL
+# seconds in each server process (commerce/wsgi.py, commerce/asgi.py),
+# instead of running `manage.py close_auctions --loop` next to them.
+AUCTIONS_CLOSE_IN_PROCESS = False
+AUCTIONS_CLOSE_INTERVAL = 1
+
+# Serve GET on the listing, search, bid and comment lists from .values()
+# rows instead of model instances and serializer fields, see auctions.rows.
+AUCTIONS_ROW_SERIALIZATION = True
+
+# Time every request by part (auth, view, serializer, render, SQL), send
+# the timings in a Server-Timing header and aggregate them per route at
+# /api/metrics/, see auctions.instrumentation.
+AUCTIONS_INSTRUMENTATION = False
+
+# Queries slower than this many milliseconds are logged as warnings by the
+# auctions.instrumentation logger, when instrumentation is on.
+AUCTIONS_SLOW_QUERY_MS = 100
+
+# Seconds covered by each bid counter of the listing feeds (see
+# auctions.models.ListingBidBucket), the windows of the trending and most
+# bid feeds, and how long `manage.py compact_feed_buckets` keeps counters.
+AUCTIONS_FEED_BUCKET_SECONDS = 300
+AUCTIONS_FEED_TRENDING_WINDOW = 6 * 3600
+AUCTIONS_FEED_MOST_BID_WINDOW = 3600
+AUCTIONS_FEED_RETENTION = 24 * 3600
+
+# Rows inserted per INSERT, and accepted per request, by the bulk endpoints.
+AUCTIONS_BULK_BATCH_SIZE = 500
+AUCTIONS_BULK_MAX_ROWS = 10000
+
+# Seconds a listing search may run before it is aborted with a 503.
+AUCTIONS_SEARCH_TIME_LIMIT = 0.5
+
 AUTH_USER_MODEL = 'auctions.User'
 
+# Bids
+# When enabled, bids are queued per listing and written in batches by a
+# single writer thread every AUCTIONS_BID_BATCH_WINDOW seconds instead of
+# one transaction per request. See auctions.bidding.BidBatcher.
+
+AUCTIONS_BID_BATCHING = False
+
+AUCTIONS_BID_BATCH_WINDOW = 0.005
+
+AUCTIONS_BID_BATCH_TIMEOUT = 5
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
+PASSWORD_HASHERS = [
+    'auctions.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Work factor of auctions.hashers.PBKDF2PasswordHasher, per environment: a
+# login costs about this many SHA-256 rounds of CPU. Django's default is
+# the safe choice in production; lower it only for tests and development.
+AUCTIONS_PASSWORD_ITERATIONS = int(os.environ.get('AUCTIONS_PASSWORD_ITERATIONS', 600000))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
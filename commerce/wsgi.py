@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'commerce.settings')
 
 application = get_wsgi_application()
+
+from auctions.closing import start_auction_closer  # noqa: E402, needs the apps loaded
+
+start_auction_closer()